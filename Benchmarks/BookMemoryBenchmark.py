@@ -0,0 +1,57 @@
+import os
+import sys
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from BookFactory import BookFactory
+
+"""
+Memory benchmark for the book catalog: bytes per title with the old dict-based Book versus the slotted Book
+created through BookFactory (which interns author and genre).
+Run from the project root: python Benchmarks/BookMemoryBenchmark.py --count 1000000
+"""
+
+GENRES = ["Fiction", "Dystopian", "Classic", "Fantasy", "Science", "Horror", "Romance", "History"]
+
+
+class DictBook:
+    """The Book class as it was before __slots__ (one __dict__ per instance, no interning)."""
+    def __init__(self, title, author, is_loaned, copies, genre, year):
+        self.title = title
+        self.author = author
+        self.is_loaned = is_loaned
+        self.copies = copies
+        self.genre = genre
+        self.year = year
+
+
+def make_row(i):
+    # Fresh string objects per row, like csv.DictReader produces
+    return f"Title {i}", f"Author {i % 50000}", False, 3, GENRES[i % len(GENRES)].encode().decode(), 1900 + i % 120
+
+
+def measure(create, count):
+    tracemalloc.start()
+    books = [create(*make_row(i)) for i in range(count)]
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del books
+    return used / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bytes per title of the book catalog.")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    count = parser.parse_args().count
+
+    before = measure(DictBook, count)
+    after = measure(BookFactory.create_book, count)
+    print(f"titles:                    {count:,}")
+    print(f"before (dict Book):        {before:,.0f} bytes/title")
+    print(f"after (slots + interning): {after:,.0f} bytes/title")
+    print(f"saved:                     {1 - after / before:.0%}")
+
+
+if __name__ == "__main__":
+    main()
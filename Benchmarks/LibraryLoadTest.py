@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import contextlib
+from bisect import bisect_left
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from DynamicSearch import DynamicSearch
+from Library import Library
+from LibraryService import LibraryService
+from operation_metrics import LatencyHistogram, classify_outcome
+
+"""
+Load test for the library: many concurrent patrons (threads) run a weighted mix of searches, borrows, returns and
+waiting-list joins against one Library for a fixed duration. As in the GUI, searches read the catalog snapshot
+from the patron's thread and every command is queued to the LibraryService worker, so the latencies include the
+wait for the single writer. Titles are picked with a Zipf distribution, so a few
+popular titles see most of the contention. Reports sustained ops/sec, p50/p99/p999 latency and fail/error rates
+per operation. Runs on a temporary copy of the data directory, so the real CSV files are never modified.
+Run from the project root: python Benchmarks/LibraryLoadTest.py --clients 200 --duration 10
+"""
+
+DEFAULT_MIX = {"search": 60, "borrow": 20, "return": 15, "waitlist": 5}
+
+
+class ZipfPicker:
+    """Picks items with probability proportional to 1 / rank**exponent."""
+    def __init__(self, items, exponent=1.1):
+        self.items = list(items)
+        self.cumulative = list(accumulate(1 / rank ** exponent for rank in range(1, len(self.items) + 1)))
+
+    def pick(self, rng):
+        return self.items[bisect_left(self.cumulative, rng.random() * self.cumulative[-1])]
+
+
+def run_operation(service, search, operation, book, client_name, rng):
+    if operation == "search":
+        return search.search(rng.choice(["title", "author"]), service.library.books, book.title.split()[0])
+    if operation == "borrow":
+        return service.call("borrow_book", book.title).result()
+    if operation == "return":
+        return service.call("return_book", book.title).result()
+    if operation == "waitlist":
+        try:
+            service.call("join_waiting_list", book.title, book.author, book.genre, book.year,
+                         client_name, f"{client_name}@example.com", "000").result()
+        except ValueError:  # The client already waits for this title - a rejected join, not an error
+            return "waiting list join fail"
+        return "added to the waiting list"
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+def run_load_test(library, clients=200, duration=10.0, mix=None, zipf_exponent=1.1, seed=0, think_time=0.0):
+    """
+    Run the load test and return {operation: {count, ops_per_sec, p50_ms, p99_ms, p999_ms, fail_rate, error_rate}}
+    plus a "total" entry. A "... fail ..." result (e.g. no copies left) is a failure, an exception is an error.
+    """
+    mix = mix or DEFAULT_MIX
+    operations = list(mix)
+    operation_weights = list(accumulate(mix.values()))
+    picker = ZipfPicker(sorted(library.books, key=lambda book: book.title), zipf_exponent)
+    service = LibraryService(library)
+    start_barrier = threading.Barrier(clients + 1)
+    results = []  # One {operation: (histogram, fails, errors)} per client, merged at the end
+    results_lock = threading.Lock()
+
+    def client(number):
+        rng = random.Random(seed + number)
+        search = DynamicSearch()
+        local = {operation: [LatencyHistogram(), 0, 0] for operation in operations}
+        start_barrier.wait()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            operation = operations[bisect_left(operation_weights, rng.random() * operation_weights[-1])]
+            book = picker.pick(rng)
+            started = time.perf_counter()
+            try:
+                outcome = classify_outcome(run_operation(service, search, operation, book, f"Patron {number}", rng))
+            except Exception:
+                outcome = "error"
+            stats = local[operation]
+            stats[0].record((time.perf_counter() - started) * 1_000_000)
+            stats[1] += outcome == "fail"
+            stats[2] += outcome == "error"
+            if think_time:
+                time.sleep(rng.expovariate(1 / think_time))
+        with results_lock:
+            results.append(local)
+
+    threads = [threading.Thread(target=client, args=(number,), daemon=True) for number in range(clients)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    service.close()
+
+    report = {}
+    total = [LatencyHistogram(), 0, 0]
+    for operation in operations + ["total"]:
+        if operation == "total":
+            histogram, fails, errors = total
+        else:
+            histogram, fails, errors = LatencyHistogram(), 0, 0
+            for local in results:
+                histogram.merge(local[operation][0])
+                fails += local[operation][1]
+                errors += local[operation][2]
+            total[0].merge(histogram)
+            total[1] += fails
+            total[2] += errors
+        count = histogram.count
+        report[operation] = {
+            "count": count,
+            "ops_per_sec": count / elapsed,
+            "p50_ms": histogram.percentile(50) / 1000,
+            "p99_ms": histogram.percentile(99) / 1000,
+            "p999_ms": histogram.percentile(99.9) / 1000,
+            "fail_rate": fails / count if count else 0.0,
+            "error_rate": errors / count if count else 0.0,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent patron load test for the library.")
+    parser.add_argument("--data-dir", default="csv_files")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--mix", default="search=60,borrow=20,return=15,waitlist=5",
+                        help="operation weights, e.g. search=80,borrow=10,return=10")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of title popularity")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between a patron's operations")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    mix = {name: float(weight) for name, weight in (item.split("=") for item in args.mix.split(","))}
+
+    work_dir = tempfile.mkdtemp(prefix="library-load-")
+    try:
+        for name in os.listdir(args.data_dir):
+            if name.endswith(".csv"):
+                shutil.copy(os.path.join(args.data_dir, name), work_dir)
+        library = Library.from_directory(work_dir)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):  # Silence notifications
+            report = run_load_test(library, args.clients, args.duration, mix, args.zipf, args.seed, args.think_time)
+    finally:
+        shutil.rmtree(work_dir)
+
+    print(f"{args.clients} clients, {args.duration:g}s, {len(library.books)} titles, zipf={args.zipf:g}")
+    print(f"{'operation':<10}{'count':>9}{'ops/sec':>10}{'p50 ms':>9}{'p99 ms':>9}{'p999 ms':>9}{'fail':>8}{'error':>8}")
+    for operation, stats in report.items():
+        print(f"{operation:<10}{stats['count']:>9}{stats['ops_per_sec']:>10.1f}{stats['p50_ms']:>9.2f}"
+              f"{stats['p99_ms']:>9.2f}{stats['p999_ms']:>9.2f}{stats['fail_rate']:>8.1%}{stats['error_rate']:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 # --- Book Management ---
 """
-This class represents a simple book object for our library
+This class represents a simple book object for our library.
+It uses __slots__ instead of a per-instance __dict__, which keeps large catalogs compact in memory.
 """
 class Book:
+    __slots__ = ("title", "author", "is_loaned", "copies", "genre", "year")
+
     def __init__(self, title: str, author: str, is_loaned: bool, copies: int, genre: str, year: int):
         self.title = title
         self.author = author
@@ -1,25 +1,33 @@
+from bisect import bisect_left
+from GenreIndex import GenreIndex
+
 """
-This class implements the iterator design pattern to efficiently navigate through the books by category
+This class implements the iterator design pattern to efficiently navigate through the books by category.
+It walks a GenreIndex lazily, yielding each category name followed by its books, so the first category is
+available immediately. Iteration can start at a given genre and/or skip `offset` categories, which lets a
+view page through the categories without rebuilding anything.
 """
 class BookCategoryIterator:
-    def __init__(self, books):
-        self.books_by_category = {}
-        for book in books:
-            genre = book.genre
-            if genre not in self.books_by_category:
-                self.books_by_category[genre] = []
-            self.books_by_category[genre].append(book)
-        self.category_iter = iter(sorted(self.books_by_category.items()))
+    def __init__(self, books, start_genre=None, offset=0):
+        # Accept the library's maintained GenreIndex, or any iterable of books (indexed on the spot)
+        self.genre_index = books if isinstance(books, GenreIndex) else GenreIndex(books)
+        self.start_genre = start_genre
+        self.offset = offset
         self.current_category = None
-        self.book_iter = iter([])
+        self.items = self.walk()
+
+    def walk(self):
+        genres = self.genre_index.genres()
+        position = bisect_left(genres, self.start_genre) if self.start_genre is not None else 0
+        position += self.offset
+        while position < len(genres):
+            self.current_category = genres[position]
+            yield self.current_category
+            yield from self.genre_index.books(self.current_category)
+            position += 1
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        try:
-            return next(self.book_iter)
-        except StopIteration:
-            self.current_category, books = next(self.category_iter)
-            self.book_iter = iter(books)
-            return self.current_category
\ No newline at end of file
+        return next(self.items)
@@ -1,9 +1,12 @@
+import sys
 from Book import Book
 
 """
 This class implements the book factory design pattern.
+Author and genre strings repeat across many rows, so the factory interns them and all books share one copy.
 """
 class BookFactory:
     @staticmethod
     def create_book(title: str, author: str, is_loaned: bool, copies: int, genre: str, year: int) -> Book:
-        return Book(title=title, author=author, is_loaned=is_loaned, copies=copies, genre=genre, year=year)
+        return Book(title=title, author=sys.intern(author), is_loaned=is_loaned, copies=copies,
+                    genre=sys.intern(genre), year=year)
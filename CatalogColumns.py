@@ -0,0 +1,112 @@
+import numpy as np
+
+"""
+The CatalogColumns class is a columnar (NumPy) view of a Library's catalog, kept alongside the list of Book objects.
+Row i describes library.books[i]: copies, available and loaned counts, year and an integer genre code.
+Availability filters, totals and per-genre sums become vectorized operations instead of Python loops with dict lookups.
+"""
+
+class CatalogColumns:
+    def __init__(self, library):
+        self.library = library
+        self.rebuild()
+
+    def rebuild(self):
+        """Rebuild every column from the library's books."""
+        books = self.library.books
+        self.size = len(books)
+        capacity = max(16, self.size)
+        self.copies = np.zeros(capacity, dtype=np.int64)
+        self.available = np.zeros(capacity, dtype=np.int64)
+        self.loaned = np.zeros(capacity, dtype=np.int64)
+        self.year = np.zeros(capacity, dtype=np.int32)
+        self.genre_code = np.zeros(capacity, dtype=np.int32)
+        self.genres = []  # genre code -> genre name
+        self.genre_codes = {}  # genre name -> genre code
+        self.row_of = {}  # title -> row
+
+        available_copies = self.library.available_copies
+        loaned_books = self.library.loaned_books
+        self.copies[:self.size] = [book.copies for book in books]
+        self.available[:self.size] = [available_copies.get(book.title, 0) for book in books]
+        self.loaned[:self.size] = [loaned_books.get(book.title, 0) for book in books]
+        self.year[:self.size] = [book.year for book in books]
+        self.genre_code[:self.size] = [self.code_for(book.genre) for book in books]
+        for row, book in enumerate(books):
+            self.row_of[book.title] = row
+
+    def code_for(self, genre):
+        code = self.genre_codes.get(genre)
+        if code is None:
+            code = self.genre_codes[genre] = len(self.genres)
+            self.genres.append(genre)
+        return code
+
+    def append(self, book):
+        """Add the row of a book that was just appended to library.books (amortized O(1))."""
+        if self.size == len(self.copies):
+            for name in ("copies", "available", "loaned", "year", "genre_code"):
+                column = getattr(self, name)
+                grown = np.zeros(len(column) * 2, dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                setattr(self, name, grown)
+        row = self.size
+        self.size += 1
+        self.row_of[book.title] = row
+        self.year[row] = book.year
+        self.genre_code[row] = self.code_for(book.genre)
+        self.update_counts(book.title)
+
+    def update_counts(self, title):
+        """Refresh the copies/available/loaned cells of one title after a borrow or return."""
+        row = self.row_of.get(title)
+        if row is None:
+            return
+        self.copies[row] = self.library.books[row].copies
+        self.available[row] = self.library.available_copies.get(title, 0)
+        self.loaned[row] = self.library.loaned_books.get(title, 0)
+
+    def books_where(self, mask):
+        """Return the Book objects of the rows selected by a boolean mask."""
+        books = self.library.books
+        return [books[row] for row in np.flatnonzero(mask)]
+
+    def available_mask(self):
+        return self.available[:self.size] > 0
+
+    def loaned_mask(self):
+        """Titles with no copy left on the shelf."""
+        return self.available[:self.size] == 0
+
+    def available_books(self):
+        return self.books_where(self.available_mask())
+
+    def loaned_out_books(self):
+        return self.books_where(self.loaned_mask())
+
+    def totals(self):
+        """Return the total copies, available copies and loaned copies of the whole catalog."""
+        return {
+            "titles": self.size,
+            "copies": int(self.copies[:self.size].sum()),
+            "available": int(self.available[:self.size].sum()),
+            "loaned": int(self.loaned[:self.size].sum()),
+        }
+
+    def genre_totals(self):
+        """Return {genre: {"titles", "copies", "available", "loaned"}} computed with bincount."""
+        codes = self.genre_code[:self.size]
+        length = len(self.genres)
+        titles = np.bincount(codes, minlength=length)
+        copies = np.bincount(codes, weights=self.copies[:self.size], minlength=length)
+        available = np.bincount(codes, weights=self.available[:self.size], minlength=length)
+        loaned = np.bincount(codes, weights=self.loaned[:self.size], minlength=length)
+        return {
+            genre: {
+                "titles": int(titles[code]),
+                "copies": int(copies[code]),
+                "available": int(available[code]),
+                "loaned": int(loaned[code]),
+            }
+            for code, genre in enumerate(self.genres) if titles[code]
+        }
@@ -0,0 +1,93 @@
+import csv
+import gzip
+import json
+import os
+import time
+from types import SimpleNamespace
+from DynamicSearch import DynamicSearch
+from WaitingListManager import FIELDNAMES as WAITLIST_FIELDNAMES
+
+"""
+The CatalogExporter class streams library reports to a CSV or JSON-lines file, gzip-compressed if the path ends
+with ".gz". Every report is a generator that yields one row at a time from the current catalog snapshot, and the
+rows are written as they are produced, so the export never holds more than one row in memory whatever the catalog
+size. A report can be narrowed with the same search types the search screen uses (title, author, genre).
+"""
+
+class CatalogExporter:
+    REPORTS = {
+        "catalog": ["title", "author", "is_loaned", "copies", "genre", "year"],
+        "availability": ["title", "author", "available_copies", "genre", "year"],
+        "loans": ["title", "author", "loaned_copies", "in_waiting_list", "genre", "year"],
+        "waitlist": WAITLIST_FIELDNAMES,
+    }
+
+    def __init__(self, library):
+        self.library = library
+        self.dynamic_search = DynamicSearch()
+
+    def filtered_books(self, search_type=None, query=None):
+        books = self.library.books  # One snapshot for the whole export
+        if search_type and query:
+            return self.dynamic_search.iter_search(search_type, books, query)
+        return iter(books)
+
+    def rows(self, report, search_type=None, query=None):
+        """Yield the rows of a report ("catalog", "availability", "loans" or "waitlist")."""
+        if report not in self.REPORTS:
+            raise ValueError(f"Invalid report: {report}")
+        if report == "waitlist":
+            entries = self.library.waiting_list_manager.iter_entries()
+            if search_type and query:
+                # Entries carry title/author/genre too, so the search strategies can test them like books
+                matching = self.dynamic_search.iter_search(
+                    search_type, (SimpleNamespace(**entry) for entry in entries), query)
+                return (vars(entry) for entry in matching)
+            return entries
+        books = self.filtered_books(search_type, query)
+        if report == "availability":
+            return self.library.available_book_rows(books)
+        if report == "loans":
+            return self.library.loaned_book_rows(books)
+        return ({
+            "title": book.title,
+            "author": book.author,
+            "is_loaned": "Yes" if book.is_loaned else "No",
+            "copies": book.copies,
+            "genre": book.genre,
+            "year": book.year,
+        } for book in books)
+
+    def export(self, report, file_path, search_type=None, query=None):
+        """
+        Stream a report to `file_path`. The format follows the extension: .csv, .jsonl (or .json), optionally + .gz.
+        The file is written under a temporary name and swapped in when complete.
+
+        Returns:
+            dict: rows written, elapsed seconds and rows/sec.
+        """
+        start = time.perf_counter()
+        rows = self.rows(report, search_type, query)
+        compressed = file_path.lower().endswith(".gz")
+        json_lines = file_path.lower().removesuffix(".gz").endswith((".jsonl", ".json"))
+        temp_path = f"{file_path}.{os.getpid()}.tmp"
+        written = 0
+        with (gzip.open if compressed else open)(temp_path, "wt", newline="", encoding="utf-8") as file:
+            if json_lines:
+                for row in rows:
+                    file.write(json.dumps(row, ensure_ascii=False) + "\n")
+                    written += 1
+            else:
+                writer = csv.DictWriter(file, fieldnames=self.REPORTS[report])
+                writer.writeheader()
+                for row in rows:
+                    writer.writerow(row)
+                    written += 1
+        os.replace(temp_path, file_path)
+
+        elapsed = time.perf_counter() - start
+        return {
+            "rows": written,
+            "seconds": elapsed,
+            "rows_per_sec": written / elapsed if elapsed > 0 else float(written),
+        }
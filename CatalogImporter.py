@@ -0,0 +1,170 @@
+import csv
+import json
+import os
+import time
+from BookFactory import BookFactory
+from GenreIndex import GenreIndex
+from Library import file_signature
+
+"""
+The CatalogImporter class bulk-loads books from a CSV or JSON-lines file into a Library.
+Rows are streamed one at a time, duplicates are detected through the library's hashed (title, author, genre, year)
+index and their copies are merged, and new books are appended to the library files in batches instead of
+rewriting every file after each insert. Titles identify books, so a row whose title is already in the catalog with
+another author, genre or year is skipped. A shared library is imported into under its lock, like any other command.
+"""
+
+class CatalogImporter:
+    def __init__(self, library, batch_size=10000):
+        self.library = library
+        self.batch_size = batch_size
+
+    @staticmethod
+    def read_rows(file_path):
+        """Yield the raw rows of a .csv or .jsonl/.json file one by one."""
+        if file_path.lower().endswith((".jsonl", ".json")):
+            with open(file_path, "r", encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        try:
+                            yield json.loads(line)
+                        except json.JSONDecodeError:
+                            yield None  # Skipped like a malformed CSV row
+        else:
+            with open(file_path, "r", encoding="utf-8") as file:
+                yield from csv.DictReader(file)
+
+    @staticmethod
+    def parse_is_loaned(value):
+        """Accept both the CSV "Yes"/"No" format and JSON booleans."""
+        if isinstance(value, bool):
+            return value
+        return str(value or "").strip().lower() in ("yes", "true", "1")
+
+    def import_file(self, file_path):
+        """
+        Import all books from `file_path` into the library.
+
+        Returns:
+            dict: rows read, books added, rows merged into existing books, rows skipped, elapsed seconds and rows/sec.
+        """
+        with self.library.shared_lock():
+            self.library.pull_changes()  # Start from the other front desks' changes
+            try:
+                return self.import_rows(file_path)
+            finally:
+                self.library.push_changes()
+
+    def import_rows(self, file_path):
+        start = time.perf_counter()
+        rows = added = merged = skipped = 0
+        pending = []  # New books not yet published to the catalog and appended to the library files
+        books_by_title = {book.title: book for book in self.library.books}
+        self.library.columns = None  # Rebuild the columnar view once instead of row by row
+
+        for row in self.read_rows(file_path):
+            rows += 1
+            try:
+                book = BookFactory.create_book(
+                    title=row["title"],
+                    author=row["author"],
+                    is_loaned=self.parse_is_loaned(row.get("is_loaned")),
+                    copies=int(row["copies"]),
+                    genre=row["genre"],
+                    year=int(row["year"]),
+                )
+            except (KeyError, TypeError, ValueError):
+                skipped += 1
+                continue
+
+            existing = books_by_title.get(book.title)
+            if existing is not None:
+                if self.library.book_key(existing) != self.library.book_key(book):
+                    skipped += 1  # Another book with this title - the counts are kept per title
+                    continue
+                self.merge_copies(existing, book)
+                self.library.mark_changed(book.title)
+                merged += 1
+                continue
+
+            books_by_title[book.title] = book
+            self.library.books_by_key[self.library.book_key(book)] = book
+            self.library.mark_changed(book.title)
+            self.library.available_copies[book.title] = 0 if book.is_loaned else book.copies
+            self.library.loaned_books[book.title] = book.copies if book.is_loaned else 0
+            pending.append(book)
+            added += 1
+
+            if len(pending) >= self.batch_size:
+                self.library.publish(lambda catalog: catalog.extended(pending))
+                self.append_books(pending)
+                pending = []
+
+        self.library.publish(lambda catalog: catalog.extended(pending))
+        self.library.genre_index = GenreIndex(self.library.books)  # Regroup once rather than insert per row
+        if merged:
+            # Merged rows change books that are already on disk, so rewrite the files once at the end
+            self.library.update_books_file()
+            self.library.update_available_books_file()
+            self.library.update_loaned_books_file()
+        elif pending:
+            self.append_books(pending)
+        self.library.books_file_signature = file_signature(self.library.books_file)  # Our own write, not an edit
+
+        if added or merged:
+            self.library.notification_service.notify_all(f"{added} books have been imported to the library.")
+
+        elapsed = time.perf_counter() - start
+        return {
+            "rows": rows,
+            "added": added,
+            "merged": merged,
+            "skipped": skipped,
+            "seconds": elapsed,
+            "rows_per_sec": rows / elapsed if elapsed > 0 else float(rows),
+        }
+
+    def merge_copies(self, book, incoming):
+        """Merge the copies of a duplicate row into the book that is already in the library."""
+        book.copies += incoming.copies
+        if incoming.is_loaned:
+            self.library.loaned_books[book.title] = self.library.loaned_books.get(book.title, 0) + incoming.copies
+        else:
+            self.library.available_copies[book.title] = self.library.available_copies.get(book.title, 0) + incoming.copies
+        book.is_loaned = self.library.available_copies.get(book.title, 0) == 0
+
+    def append_books(self, books):
+        """Append a batch of new books to the books, available and loaned files."""
+        self.append_rows(self.library.books_file, ["title", "author", "is_loaned", "copies", "genre", "year"], [{
+            "title": book.title,
+            "author": book.author,
+            "is_loaned": "Yes" if book.is_loaned else "No",
+            "copies": book.copies,
+            "genre": book.genre,
+            "year": book.year,
+        } for book in books])
+        self.append_rows(self.library.available_books_file, ["title", "author", "available_copies", "genre", "year"], [{
+            "title": book.title,
+            "author": book.author,
+            "available_copies": self.library.available_copies[book.title],
+            "genre": book.genre,
+            "year": book.year,
+        } for book in books])
+        self.append_rows(self.library.loaned_books_file, ["title", "author", "loaned_copies", "in_waiting_list", "genre", "year"], [{
+            "title": book.title,
+            "author": book.author,
+            "loaned_copies": self.library.loaned_books[book.title],
+            "in_waiting_list": 0,  # A title that was just imported has no waiting clients yet
+            "genre": book.genre,
+            "year": book.year,
+        } for book in books])
+
+    @staticmethod
+    def append_rows(file_path, fieldnames, rows):
+        """Append rows to a CSV file, writing the header first if the file is missing or empty."""
+        write_header = not os.path.exists(file_path) or os.path.getsize(file_path) == 0
+        with open(file_path, "a", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=fieldnames)
+            if write_header:
+                writer.writeheader()
+            writer.writerows(rows)
@@ -0,0 +1,80 @@
+from bisect import bisect_right
+
+"""
+The CatalogSnapshot class is an immutable, versioned view of the library's list of books.
+Readers take the current snapshot (a single attribute read, no lock) and can iterate it while writers keep working:
+a writer never changes a snapshot, it publishes a new one. Books are stored in fixed-size chunks (tuples), so a new
+version shares every untouched chunk with the previous one - an append copies one chunk and the chunk table,
+a removal only rebuilds the chunks that contained the removed books.
+"""
+
+class CatalogSnapshot:
+    __slots__ = ("version", "chunks", "offsets", "size")
+    CHUNK_SIZE = 512
+
+    def __init__(self, version=0, chunks=(), offsets=()):
+        self.version = version
+        self.chunks = chunks  # Tuple of tuples of books
+        self.offsets = offsets  # Index of the first book of every chunk
+        self.size = offsets[-1] + len(chunks[-1]) if chunks else 0
+
+    @classmethod
+    def from_books(cls, books, version=0):
+        books = tuple(books)
+        chunks = tuple(books[start:start + cls.CHUNK_SIZE] for start in range(0, len(books), cls.CHUNK_SIZE))
+        return cls(version, chunks, tuple(range(0, len(books), cls.CHUNK_SIZE)))
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield from chunk
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("catalog index out of range")
+        position = bisect_right(self.offsets, index) - 1
+        return self.chunks[position][index - self.offsets[position]]
+
+    def bumped(self):
+        """Same books, next version (published when book state such as availability changed)."""
+        return CatalogSnapshot(self.version + 1, self.chunks, self.offsets)
+
+    def edited(self):
+        """Same books in new chunks, next version (published when book details such as the author changed)."""
+        return CatalogSnapshot.from_books(self, self.version + 1)
+
+    def extended(self, books):
+        """Return the next version with `books` appended, sharing all full chunks."""
+        books = tuple(books)
+        if not books:
+            return self.bumped()
+        chunks, offsets = list(self.chunks), list(self.offsets)
+        if chunks and len(chunks[-1]) < self.CHUNK_SIZE:
+            room = self.CHUNK_SIZE - len(chunks[-1])
+            chunks[-1] = chunks[-1] + books[:room]
+            books = books[room:]
+        for start in range(0, len(books), self.CHUNK_SIZE):
+            offsets.append(offsets[-1] + len(chunks[-1]) if chunks else 0)
+            chunks.append(books[start:start + self.CHUNK_SIZE])
+        return CatalogSnapshot(self.version + 1, tuple(chunks), tuple(offsets))
+
+    def appended(self, book):
+        return self.extended((book,))
+
+    def without(self, predicate):
+        """Return the next version without the books matching `predicate`; unaffected chunks are shared."""
+        chunks, offsets = [], []
+        start = 0
+        for chunk in self.chunks:
+            if any(predicate(book) for book in chunk):
+                chunk = tuple(book for book in chunk if not predicate(book))
+                if not chunk:
+                    continue
+            chunks.append(chunk)
+            offsets.append(start)
+            start += len(chunk)
+        return CatalogSnapshot(self.version + 1, tuple(chunks), tuple(offsets))
@@ -0,0 +1,106 @@
+import csv
+import threading
+from BookFactory import BookFactory
+from Library import Library, file_signature
+
+"""
+The CatalogWatcher class picks up edits made to books.csv outside the library (a spreadsheet, a script...).
+check() only stats the file: while its (mtime, size) signature is the one the library last loaded or wrote, nothing
+is read. When it changed, sync() reads the file once, hashes every row and compares the hashes with those of the
+books in memory, matched by title like loans, waiting lists and holds are, so fixing an author or a year is an update.
+Only the added, removed and updated books are then applied to the library, instead of reloading the whole catalog.
+A file with a row that can't be parsed (e.g. caught halfway through a save) is left alone until the next poll.
+"""
+
+class CatalogWatcher:
+    def __init__(self, library, interval=2.0):
+        self.library = library
+        self.interval = interval  # Seconds between two polls of the background thread
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @staticmethod
+    def row_hash(row):
+        """Hash of a books.csv row with its values normalised the way the library writes them."""
+        return hash((row["title"], row["author"], str(row["is_loaned"]).lower(), str(row["copies"]),
+                     row["genre"], str(row["year"])))
+
+    def changed(self):
+        """Check whether books.csv was modified since the library last loaded or wrote it."""
+        return file_signature(self.library.books_file) != self.library.books_file_signature
+
+    def read_rows(self):
+        """Return {title: (row hash, row)} for the rows of books.csv, or None if any row is half written or malformed."""
+        rows = {}
+        with open(self.library.books_file, "r", encoding="utf-8") as file:
+            for row in csv.DictReader(file):
+                try:
+                    int(row["year"])
+                    int(row["copies"])
+                    rows[row["title"]] = self.row_hash(row), row
+                except (KeyError, TypeError, ValueError):
+                    return None
+        return rows
+
+    def sync(self):
+        """
+        Diff books.csv against the catalog in memory and apply the differences.
+
+        Returns:
+            dict: the "added", "removed" and "updated" books, or None if the file could not be parsed (its signature
+            is not recorded, so the next check tries again).
+        """
+        with self.library.shared_lock():
+            self.library.pull_changes()  # Changes other front desks made are not external edits
+            signature = file_signature(self.library.books_file)
+            rows = self.read_rows() if signature is not None else {}
+            if rows is None:
+                return None
+            added, removed, updated = [], [], []
+            titles = set()
+            for book in self.library.books:
+                titles.add(book.title)
+                if book.title not in rows:
+                    removed.append(book)
+                elif rows[book.title][0] != self.row_hash(Library.book_row(book)):
+                    updated.append((book, rows[book.title][1]))
+            for title, (_, row) in rows.items():
+                if title not in titles:
+                    added.append(BookFactory.create_book(
+                        title=row["title"],
+                        author=row["author"],
+                        is_loaned=row["is_loaned"].lower() == "yes",
+                        copies=int(row["copies"]),
+                        genre=row["genre"],
+                        year=int(row["year"]),
+                    ))
+            if added or removed or updated:
+                self.library.apply_catalog_changes(added, removed, updated)
+            self.library.books_file_signature = signature
+        return {"added": added, "removed": removed, "updated": [book for book, _ in updated]}
+
+    def check(self):
+        """Sync if books.csv changed. Returns the changes, or None if the file was untouched."""
+        if not self.changed():
+            return None
+        return self.sync()
+
+    def start(self):
+        """Poll books.csv every `interval` seconds on a daemon thread."""
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name="catalog-watcher", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.check()
+            except (OSError, ValueError) as e:
+                print(f"Catalog watcher failed to sync the books file: {e}")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
@@ -1,26 +1,31 @@
-from typing import List
+from typing import Iterable, Iterator, List
 from Book import Book
-from SearchStrategy import SearchByTitle, SearchByAuthor, SearchByCategory, SearchStrategy
+from SearchStrategy import SearchByTitle, SearchByAuthor, SearchByCategory, RankedSearch, SearchStrategy
+from operation_metrics import timed_operation
+from profiling_hooks import profiled
 
 """
 This class implements dynamic search which is helped by the searchStrategy class.
 Its purpose is to implement the suggestions box of the relevant search type.
 """
 class DynamicSearch:
-    def __init__(self):
+    def __init__(self, popularity=None):
         # Map search types to their respective strategies
         self.strategy_map = {
             "title": SearchByTitle(),
             "author": SearchByAuthor(),
-            "genre": SearchByCategory()
+            "genre": SearchByCategory(),
+            "ranked": RankedSearch(popularity=popularity)  # popularity: callable returning {title: loans}
         }
 
+    @timed_operation("suggest")
+    @profiled("suggest")
     def suggest(self, search_type: str, books: List[Book], query: str) -> List[str]:
         """
         Generate suggestions based on the specified search type and query.
 
         Args:
-            search_type (str): The type of search ("title", "author", "genre").
+            search_type (str): The type of search ("title", "author", "genre", "ranked").
             books (List[Book]): The list of books to suggest from.
             query (str): The search query.
 
@@ -31,3 +36,34 @@ class DynamicSearch:
         if not strategy:
             raise ValueError(f"Invalid search type: {search_type}")
         return strategy.suggest(books, query)
+
+    def iter_search(self, search_type: str, books: Iterable[Book], query: str) -> Iterator[Book]:
+        """
+        Like search, but yields the matching books one at a time instead of building a list.
+
+        Raises:
+            ValueError: If the search type is unknown (checked before the first book is read).
+        """
+        strategy = self.strategy_map.get(search_type.lower())
+        if not strategy:
+            raise ValueError(f"Invalid search type: {search_type}")
+        return strategy.iter_search(books, query)
+
+    @timed_operation("search")
+    @profiled("search")
+    def search(self, search_type: str, books: List[Book], query: str) -> List[Book]:
+        """
+        Search books with the strategy of the specified search type.
+
+        Args:
+            search_type (str): The type of search ("title", "author", "genre", "ranked").
+            books (List[Book]): The list of books to search.
+            query (str): The search query.
+
+        Returns:
+            List[Book]: Books matching the query.
+        """
+        strategy = self.strategy_map.get(search_type.lower())
+        if not strategy:
+            raise ValueError(f"Invalid search type: {search_type}")
+        return strategy.search(books, query)
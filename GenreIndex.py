@@ -0,0 +1,53 @@
+from bisect import bisect_left, insort
+
+"""
+The GenreIndex class keeps the books grouped by genre, with each genre's books sorted by title.
+The Library updates it on every add and remove, so category views never have to regroup and sort the whole catalog.
+Updates are copy-on-write: a changed genre gets a new list, so an iterator walking the old one is never disturbed.
+"""
+
+class GenreIndex:
+    def __init__(self, books=()):
+        self.books_by_genre = {}  # genre -> list of books sorted by title
+        for book in books:
+            self.books_by_genre.setdefault(book.genre, []).append(book)
+        for genre_books in self.books_by_genre.values():
+            genre_books.sort(key=lambda book: book.title)
+        self.sorted_genres = sorted(self.books_by_genre)
+
+    def add(self, book):
+        """Insert a book in title order."""
+        if book.genre not in self.books_by_genre:
+            sorted_genres = list(self.sorted_genres)
+            insort(sorted_genres, book.genre)
+            self.sorted_genres = sorted_genres
+        genre_books = list(self.books_by_genre.get(book.genre, []))
+        insort(genre_books, book, key=lambda indexed: indexed.title)
+        self.books_by_genre[book.genre] = genre_books
+
+    def remove(self, book):
+        """Remove a book from its genre, dropping the genre once it is empty."""
+        if book.genre not in self.books_by_genre:
+            return
+        genre_books = list(self.books_by_genre[book.genre])
+        position = bisect_left(genre_books, book.title, key=lambda indexed: indexed.title)
+        while position < len(genre_books) and genre_books[position].title == book.title:
+            if genre_books[position] is book:
+                del genre_books[position]
+                break
+            position += 1
+        if genre_books:
+            self.books_by_genre[book.genre] = genre_books
+        else:
+            del self.books_by_genre[book.genre]
+            sorted_genres = list(self.sorted_genres)
+            del sorted_genres[bisect_left(sorted_genres, book.genre)]
+            self.sorted_genres = sorted_genres
+
+    def genres(self):
+        """Return the genres in sorted order."""
+        return self.sorted_genres
+
+    def books(self, genre):
+        """Return the books of a genre sorted by title."""
+        return self.books_by_genre.get(genre, [])
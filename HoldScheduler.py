@@ -0,0 +1,154 @@
+import csv
+import heapq
+import os
+import time
+
+"""
+The HoldScheduler class keeps the reservation holds of the library.
+When a returned copy is set aside for the next client on the waiting list, a hold with an expiry time is placed.
+Holds live in a min-heap ordered by expiry, so finding the expired ones is O(1) to peek and O(log n) per expiry,
+without scanning the waiting list or all the holds. Claimed and cancelled holds are deleted lazily from the heap.
+Every change is appended to the holds file, which is compacted when the scheduler is loaded.
+refresh() reloads the holds when another process sharing the file changed it since this scheduler last touched it.
+"""
+
+class HoldScheduler:
+    def __init__(self, holds_file="csv_files/holds.csv", hold_duration=48 * 3600):
+        self.holds_file = holds_file
+        self.hold_duration = hold_duration  # Seconds a client has to pick up a held copy
+        self.heap = []  # (expires_at, hold_id)
+        self.holds = {}  # hold_id -> hold dict, only open holds
+        self.holds_by_title = {}  # title -> {hold_id: hold}
+        self.next_id = 1
+        self.signature = None  # Identity of the holds file as this scheduler last read or wrote it
+        self.load_holds()
+
+    def load_holds(self):
+        """Replay the holds file, then rewrite it with the open holds only."""
+        if os.path.exists(self.holds_file):
+            with open(self.holds_file, "r", encoding="utf-8") as file:
+                for row in csv.DictReader(file):
+                    if not row.get("hold_id"):
+                        continue
+                    hold_id = int(row["hold_id"])
+                    self.next_id = max(self.next_id, hold_id + 1)
+                    if row["event"] == "placed" and row.get("expires_at"):
+                        self.index_hold({
+                            "hold_id": hold_id,
+                            "title": row["title"],
+                            "client": row["client"],
+                            "email_addr": row["email_addr"],
+                            "phone_num": row["phone_num"],
+                            "expires_at": float(row["expires_at"]),
+                        })
+                    elif row["event"] == "closed":
+                        self.unindex_hold(hold_id)
+        self.heap = [(hold["expires_at"], hold_id) for hold_id, hold in self.holds.items()]
+        heapq.heapify(self.heap)
+        self.compact()
+
+    def compact(self):
+        temp_path = f"{self.holds_file}.tmp"
+        with open(temp_path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["event", "hold_id", "title", "client", "email_addr", "phone_num", "expires_at"])
+            for hold in self.holds.values():
+                writer.writerow(self.placed_row(hold))
+        os.replace(temp_path, self.holds_file)
+        self.signature = self.file_signature()
+
+    def file_signature(self):
+        try:
+            stat = os.stat(self.holds_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def refresh(self):
+        """Reload the holds if the holds file was changed by someone else."""
+        if self.file_signature() != self.signature:
+            self.heap, self.holds, self.holds_by_title = [], {}, {}
+            self.load_holds()
+
+    @staticmethod
+    def placed_row(hold):
+        return ["placed", hold["hold_id"], hold["title"], hold["client"], hold["email_addr"], hold["phone_num"],
+                hold["expires_at"]]
+
+    def append_row(self, row):
+        with open(self.holds_file, "a", newline="", encoding="utf-8") as file:
+            csv.writer(file).writerow(row)
+        self.signature = self.file_signature()
+
+    def index_hold(self, hold):
+        self.holds[hold["hold_id"]] = hold
+        self.holds_by_title.setdefault(hold["title"], {})[hold["hold_id"]] = hold
+
+    def unindex_hold(self, hold_id):
+        hold = self.holds.pop(hold_id, None)
+        if hold is not None:
+            title_holds = self.holds_by_title.get(hold["title"], {})
+            title_holds.pop(hold_id, None)
+            if not title_holds:
+                self.holds_by_title.pop(hold["title"], None)
+        return hold
+
+    def place_hold(self, entry, now=None):
+        """Hold a copy of entry["title"] for the waiting-list client in `entry`. Returns the hold."""
+        now = time.time() if now is None else now
+        hold = {
+            "hold_id": self.next_id,
+            "title": entry["title"],
+            "client": entry["client"],
+            "email_addr": entry.get("email_addr", ""),
+            "phone_num": entry.get("phone_num", ""),
+            "expires_at": now + self.hold_duration,
+        }
+        self.next_id += 1
+        self.index_hold(hold)
+        heapq.heappush(self.heap, (hold["expires_at"], hold["hold_id"]))
+        self.append_row(self.placed_row(hold))
+        return hold
+
+    def close_hold(self, hold_id):
+        """Close a hold (claimed, expired or cancelled). Its heap entry is skipped when it surfaces."""
+        hold = self.unindex_hold(hold_id)
+        if hold is not None:
+            self.append_row(["closed", hold_id, hold["title"], "", "", "", ""])
+        return hold
+
+    def find_hold(self, title, client):
+        """Return the open hold of `client` on `title`, or None."""
+        for hold in self.holds_by_title.get(title, {}).values():
+            if hold["client"] == client:
+                return hold
+        return None
+
+    def claim(self, title, client):
+        """Close and return the client's hold on the title, or None if there is none."""
+        hold = self.find_hold(title, client)
+        return self.close_hold(hold["hold_id"]) if hold else None
+
+    def cancel_title(self, title):
+        """Cancel every hold on a title (e.g. the book was removed). Returns the cancelled holds."""
+        return [self.close_hold(hold_id) for hold_id in list(self.holds_by_title.get(title, {}))]
+
+    def held_copies(self, title):
+        return len(self.holds_by_title.get(title, {}))
+
+    def next_expiry(self):
+        """Return the earliest expiry time of an open hold, or None."""
+        while self.heap and self.heap[0][1] not in self.holds:
+            heapq.heappop(self.heap)  # Drop claimed/cancelled holds
+        return self.heap[0][0] if self.heap else None
+
+    def pop_expired(self, now=None):
+        """Close and return the holds whose expiry time has passed, earliest first."""
+        now = time.time() if now is None else now
+        expired = []
+        while self.heap and self.heap[0][0] <= now:
+            _, hold_id = heapq.heappop(self.heap)
+            hold = self.close_hold(hold_id)
+            if hold is not None:
+                expired.append(hold)
+        return expired
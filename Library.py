@@ -1,31 +1,202 @@
-from typing import List, Dict
 import csv
+import functools
+import heapq
 import os
+import threading
+import weakref
+from contextlib import contextmanager, nullcontext
 from BookFactory import BookFactory
+from CatalogSnapshot import CatalogSnapshot
+from GenreIndex import GenreIndex
+from HoldScheduler import HoldScheduler
+from LoanHistory import LoanHistory, DAY
+from metrics_registry import metrics
+from Recommender import Recommender
+from SharedStore import SharedStore
 from WaitingListManager import WaitingListManager
 from notification_service import NotificationService, EmailNotifier, SMSNotifier
+from operation_metrics import timed_operation
+from profiling_hooks import profiled
 
 
 """
 The Library class manages the books in a library system.
 It handles the book data from the books.csv file and keeps track of available/loaned copies in the available_books.csv & loaned_books.csv files.
+`books` is an immutable CatalogSnapshot: readers iterate the version they grabbed without locking, writers publish new versions.
 """
 
+
+@contextmanager
+def replacing(file_path):
+    """Write to a temporary file and atomically swap it in, so readers never see a half-written CSV."""
+    temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w", newline="", encoding="utf-8") as file:
+        yield file
+        written = file.tell()
+    os.replace(temp_path, file_path)
+    metrics.observe("library_flush_bytes", written, file=os.path.basename(file_path))
+
+def file_signature(file_path):
+    """(mtime, size) of a file, or None if it does not exist - cheap to poll for external changes."""
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def shared_command(method):
+    """
+    Run a command of a shared library under the cross-process lock: the other processes' changes are pulled first,
+    so the command and the files it rewrites start from the current state, then the titles it changed are pushed.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.store is None:
+            return method(self, *args, **kwargs)
+        with self.store.file_lock:
+            self.pull_changes()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.push_changes()
+    return wrapper
+
 class Library:
-    def __init__(self, books_file="csv_files/books.csv", available_books_file="csv_files/available_books.csv", loaned_books_file="csv_files/loaned_books.csv"):
+    def __init__(self, books_file="csv_files/books.csv", available_books_file="csv_files/available_books.csv", loaned_books_file="csv_files/loaned_books.csv", waiting_list_file="csv_files/waiting_list.csv", holds_file="csv_files/holds.csv", hold_duration=48 * 3600, loan_history_dir="csv_files/loan_history", shared=False):
         self.books_file = books_file
         self.available_books_file = available_books_file
         self.loaned_books_file = loaned_books_file
-        self.books = []  # List to store book objects
+        self.catalog = CatalogSnapshot()  # Current immutable version of the book list
+        self.catalog_lock = threading.Lock()  # Serializes writers publishing a new catalog version
         self.available_copies = {}  # Dictionary to track available copies
         self.loaned_books = {} # Dictionary to track loaned copies
-        self.waiting_list_manager = WaitingListManager("csv_files/waiting_list.csv")  # Initialize the waiting list manager
-        self.notification_service = NotificationService()  # Initialize the notification service
-
-        self.load_books_to_memory()
-
+        self.books_by_key = {}  # Hashed (title, author, genre, year) index used for duplicate detection
+        self.columns = None  # Columnar NumPy view of the catalog, built on first use by column_view()
+        self.books_file_signature = None  # file_signature() of books.csv as last loaded or written by this library
+        self.genre_index = GenreIndex()  # Genre -> books sorted by title, used by BookCategoryIterator
+        # With `shared`, other processes may use the same files at the same time (see SharedStore)
+        self.store = SharedStore(os.path.dirname(books_file) or ".") if shared else None
+        self.changed_titles = set()  # Titles changed by the running command, pushed to the shared store
+        with self.shared_lock():
+            self.waiting_list_manager = WaitingListManager(  # Initialize the waiting list manager
+                waiting_list_file, file_lock=self.store.file_lock if self.store else None)
+            self.notification_service = NotificationService()  # Initialize the notification service
+            self.hold_scheduler = HoldScheduler(holds_file, hold_duration)  # Copies set aside for notified clients
+            self.loan_history = LoanHistory(loan_history_dir)  # Every borrow/return, with rolling popularity buckets
+            self.recommender = Recommender()  # "Patrons also borrowed", built on the first recommend()
+            self.recommendations_loaded = False  # Whether the loan history was replayed into the recommender
+            self.recommendations_lock = threading.Lock()
+
+            self.load_books_to_memory()
+            if self.store is not None:
+                self.store.pull()  # The files just loaded already hold every change logged so far
+        if metrics.enabled:
+            library = weakref.ref(self)  # The gauge must not keep a discarded library alive
+
+            def waitlist_depth():
+                current = library()
+                return current.waiting_list_manager.live if current is not None else None
+
+            metrics.gauge("library_waitlist_depth", waitlist_depth)
+
+    @property
+    def books(self):
+        """The current catalog snapshot - safe to iterate while other threads add or remove books."""
+        return self.catalog
+
+    def publish(self, update):
+        """Publish the catalog version produced by `update(current_snapshot)`."""
+        with self.catalog_lock:
+            self.catalog = update(self.catalog)
+
+    def shared_lock(self):
+        """The cross-process lock of a shared library, else a no-op context."""
+        return self.store.file_lock if self.store is not None else nullcontext()
+
+    def mark_changed(self, title):
+        if self.store is not None:
+            self.changed_titles.add(title)
+
+    def pull_changes(self):
+        """
+        Apply the changes other processes pushed to the shared store since the last pull; only the new rows of the
+        change log are read. The waiting list and holds catch up too. Returns the number of changes applied.
+        """
+        if self.store is None:
+            return 0
+        with self.store.file_lock:
+            changes = self.store.pull()
+            self.waiting_list_manager.refresh()
+            self.hold_scheduler.refresh()
+            if not changes:
+                return 0
+            books = {book.title: book for book in self.books}
+            added, removed = [], set()
+            for change in changes:
+                title = change["title"]
+                book = books.pop(title, None)
+                if change["op"] == "drop":
+                    if book is not None:
+                        removed.add(id(book))
+                        self.genre_index.remove(book)
+                        self.books_by_key.pop(self.book_key(book), None)
+                        self.available_copies.pop(title, None)
+                        self.loaned_books.pop(title, None)
+                        self.recommender.remove_title(title)
+                    continue
+                if book is None:
+                    book = BookFactory.create_book(title=title, author=change["author"], is_loaned=False,
+                                                   copies=0, genre=change["genre"], year=int(change["year"]))
+                    added.append(book)
+                    self.books_by_key[self.book_key(book)] = book
+                    self.genre_index.add(book)
+                books[title] = book
+                book.copies = int(change["copies"])
+                book.is_loaned = change["is_loaned"] == "Yes"
+                self.available_copies[title] = int(change["available_copies"])
+                self.loaned_books[title] = int(change["loaned_copies"])
+            added = [book for book in added if id(book) not in removed]
+            if removed:
+                self.publish(lambda catalog: catalog.without(lambda book: id(book) in removed))
+            self.publish(lambda catalog: catalog.extended(added))  # Also bumps the version after updates
+            self.columns = None  # Rebuilt on next use
+            self.books_file_signature = file_signature(self.books_file)  # The other process wrote these changes
+            return len(changes)
+
+    def push_changes(self):
+        """Append the current state of the titles changed by the last command to the shared store."""
+        if self.store is None or not self.changed_titles:
+            return
+        books = {book.title: book for book in self.books if book.title in self.changed_titles}
+        changes = []
+        for title in sorted(self.changed_titles):
+            book = books.get(title)
+            if book is None:
+                changes.append({"op": "drop", "title": title})
+            else:
+                changes.append(dict(self.book_row(book), op="put", available_copies=self.available_copies.get(title, 0),
+                                    loaned_copies=self.loaned_books.get(title, 0)))
+        self.changed_titles = set()
+        self.store.push(changes)
+
+    @classmethod
+    def from_directory(cls, data_dir, **kwargs):
+        """Create a library whose CSV files all live in `data_dir` (books.csv, available_books.csv, ...)."""
+        return cls(
+            books_file=os.path.join(data_dir, "books.csv"),
+            available_books_file=os.path.join(data_dir, "available_books.csv"),
+            loaned_books_file=os.path.join(data_dir, "loaned_books.csv"),
+            waiting_list_file=os.path.join(data_dir, "waiting_list.csv"),
+            holds_file=os.path.join(data_dir, "holds.csv"),
+            loan_history_dir=os.path.join(data_dir, "loan_history"),
+            **kwargs,
+        )
+
+    @profiled("load")
     def load_books_to_memory(self):
         """Load books from the books file to the memory and initialize available copies."""
+        books = []
+        self.books_file_signature = file_signature(self.books_file)
         if os.path.exists(self.books_file):
             with open(self.books_file, "r", encoding="utf-8") as file:
                 reader = csv.DictReader(file)
@@ -38,7 +209,10 @@ class Library:
                         genre=row["genre"],
                         year=int(row["year"]),
                     )
-                    self.books.append(book)
+                    books.append(book)
+                    self.books_by_key[self.book_key(book)] = book
+        self.publish(lambda catalog: CatalogSnapshot.from_books(books, catalog.version + 1))
+        self.genre_index = GenreIndex(books)  # Group and sort once instead of inserting row by row
 
         # Initialize `available_copies` based on the `available_books_file`
         if os.path.exists(self.available_books_file):
@@ -67,64 +241,82 @@ class Library:
 
 
 
-    def update_loaned_books_file(self):
-        """
-        Update or create the loaned_books.csv file based on current books and available copies.
-        """
-        loaned_books_data = []
-
-        # Calculate loaned books data
-        for book in self.books:
-            total_copies = book.copies
-            available_copies = self.available_copies.get(book.title, 0)
-            loaned_copies = total_copies - available_copies
-            in_waiting_list = self.waiting_list_manager.count_waiting_list(book.title)
+    def column_view(self):
+        """Return the columnar view of the catalog, building it the first time it is needed."""
+        if self.columns is None:
+            metrics.inc("library_cache_requests_total", cache="columns", result="miss")
+            from CatalogColumns import CatalogColumns  # NumPy is only loaded by callers that use the view
+            self.columns = CatalogColumns(self)
+        else:
+            metrics.inc("library_cache_requests_total", cache="columns", result="hit")
+        return self.columns
+
+    @staticmethod
+    def book_key(book):
+        """Return the composite key that identifies a book as a duplicate of another."""
+        return book.title, book.author, book.genre, int(book.year)
+
+    def loaned_book_rows(self, books=None):
+        """Yield the loaned_books.csv row of every book (or of `books`), one at a time."""
+        waiting_counts = self.waiting_list_manager.count_waiting_lists()  # One pass over the waiting list
+        for book in self.books if books is None else books:
+            yield {
+                "title": book.title,
+                "author": book.author,
+                "loaned_copies": book.copies - self.available_copies.get(book.title, 0),
+                "in_waiting_list": waiting_counts.get(book.title.lower(), 0),
+                "genre": book.genre,
+                "year": book.year,
+            }
 
-            loaned_books_data.append({
+    def available_book_rows(self, books=None):
+        """Yield the available_books.csv row of every book (or of `books`), one at a time."""
+        for book in self.books if books is None else books:
+            yield {
                 "title": book.title,
                 "author": book.author,
-                "loaned_copies": loaned_copies,
-                "in_waiting_list": in_waiting_list,
+                "available_copies": self.available_copies.get(book.title, book.copies),
                 "genre": book.genre,
                 "year": book.year,
-            })
+            }
 
-        # Write loaned_books.csv
-        with open(self.loaned_books_file, "w", newline="", encoding="utf-8") as file:
+    def update_loaned_books_file(self):
+        """
+        Update or create the loaned_books.csv file based on current books and available copies.
+        """
+        with replacing(self.loaned_books_file) as file:
             fieldnames = ["title", "author", "loaned_copies", "in_waiting_list", "genre", "year"]
             writer = csv.DictWriter(file, fieldnames=fieldnames)
             writer.writeheader()
-            writer.writerows(loaned_books_data)
+            writer.writerows(self.loaned_book_rows())  # Streamed row by row, no list of the whole catalog
 
 
     def update_available_books_file(self):
         """Save the current available books state to the available_books file."""
-        with open(self.available_books_file, "w", newline="", encoding="utf-8") as file:
+        with replacing(self.available_books_file) as file:
             writer = csv.DictWriter(file, fieldnames=["title", "author", "available_copies", "genre", "year"])
             writer.writeheader()
-            for book in self.books:
-                writer.writerow({
-                    "title": book.title,
-                    "author": book.author,
-                    "available_copies": self.available_copies.get(book.title, book.copies),
-                    "genre": book.genre,
-                    "year": book.year,
-                })
+            writer.writerows(self.available_book_rows())
+
+    @staticmethod
+    def book_row(book):
+        """The books.csv row of a book."""
+        return {
+            "title": book.title,
+            "author": book.author,
+            "is_loaned": "Yes" if book.is_loaned else "No",  # Convert to "Yes"/"No"
+            "copies": book.copies,
+            "genre": book.genre,
+            "year": book.year,
+        }
 
     def update_books_file(self):
         """Save the current state of all books to the books.csv file."""
-        with open(self.books_file, "w", newline="", encoding="utf-8") as file:
+        with replacing(self.books_file) as file:
             writer = csv.DictWriter(file, fieldnames=["title", "author", "is_loaned", "copies", "genre", "year"])
             writer.writeheader()
-            for book in self.books:
-                writer.writerow({
-                    "title": book.title,
-                    "author": book.author,
-                    "is_loaned": "Yes" if book.is_loaned else "No",  # Convert to "Yes"/"No"
-                    "copies": book.copies,
-                    "genre": book.genre,
-                    "year": book.year,
-                })
+            writer.writerows(self.book_row(book) for book in self.books)
+        self.books_file_signature = file_signature(self.books_file)  # Our own write - watchers can skip it
 
     def switch_is_loaned_state(self, title):
         """Switch the is_loaned state based on available copies."""
@@ -137,6 +329,10 @@ class Library:
                     book.is_loaned = True
                 else:
                     book.is_loaned = False
+                if self.columns is not None:
+                    self.columns.update_counts(title)
+                self.mark_changed(title)
+                self.publish(CatalogSnapshot.bumped)  # Availability changed - views keyed on the version refresh
 
                 # Save the updated is_loaned state to the books.csv file
                 self.update_books_file()
@@ -147,21 +343,36 @@ class Library:
 
 
 
-    def borrow_book(self, title):
+    @timed_operation("borrow")
+    @profiled("borrow")
+    @shared_command
+    def borrow_book(self, title, client=None):
         """
         Borrow a book, or return information about its availability.
+        A client that was notified from the waiting list picks up the copy held for them by passing `client`.
         Returns:
             - "book borrowed successfully" if the book was successfully borrowed.
             - "book borrowed fail - no available copies" if the book is currently unavailable.
             - Raises ValueError if the book does not exist.
         """
+        self.expire_holds()
         # Check if the book is in the system
         if title in self.available_copies:
+            # The held copy is already counted as loaned, so it just changes hands
+            if client is not None and self.hold_scheduler.claim(title, client):
+                self.loan_history.record("borrow", title, client)
+                metrics.inc("library_borrows_total")
+                self.record_co_borrow(client, title)
+                self.notification_service.notify_all(f"The book '{title}' has been borrowed.")
+                return "book borrowed successfully"
             # Check if there are available copies to lend
             if self.available_copies[title] > 0:
                 self.available_copies[title] -= 1
                 self.loaned_books[title] += 1
                 self.switch_is_loaned_state(title)
+                self.loan_history.record("borrow", title, client)
+                metrics.inc("library_borrows_total")
+                self.record_co_borrow(client, title)
                 self.notification_service.notify_all(f"The book '{title}' has been borrowed.")
                 return "book borrowed successfully"
             else: # If there are no available copies -> start waiting list sequence BEEP BOP
@@ -170,17 +381,23 @@ class Library:
             raise ValueError(f"'{title}' does not exist in the library.")
 
 
+    @timed_operation("return")
+    @profiled("return")
+    @shared_command
     def return_book(self, title):
-        """Return a book, notify the next client if there's a waiting list."""
+        """Return a book, notify the next client and hold the copy for them if there's a waiting list."""
         try:
+            self.expire_holds()
             for book in self.books:
                 if book.title == title:
                     if self.available_copies[title] < book.copies:
 
                         # Notify the first client on the waiting list
-                        waiting_list = self.waiting_list_manager.get_waiting_list_for_book(title)
-                        if waiting_list: # If there is a waiting list for that book
-                            next_client = self.waiting_list_manager.notify_next_client(title)
+                        next_client = self.waiting_list_manager.notify_next_client(title)
+                        self.loan_history.record("return", title)
+                        metrics.inc("library_returns_total")
+                        if next_client: # If there is a waiting list for that book
+                            self.hold_scheduler.place_hold(next_client)
                             self.switch_is_loaned_state(title)
                             return f"book '{title}' returned successfully, notified '{next_client['client']}'"
 
@@ -196,22 +413,58 @@ class Library:
 
 
 
+    @shared_command
+    def expire_holds(self, now=None):
+        """
+        Roll every expired hold over to the next client on the waiting list, or put the copy back on the shelf.
+        Only the expired holds are touched (heap pops), so this is cheap to call before every borrow/return.
+        """
+        messages = []
+        for hold in self.hold_scheduler.pop_expired(now):
+            title = hold["title"]
+            if title not in self.available_copies:
+                continue
+            next_client = self.waiting_list_manager.notify_next_client(title)
+            if next_client:
+                self.hold_scheduler.place_hold(next_client, now)
+                messages.append(f"hold of '{hold['client']}' on '{title}' expired, notified '{next_client['client']}'")
+            else:
+                self.available_copies[title] += 1
+                self.loaned_books[title] -= 1
+                self.switch_is_loaned_state(title)
+                messages.append(f"hold of '{hold['client']}' on '{title}' expired, copy returned to the shelf")
+        return messages
+
+    @shared_command
+    def join_waiting_list(self, title, author, genre, year, client, email="", phone=""):
+        """
+        Add a client to the waiting list of a book and rewrite loaned_books.csv with the new count.
+        Raises ValueError if the client is already waiting for it.
+        """
+        self.waiting_list_manager.add_to_waiting_list(title, author, genre, year, client, email, phone)
+        self.update_loaned_books_file()
+
+    @timed_operation("add")
+    @profiled("add")
+    @shared_command
     def add_book(self, book):
         """Add a book to the library."""
         try:
-            for book in self.books: # Check if book already exists in the library
-                if (book.title == book.title
-                        and book.author == book.author
-                        and book.genre == book.genre
-                        and book.year == book.year):
-                    raise ValueError(f"'{book.title}' already exists in the library.")
-            self.books.append(book)
+            key = self.book_key(book)
+            if key in self.books_by_key: # Check if book already exists in the library
+                raise ValueError(f"'{book.title}' already exists in the library.")
+            self.publish(lambda catalog: catalog.appended(book))
+            self.books_by_key[key] = book
+            self.genre_index.add(book)
             if book.is_loaned:  # If the book is marked as loaned
                 self.available_copies[book.title] = 0  # All copies are loaned out
                 self.loaned_books[book.title] = book.copies  # Loaned copies equal total copies
             else:  # If the book is not loaned
                 self.available_copies[book.title] = book.copies  # All copies are available
                 self.loaned_books[book.title] = 0  # No copies are loaned
+            if self.columns is not None:
+                self.columns.append(book)
+            self.mark_changed(book.title)
 
             # Notify users
             self.notification_service.notify_all(f"Book '{book.title}' has been added to the library.")
@@ -225,18 +478,28 @@ class Library:
             raise RuntimeError(f"Book added fail: {str(e)}")
 
 
+    @timed_operation("remove")
+    @profiled("remove")
+    @shared_command
     def remove_book(self, title):
         """Remove a book and notify clients on the waiting list."""
         # Check if the book is in the system
         try:
-            original_length = len(self.books)
-            self.books = [book for book in self.books if book.title != title]
-            if len(self.books) == original_length:
+            removed_books = [book for book in self.books if book.title == title]
+            if not removed_books:
                 raise ValueError(f"'{title}' not found in the library.")
+            self.publish(lambda catalog: catalog.without(lambda book: book.title == title))
+            for book in removed_books:
+                self.genre_index.remove(book)
+            self.books_by_key = {key: book for key, book in self.books_by_key.items() if key[0] != title}
+            self.columns = None  # Rows shifted - rebuild the columnar view on next use
             # Delete the book from all listings + update the miss fortunes clients that waited for it
             self.available_copies.pop(title, None)
             self.loaned_books.pop(title, None)
             self.waiting_list_manager.remove_waiting_list_for_book(title)
+            self.hold_scheduler.cancel_title(title)
+            self.recommender.remove_title(title)
+            self.mark_changed(title)
             self.notification_service.notify_all(f"Book '{title}' has been removed from the library.")
             self.update_available_books_file()
             self.update_loaned_books_file()
@@ -245,30 +508,125 @@ class Library:
         except Exception:
             return f"book '{title}' removed fail"
 
-    def popular_books(self):
+    @shared_command
+    def apply_catalog_changes(self, added=(), removed=(), updated=()):
         """
-        Returns the top 5 popular books based on the sum of loaned_copies and in_waiting_list.
+        Apply book rows that were changed outside the library (see CatalogWatcher) without reloading the catalog.
+        `added` and `removed` are books, `updated` holds (book, books.csv row) pairs. Only the touched books and titles
+        are updated in the indexes; books.csv already holds the changes, so only the availability files are rewritten.
+        Waiting lists and holds are never dropped here: a diff of a file edited by hand is no reason to lose them.
         """
-        popular_books_data = []
-
-        # Load loaned_books data
-        if os.path.exists(self.loaned_books_file):
-            with open(self.loaned_books_file, "r", encoding="utf-8") as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    loaned_copies = int(row["loaned_copies"])
-                    in_waiting_list = int(row["in_waiting_list"])
-                    popularity_score = loaned_copies + in_waiting_list
-
-                    popular_books_data.append({
-                        "title": row["title"],
-                        "author": row["author"],
-                        "popularity": popularity_score,
-                        "genre": row["genre"],
-                        "year": row["year"],
-                    })
-
-        # Sort books by popularity in descending order and get the top 5
-        top_books = sorted(popular_books_data, key=lambda x: x["popularity"], reverse=True)[:5]
+        removed_books = {id(book) for book in removed}
+        if removed_books:
+            self.publish(lambda catalog: catalog.without(lambda book: id(book) in removed_books))
+        for book in removed:
+            self.mark_changed(book.title)
+            self.genre_index.remove(book)
+            self.books_by_key.pop(self.book_key(book), None)
+            self.available_copies.pop(book.title, None)
+            self.loaned_books.pop(book.title, None)
+            self.recommender.remove_title(book.title)
+
+        for book, row in updated:
+            self.mark_changed(book.title)
+            self.books_by_key.pop(self.book_key(book), None)
+            self.genre_index.remove(book)
+            book.author, book.genre, book.year = row["author"], row["genre"], int(row["year"])
+            self.books_by_key[self.book_key(book)] = book
+            self.genre_index.add(book)
+            # Copies added or withdrawn by the edit go to (or come from) the shelf; loans stay as they are
+            copies = int(row["copies"])
+            available = max(0, self.available_copies.get(book.title, 0) + copies - book.copies)
+            book.copies = copies
+            self.available_copies[book.title] = available
+            self.loaned_books[book.title] = max(0, copies - available)
+            book.is_loaned = available == 0
+        if updated:
+            self.publish(CatalogSnapshot.edited)  # Indexes over the chunks (e.g. the search index) are rebuilt
+
+        for book in added:
+            self.mark_changed(book.title)
+            self.books_by_key[self.book_key(book)] = book
+            self.genre_index.add(book)
+            self.available_copies[book.title] = 0 if book.is_loaned else book.copies
+            self.loaned_books[book.title] = book.copies if book.is_loaned else 0
+        self.publish(lambda catalog: catalog.extended(added))  # Also bumps the version after updates
+
+        self.columns = None  # Rebuilt on next use
+        self.update_available_books_file()
+        self.update_loaned_books_file()
+        self.notification_service.notify_all(
+            f"Books file changed: {len(added)} added, {len(removed)} removed, {len(updated)} updated.")
+
+    def recommend(self, title, count=5):
+        """Return up to `count` titles that the clients who borrowed `title` also borrowed."""
+        self.load_recommendations()
+        return self.recommender.recommend(title, count)
+
+    def load_recommendations(self):
+        """Replay the loan history into the recommender on first use, so opening the library doesn't scan it."""
+        with self.recommendations_lock:
+            if not self.recommendations_loaded:
+                self.recommender.replay(self.catalog_loan_events())
+                self.recommendations_loaded = True
+
+    def record_co_borrow(self, client, title):
+        """Count a borrow in the recommender once it is loaded; until then the loan history holds it."""
+        with self.recommendations_lock:
+            if self.recommendations_loaded:
+                self.recommender.record_borrow(client, title)
+
+    def rebuild_recommendations(self):
+        """Recompute the co-borrow matrix from the whole loan history in one batch (e.g. nightly)."""
+        with self.recommendations_lock:
+            self.recommender.rebuild(self.catalog_loan_events())
+            self.recommendations_loaded = True
+
+    def catalog_loan_events(self):
+        """Loan history events of the titles still in the catalog."""
+        return (event for event in self.loan_history.events() if event["title"] in self.available_copies)
+
+    @timed_operation("popular")
+    @profiled("popular")
+    def popular_books(self, count=5, days=None):
+        """
+        Returns the top 5 (or `count`) popular books based on the sum of loaned_copies and in_waiting_list.
+        With `days`, popularity is the number of borrows in the last `days` days instead, read from the loan history.
+        """
+        if days is None:
+            return self.popular_books_from_file(self.loaned_books_file, count)
+        books_by_title = {book.title: book for book in self.books}
+        top_books = []
+        for title, borrows in self.loan_history.top_titles(len(books_by_title), days):
+            book = books_by_title.get(title)
+            if book is not None:  # Skip titles removed since they were borrowed
+                top_books.append({
+                    "title": book.title,
+                    "author": book.author,
+                    "popularity": borrows,
+                    "genre": book.genre,
+                    "year": book.year,
+                })
+                if len(top_books) == count:
+                    break
         return top_books
 
+    def loan_counts(self, days=30):
+        """Return a Counter of borrows per title in the last `days` days (the popularity used to rank searches)."""
+        return self.loan_history.borrow_counts(days * DAY)
+
+    @staticmethod
+    def popular_books_from_file(loaned_books_file, count=5):
+        """Read a loaned_books file and return its `count` most popular books."""
+        if not os.path.exists(loaned_books_file):
+            return []
+        with open(loaned_books_file, "r", encoding="utf-8") as file:
+            rows = ({
+                "title": row["title"],
+                "author": row["author"],
+                "popularity": int(row["loaned_copies"]) + int(row["in_waiting_list"]),
+                "genre": row["genre"],
+                "year": row["year"],
+            } for row in csv.DictReader(file))
+            # Keep only the top `count` while streaming the file instead of sorting every row
+            return heapq.nlargest(count, rows, key=lambda book: book["popularity"])
@@ -5,18 +5,17 @@ from BookCategoryIterator import BookCategoryIterator
 from Library import Library
 from UserManager import UserManager
 from BookFactory import BookFactory
-from SearchStrategy import SearchByTitle, SearchByAuthor, SearchByCategory
 from log_decorator import log_decorator
 from DynamicSearch import DynamicSearch
+from ScreenManager import ScreenManager, fill_labels
+from LibraryService import LibraryService
+from metrics_registry import serve_from_environment
+from CatalogWatcher import CatalogWatcher
 
 
 
 class LibraryGUI:
     def __init__(self):
-        # Clear log file at the start of the program
-        with open("log.txt", "w", encoding="utf-8") as log_file:
-            log_file.write("")  # Wipe all previous logs
-
         self.root = tk.Tk()
         self.root.title("Library Management System")
 
@@ -36,33 +35,109 @@ class LibraryGUI:
         self.root.geometry(f"{window_width}x{window_height}+{x}+{y}")
 
         # Continue with other initializations
-        self.dynamic_search = DynamicSearch()
-        self.library = Library()
+        serve_from_environment()  # Before the library is built, so it registers its gauges
+        self.library = Library(shared=True)  # Other GUIs and batch jobs may use csv_files at the same time
+        # Ranked searches favour the books borrowed most in the last 30 days among equally relevant ones
+        self.dynamic_search = DynamicSearch(popularity=self.library.loan_counts)
+        self.service = LibraryService(self.library)  # Library commands run on a worker thread, not the Tk thread
+        self.catalog_watcher = CatalogWatcher(self.library)  # Picks up edits made to books.csv outside the GUI
         self.user_manager = UserManager()
         self.current_user = None
+        self.screens = ScreenManager(self.root)  # Every screen is built once, then hidden and shown
+        self.create_status_bar()
         self.create_login_register_menu()
+        self.root.after(60000, self.expire_holds)
+        self.root.after(2000, self.watch_books_file)
         self.root.mainloop()
 
+    # Periodically hands expired reservation holds over to the next waiting client
+    def expire_holds(self):
+        def log_messages(future):
+            for message in future.result():
+                log_decorator(lambda: message)()
+            self.root.after(60000, self.expire_holds)
+
+        self.run_in_background(self.service.call("expire_holds"), log_messages, message=None)
+
+    # Periodically pulls the changes of other front desks and applies external edits of books.csv;
+    # the changed catalog version refreshes the book lists
+    def watch_books_file(self):
+        def sync(library):
+            library.pull_changes()
+            return self.catalog_watcher.check()
+
+        def log_changes(future):
+            try:
+                changes = future.result()
+            except (OSError, ValueError) as e:  # e.g. the file is being rewritten - try again next time
+                changes = None
+                log_decorator(lambda: f"Books file reload failed: {e}")()
+            if changes:
+                log_decorator(lambda: "Books file reloaded: " + ", ".join(
+                    f"{len(books)} {change}" for change, books in changes.items()))()
+            self.root.after(2000, self.watch_books_file)
+
+        self.run_in_background(self.service.submit(sync), log_changes, message=None)
+
+    # Status bar with a progress indicator, shown while background commands are running
+    def create_status_bar(self):
+        self.running_commands = 0
+        self.status_bar = tk.Frame(self.root)
+        self.status_label = tk.Label(self.status_bar)
+        self.status_label.pack(side=tk.LEFT, padx=10)
+        self.progress = ttk.Progressbar(self.status_bar, mode="indeterminate", length=150)
+        self.progress.pack(side=tk.RIGHT, padx=10)
+
+    def run_in_background(self, future, on_done, message="Working..."):
+        """
+        Wait for `future` without blocking the main loop, then call `on_done(future)` on the Tk thread.
+        The future is polled with root.after, so Tk widgets are only ever touched from the main loop.
+        """
+        if message:
+            self.running_commands += 1
+            self.status_label.config(text=message)
+            self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+            self.progress.start(10)
+
+        def poll():
+            if not future.done():
+                self.root.after(50, poll)
+                return
+            if message:
+                self.running_commands -= 1
+                if not self.running_commands:
+                    self.progress.stop()
+                    self.status_bar.pack_forget()
+            on_done(future)
+
+        poll()
+
+    def catalog_version(self):
+        """Version of the data the book lists show - changes whenever a book or its availability changes."""
+        return self.library.books.version
+
     # Displays the initial menu with options to log in or register
     def create_login_register_menu(self):
-        self.clear_window()
+        self.screens.show("welcome", self.build_login_register_menu)
 
-        tk.Label(self.root, text="Welcome to the Library", font=("Arial", 16)).pack(pady=10)
+    def build_login_register_menu(self, screen):
+        tk.Label(screen.frame, text="Welcome to the Library", font=("Arial", 16)).pack(pady=10)
 
-        tk.Button(self.root, text="Login", command=self.login, width=20).pack(pady=5)
-        tk.Button(self.root, text="Register", command=self.register, width=20).pack(pady=5)
+        tk.Button(screen.frame, text="Login", command=self.login, width=20).pack(pady=5)
+        tk.Button(screen.frame, text="Register", command=self.register, width=20).pack(pady=5)
 
     # Displays the main menu of the library system after a successful login
     def create_main_menu(self):
-        self.clear_window()
+        self.screens.show("main", self.build_main_menu)
 
+    def build_main_menu(self, screen):
         # Main menu title
-        tk.Label(self.root, text="Library Main Menu", font=("Arial", 16)).pack(pady=10)
+        tk.Label(screen.frame, text="Library Main Menu", font=("Arial", 16)).pack(pady=10)
 
         # Load and display the image
         try:
             self.image = tk.PhotoImage(file="images/books_image.png")
-            image_label = tk.Label(self.root, image=self.image)
+            image_label = tk.Label(screen.frame, image=self.image)
             image_label.pack(side=tk.LEFT, padx=20, pady=20)  # Place the image on the left side
         except Exception as e:
             print(f"Error loading image: {e}")
@@ -78,18 +153,19 @@ class LibraryGUI:
         ]
 
         for text, command in options:
-            tk.Button(self.root, text=text, command=command, width=20).pack(pady=5)
+            tk.Button(screen.frame, text=text, command=command, width=20).pack(pady=5)
 
-        tk.Button(self.root, text="Logout", command=self.logout, width=20).pack(pady=5)
+        tk.Button(screen.frame, text="Logout", command=self.logout, width=20).pack(pady=5)
 
     # Creates a scrollable frame for displaying large lists of items & Displays a "Back" button to return to the previous menu
-    def create_scrollable_frame(self, title, callback):
-        self.clear_window()
+    def create_scrollable_frame(self, parent, title, callback):
+        tk.Label(parent, text=title, font=("Arial", 16)).pack(pady=10)
 
-        tk.Label(self.root, text=title, font=("Arial", 16)).pack(pady=10)
+        # The Back button is packed first at the bottom, so the list can take the rest of the screen
+        tk.Button(parent, text="Back", command=callback, width=20).pack(side=tk.BOTTOM, pady=10)
 
-        frame = tk.Frame(self.root)
-        frame.pack(fill=tk.BOTH, expand=True)
+        frame = tk.Frame(parent)
+        frame.pack(side=tk.BOTTOM, fill=tk.BOTH, expand=True)
 
         canvas = tk.Canvas(frame)
         canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -106,34 +182,43 @@ class LibraryGUI:
         canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
         canvas.configure(yscrollcommand=scrollbar.set)
 
-        tk.Button(self.root, text="Back", command=callback, width=20).pack(pady=10)
-
         return scrollable_frame
 
+    @staticmethod
+    def clear_entries(*widgets):
+        """Empty the entries and listboxes of a reused form."""
+        for widget in widgets:
+            widget.delete(0, tk.END)
+
     # Displays the login screen
     def login(self):
-        self.clear_window()
+        self.screens.show("login", self.build_login)
 
-        tk.Label(self.root, text="Login", font=("Arial", 16)).pack(pady=10)
+    def build_login(self, screen):
+        tk.Label(screen.frame, text="Login", font=("Arial", 16)).pack(pady=10)
 
-        username_label = tk.Label(self.root, text="Username:")
+        username_label = tk.Label(screen.frame, text="Username:")
         username_label.pack()
-        username_entry = tk.Entry(self.root)
+        username_entry = tk.Entry(screen.frame)
         username_entry.pack()
 
-        password_label = tk.Label(self.root, text="Password:")
+        password_label = tk.Label(screen.frame, text="Password:")
         password_label.pack()
-        password_entry = tk.Entry(self.root, show="*")
+        password_entry = tk.Entry(screen.frame, show="*")
         password_entry.pack()
+        screen.reset = lambda: self.clear_entries(username_entry, password_entry)
 
-        # Validates credentials using UserManager
-        @log_decorator
+        # Validates credentials using UserManager (password hashing runs off the Tk thread)
         def perform_login():
             """Attempt to log in."""
+            username = username_entry.get()
+            future = self.user_manager.authenticate_user_async(username, password_entry.get())
+            self.run_in_background(future, lambda future: finish_login(future, username), "Logging in...")
+
+        @log_decorator
+        def finish_login(future, username):
             try:
-                username = username_entry.get()
-                password = password_entry.get()
-                if self.user_manager.authenticate_user(username, password):
+                if future.result():
                     self.current_user = username
                     messagebox.showinfo("Success", "Login Successful")
                     self.create_main_menu()
@@ -144,34 +229,37 @@ class LibraryGUI:
             except Exception as e:
                 return f"logged in fail: {str(e)}"
 
-        tk.Button(self.root, text="Login", command=perform_login, width=20).pack(pady=10)
-        tk.Button(self.root, text="Back", command=self.create_login_register_menu, width=20).pack(pady=10)
+        tk.Button(screen.frame, text="Login", command=perform_login, width=20).pack(pady=10)
+        tk.Button(screen.frame, text="Back", command=self.create_login_register_menu, width=20).pack(pady=10)
 
     # Displays the registration screen
     def register(self):
-        self.clear_window()
-
+        self.screens.show("register", self.build_register)
 
-        tk.Label(self.root, text="Register", font=("Arial", 16)).pack(pady=10)
+    def build_register(self, screen):
+        tk.Label(screen.frame, text="Register", font=("Arial", 16)).pack(pady=10)
 
-        username_label = tk.Label(self.root, text="Username:")
+        username_label = tk.Label(screen.frame, text="Username:")
         username_label.pack()
-        username_entry = tk.Entry(self.root)
+        username_entry = tk.Entry(screen.frame)
         username_entry.pack()
 
-        password_label = tk.Label(self.root, text="Password:")
+        password_label = tk.Label(screen.frame, text="Password:")
         password_label.pack()
-        password_entry = tk.Entry(self.root, show="*")
+        password_entry = tk.Entry(screen.frame, show="*")
         password_entry.pack()
+        screen.reset = lambda: self.clear_entries(username_entry, password_entry)
 
         # Registers a new user using UserManager
-        @log_decorator
         def perform_register():
             """Attempt to register a new user."""
+            future = self.user_manager.register_user_async(username_entry.get(), password_entry.get())
+            self.run_in_background(future, finish_register, "Registering...")
+
+        @log_decorator
+        def finish_register(future):
             try:
-                username = username_entry.get()
-                password = password_entry.get()
-                self.user_manager.register_user(username, password)
+                future.result()
                 messagebox.showinfo("Success", "Registration Successful")
                 self.create_login_register_menu()
                 return f"registered successfully"
@@ -179,26 +267,27 @@ class LibraryGUI:
                 messagebox.showerror("Error", str(e))
                 return f"registered fail: {str(e)}"
 
-        tk.Button(self.root, text="Register", command=perform_register, width=20).pack(pady=10)
-        tk.Button(self.root, text="Back", command=self.create_login_register_menu, width=20).pack(pady=10)
+        tk.Button(screen.frame, text="Register", command=perform_register, width=20).pack(pady=10)
+        tk.Button(screen.frame, text="Back", command=self.create_login_register_menu, width=20).pack(pady=10)
 
     # Allows the user to add a new book to the library
     def add_book(self):
-        self.clear_window()
+        self.screens.show("add_book", self.build_add_book)
 
-        tk.Label(self.root, text="Add Book", font=("Arial", 16)).pack(pady=10)
+    def build_add_book(self, screen):
+        tk.Label(screen.frame, text="Add Book", font=("Arial", 16)).pack(pady=10)
 
         # Entry fields for book details
         fields = ["Title", "Author", "Year", "Genre", "Copies", "Is Loaned (Yes/No)"]
         entries = {}
         for field in fields:
-            tk.Label(self.root, text=f"{field}:").pack()
-            entry = tk.Entry(self.root)
+            tk.Label(screen.frame, text=f"{field}:").pack()
+            entry = tk.Entry(screen.frame)
             entry.pack()
             entries[field] = entry
+        screen.reset = lambda: self.clear_entries(*entries.values())
 
         # Add a book to the books.csv file
-        @log_decorator
         def perform_add():
             try:
                 # Parse the is_loaned field as a boolean
@@ -213,8 +302,18 @@ class LibraryGUI:
                     genre=entries["Genre"].get(),
                     year=int(entries["Year"].get())
                 )
-                # Call the library's add_book method
-                result = self.library.add_book(book)
+            except Exception:
+                finish_add(None)
+                return
+            # Call the library's add_book method
+            self.run_in_background(self.service.call("add_book", book), finish_add, "Adding book...")
+
+        @log_decorator
+        def finish_add(future):
+            try:
+                if future is None:
+                    raise ValueError("invalid book parameters")
+                result = future.result()
 
                 # Notify the user of success
                 messagebox.showinfo("Success", result)
@@ -225,44 +324,55 @@ class LibraryGUI:
                 messagebox.showerror("Error", "Book addition failed - please write valid parameters")
                 return "book added fail"
 
-        tk.Button(self.root, text="Add Book", command=perform_add, width=20).pack(pady=10)
-        tk.Button(self.root, text="Back", command=self.create_main_menu, width=20).pack(pady=10)
+        tk.Button(screen.frame, text="Add Book", command=perform_add, width=20).pack(pady=10)
+        tk.Button(screen.frame, text="Back", command=self.create_main_menu, width=20).pack(pady=10)
 
-    # Allows the user to remove a book from the library
-    def remove_book(self):
-        self.clear_window()
-
-        tk.Label(self.root, text="Remove Book", font=("Arial", 16)).pack(pady=10)
-
-        tk.Label(self.root, text="Search Query by title:").pack()
-        query_entry = tk.Entry(self.root)
+    # Builds the "title entry + suggestions listbox" pair shared by the remove, lend and return screens
+    def create_title_picker(self, screen, label, search_type=lambda: "Title"):
+        tk.Label(screen.frame, text=label).pack()
+        query_entry = tk.Entry(screen.frame)
         query_entry.pack()
 
-        tk.Label(self.root, text="Suggestions:").pack()
-        suggestions_listbox = tk.Listbox(self.root, height=5, width=50)
+        tk.Label(screen.frame, text="Suggestions:").pack()
+        suggestions_listbox = tk.Listbox(screen.frame, height=5, width=50)
         suggestions_listbox.pack(pady=5)
 
         # Bind the query_entry to the generalized update_suggestions function
         query_entry.bind(
             "<KeyRelease>",
             lambda event: self.update_suggestions(
-                event, query_entry, suggestions_listbox, "Title", self.library, self.dynamic_search
+                event, query_entry, suggestions_listbox, search_type(), self.library, self.dynamic_search
             ),
         )
 
-        @log_decorator
+        def selected_title():
+            selected_index = suggestions_listbox.curselection()
+            if selected_index:
+                return suggestions_listbox.get(selected_index[0])  # Get the selected book title
+            return query_entry.get()  # Use the text entered in the query_entry if no suggestion is selected
+
+        return query_entry, suggestions_listbox, selected_title
+
+    # Allows the user to remove a book from the library
+    def remove_book(self):
+        self.screens.show("remove_book", self.build_remove_book)
+
+    def build_remove_book(self, screen):
+        tk.Label(screen.frame, text="Remove Book", font=("Arial", 16)).pack(pady=10)
+
+        query_entry, suggestions_listbox, selected_title = self.create_title_picker(screen, "Search Query by title:")
+        screen.reset = lambda: self.clear_entries(query_entry, suggestions_listbox)
+
         def perform_remove():
             """
             Allows the user to dynamically search for books to remove using suggestions.
             """
-            selected_index = suggestions_listbox.curselection()
-            if selected_index:
-                title = suggestions_listbox.get(selected_index[0])  # Get the selected book title
-            else:
-                title = query_entry.get()  # Use the text entered in the query_entry if no suggestion is selected
+            self.run_in_background(self.service.call("remove_book", selected_title()), finish_remove, "Removing book...")
 
+        @log_decorator
+        def finish_remove(future):
             try:
-                result = self.library.remove_book(title)
+                result = future.result()
 
                 # Pop a message to the user of success
                 messagebox.showinfo("Success", result)
@@ -273,8 +383,8 @@ class LibraryGUI:
                 messagebox.showerror("Error", "Book remove failed - please write valid parameters")
                 return "book added fail"
 
-        tk.Button(self.root, text="Remove Book", command=perform_remove, width=20).pack(pady=10)
-        tk.Button(self.root, text="Back", command=self.create_main_menu, width=20).pack(pady=10)
+        tk.Button(screen.frame, text="Remove Book", command=perform_remove, width=20).pack(pady=10)
+        tk.Button(screen.frame, text="Back", command=self.create_main_menu, width=20).pack(pady=10)
 
     def update_suggestions(self, event, query_entry, suggestions_listbox, search_type, library, dynamic_search):
         """
@@ -288,76 +398,77 @@ class LibraryGUI:
 
     # Allows the user to search for books by title, author, or genre - uses SearchStrategy
     def search_book(self):
-        self.clear_window()
+        self.screens.show("search_book", self.build_search_book)
 
-        tk.Label(self.root, text="Search Book", font=("Arial", 16)).pack(pady=10)
+    def build_search_book(self, screen):
+        tk.Label(screen.frame, text="Search Book", font=("Arial", 16)).pack(pady=10)
 
-        tk.Label(self.root, text="Search By:").pack()
+        tk.Label(screen.frame, text="Search By:").pack()
         search_var = tk.StringVar(value="Title")
 
         # Search options
-        options = [("Title", "Title"), ("Author", "Author"), ("Genre", "Genre")]
+        options = [("Title", "Title"), ("Author", "Author"), ("Genre", "Genre"), ("Best match", "Ranked")]
         for text, value in options:
-            tk.Radiobutton(self.root, text=text, variable=search_var, value=value).pack()
+            tk.Radiobutton(screen.frame, text=text, variable=search_var, value=value).pack()
 
-        tk.Label(self.root, text="Search Query:").pack()
-        query_entry = tk.Entry(self.root)
-        query_entry.pack()
+        query_entry, suggestions_listbox, selected_query = self.create_title_picker(
+            screen, "Search Query:", search_type=search_var.get)
 
-        tk.Label(self.root, text="Suggestions:").pack()
-        suggestions_listbox = tk.Listbox(self.root, height=5, width=50)
-        suggestions_listbox.pack(pady=5)
-
-        # Bind the query_entry to the generalized update_suggestions function
-        query_entry.bind(
-            "<KeyRelease>",
-            lambda event: self.update_suggestions(
-                event, query_entry, suggestions_listbox, search_var.get(), self.library, self.dynamic_search
-            ),
-        )
         @log_decorator
         def perform_search():
             """
             Dynamically searches books based on user input.
             """
-            selected_index = suggestions_listbox.curselection()
-            if selected_index:
-                query = suggestions_listbox.get(selected_index[0])
-            else:
-                query = query_entry.get()
-
-            log = None
-            strategy = None
-            if search_var.get() == "Title":
-                strategy = SearchByTitle()
-                log = "name"
-            elif search_var.get() == "Author":
-                strategy = SearchByAuthor()
-                log = "author"
-            elif search_var.get() == "Genre":
-                strategy = SearchByCategory()
-                log = "category"
-
-            if strategy:
-                results = strategy.search(self.library.books, query)
+            query = selected_query()
+
+            log = {"Title": "name", "Author": "author", "Genre": "category", "Ranked": "relevance"}.get(search_var.get())
+
+            if log:
+                results = self.dynamic_search.search(search_var.get(), self.library.books, query)
                 if results:
-                    result_frame = self.create_scrollable_frame("Search Results", self.search_book)
-                    for book in results:
-                        tk.Label(
-                            result_frame,
-                            text=f"{book.title} by {book.author} ({book.year}) - {book.copies} copies",
-                        ).pack()
-                        return f"Search book \"{book.title}\" by {log} completed successfully"
+                    self.show_search_results(results)
+                    return f"Search book \"{results[0].title}\" by {log} completed successfully"
                 else:
                     messagebox.showinfo("No Results", f"No books found for your query: {query}.")
                     return f"Search book \"{query}\" by {log} failed"
 
-        tk.Button(self.root, text="Search", command=perform_search, width=20).pack(pady=10)
-        tk.Button(self.root, text="Back", command=self.create_main_menu, width=20).pack(pady=10)
+        tk.Button(screen.frame, text="Search", command=perform_search, width=20).pack(pady=10)
+        tk.Button(screen.frame, text="Back", command=self.create_main_menu, width=20).pack(pady=10)
+
+    def show_search_results(self, results):
+        """Show the results screen (reused between searches, only its labels are refilled)."""
+        self.search_results = results
+        self.screens.show("search_results", self.build_search_results)  # No version: every search refreshes
+
+    def build_search_results(self, screen):
+        result_frame = self.create_scrollable_frame(screen.frame, "Search Results", self.search_book)
+
+        def show(results, recommendations):
+            lines = []
+            if recommendations:
+                lines.append(("Patrons also borrowed: " + ", ".join(recommendations), {}))
+            for book in results:
+                lines.append((f"{book.title} by {book.author} ({book.year}) - {book.copies} copies", {}))
+            fill_labels(result_frame, lines, width=110)
+
+        def refresh():
+            results = self.search_results
+            show(results, [])
+
+            # The first recommendation replays the loan history, so it runs on the service thread
+            def show_recommendations(future):
+                if results is self.search_results and future.exception() is None and future.result():
+                    show(results, future.result())
+
+            self.run_in_background(self.service.call("recommend", results[0].title), show_recommendations, message=None)
+
+        screen.refresh = refresh
 
     # Displays a list of all books in the library
     def view_books(self):
-        scrollable_frame = self.create_scrollable_frame("View Books", self.create_main_menu) # Add a scroll wheel
+        self.screens.show("view_books", self.build_view_books, version=self.catalog_version())
+
+    def build_view_books(self, screen):
         search_var = tk.StringVar(value="All books")
 
         # Search options
@@ -369,29 +480,39 @@ class LibraryGUI:
         ]
 
         # Add the radio buttons above the book list
+        options_frame = tk.Frame(screen.frame)
+        options_frame.pack(side=tk.BOTTOM)
         for text, value in options:
-            tk.Radiobutton(self.root, text=text, variable=search_var, value=value, command=lambda: display_books()).pack()
+            tk.Radiobutton(options_frame, text=text, variable=search_var, value=value, command=lambda: display_books()).pack()
+        scrollable_frame = self.create_scrollable_frame(screen.frame, "View Books", self.create_main_menu) # Add a scroll wheel
+
+        book_line = {"font": "TkDefaultFont", "width": 110, "pady": 2}
+        genre_line = {"font": ("Arial", 18, "bold"), "width": 20, "pady": 5}
 
         @log_decorator
         def display_books():
             """
             Displays books based on user input uses BookCategoryIterator (iterator design pattern).
             """
+            counted = None  # Future of the (book, copies) rows of the available or loaned books
             try:
                 selected_option = search_var.get()
                 if selected_option == "All books":
                     books = self.library.books
                     log_message = "Displayed all books successfully"
                 elif selected_option == "Available books":
-                    books = [book for book in self.library.books if
-                             self.library.available_copies.get(book.title, 0) > 0]
+                    # The columnar view is only built and updated on the service thread
+                    counted = self.service.submit(lambda library: [
+                        (book, library.available_copies.get(book.title, 0))
+                        for book in library.column_view().available_books()])
                     log_message = "Displayed available books successfully"
                 elif selected_option == "Loaned books":
-                    books = [book for book in self.library.books if
-                             self.library.available_copies.get(book.title, 0) == 0]
+                    counted = self.service.submit(lambda library: [
+                        (book, library.loaned_books.get(book.title, 0))
+                        for book in library.column_view().loaned_out_books()])
                     log_message = "Displayed borrowed books successfully"
                 elif selected_option == "By Category":
-                    iterator = BookCategoryIterator(self.library.books)
+                    iterator = BookCategoryIterator(self.library.genre_index)
                     log_message = "Displayed books by category successfully"
                 else:
                     books = []
@@ -400,76 +521,70 @@ class LibraryGUI:
                 log_message = f"Displaying books failed: {e}"
                 raise log_message
 
-            for widget in scrollable_frame.winfo_children():
-                widget.destroy()
-
-            if selected_option == "By Category":
-                for item in iterator:
-                    if isinstance(item, str):
-                        tk.Label(scrollable_frame, text=f"{item}:", font=("Arial", 18, "bold"), anchor="center", justify="center", width=20).pack(fill=tk.X, pady=5)
-                    else:  # Book details
-                        text = f"{item.title} by {item.author} ({item.year}) - {item.copies} copies"
-                        tk.Label(scrollable_frame,
-                                 text=text,
-                                 anchor="center",
-                                 justify="center",
-                                 width=110).pack(fill=tk.X, pady=2)
+            def lines(rows):
+                if selected_option == "By Category":
+                    for item in iterator:
+                        if isinstance(item, str):
+                            yield f"{item}:", genre_line
+                        else:  # Book details
+                            yield f"{item.title} by {item.author} ({item.year}) - {item.copies} copies", book_line
+                    return
+                if selected_option == "All books":
+                    for book in books:
+                        yield f"{book.title} by {book.author} ({book.year}) - {book.copies} copies", book_line
+                    return
+                kind = "available" if selected_option == "Available books" else "loaned"
+                for book, copies in rows:
+                    yield f"{book.title} by {book.author} ({book.year}) - {copies} {kind} copies", book_line
+
+            def draw(rows=()):
+                # Existing labels are reconfigured rather than destroyed and recreated
+                fill_labels(scrollable_frame, lines(rows), anchor="center", justify="center")
+
+            def finish_counted(future):
+                if search_var.get() == selected_option:  # Skip a list the user already switched away from
+                    draw(future.result())
+
+            if counted is not None:
+                self.run_in_background(counted, finish_counted, message=None)
             else:
-                for book in books:
-                    if selected_option == "All books":
-                        text = f"{book.title} by {book.author} ({book.year}) - {book.copies} copies"
-                    elif selected_option == "Available books":
-                        text = f"{book.title} by {book.author} ({book.year}) - {self.library.available_copies.get(book.title, 0)} available copies"
-                    elif selected_option == "Loaned books":
-                        text = f"{book.title} by {book.author} ({book.year}) - {self.library.loaned_books.get(book.title, 0)} loaned copies"
-
-                    tk.Label(scrollable_frame,
-                             text=text,
-                             anchor="center",
-                             justify="center",
-                             width=110).pack(fill=tk.X, pady=2)
-
+                draw()
             return log_message
 
-        # Initially populate the book list with all books
-        display_books()
-
+        # Redraw only when the catalog changed since the list was last drawn
+        screen.refresh = display_books
 
     def lend_book(self):
         """Handle lending a book."""
-        self.clear_window()
+        self.screens.show("lend_book", self.build_lend_book)
 
-        tk.Label(self.root, text="Lend Book", font=("Arial", 16)).pack(pady=10)
+    def build_lend_book(self, screen):
+        tk.Label(screen.frame, text="Lend Book", font=("Arial", 16)).pack(pady=10)
 
-        tk.Label(self.root, text="Title:").pack()
-        title_entry = tk.Entry(self.root)
-        title_entry.pack()
+        title_entry, suggestions_listbox, selected_title = self.create_title_picker(screen, "Title:")
 
-        tk.Label(self.root, text="Suggestions:").pack()
-        suggestions_listbox = tk.Listbox(self.root, height=5, width=50)
-        suggestions_listbox.pack(pady=5)
-
-        # Bind the query_entry to the generalized update_suggestions function
-        title_entry.bind(
-            "<KeyRelease>",
-            lambda event: self.update_suggestions(
-                event, title_entry, suggestions_listbox, "Title", self.library, self.dynamic_search
-            ),
-        )
+        tk.Label(screen.frame, text="Client Name (if a copy is held for them):").pack()
+        client_entry = tk.Entry(screen.frame)
+        client_entry.pack()
+        screen.reset = lambda: self.clear_entries(title_entry, suggestions_listbox, client_entry)
 
-        @log_decorator
         def perform_lend():
-            selected_index = suggestions_listbox.curselection()
-            if selected_index:
-                title = suggestions_listbox.get(selected_index[0])  # Get the selected book title
-            else:
-                title = title_entry.get()  # Use the text entered in the query_entry if no suggestion is selected
+            title = selected_title()
+            client = client_entry.get().strip() or None  # Widgets are only read on the Tk thread
+            # Attempt to borrow the book
+            future = self.service.submit(
+                lambda library: (library.borrow_book(title, client=client), library.recommend(title)))
+            self.run_in_background(future, lambda future: finish_lend(future, title), "Lending book...")
 
+        @log_decorator
+        def finish_lend(future, title):
             try:
-                # Attempt to borrow the book
-                result = self.library.borrow_book(title)
+                result, recommendations = future.result()
                 if result == "book borrowed successfully":
-                    messagebox.showinfo("Success", f"The book '{title}' was borrowed successfully.")
+                    message = f"The book '{title}' was borrowed successfully."
+                    if recommendations:
+                        message += "\n\nPatrons also borrowed:\n" + "\n".join(recommendations)
+                    messagebox.showinfo("Success", message)
                     self.create_main_menu()  # Automatically go back to the main menu
                     return result
                 elif result == "book borrowed fail - no available copies":
@@ -489,43 +604,29 @@ class LibraryGUI:
                 messagebox.showerror("Error", str(e))
                 self.create_main_menu()
 
-        tk.Button(self.root, text="Lend Book", command=perform_lend, width=20).pack(pady=10)
-        tk.Button(self.root, text="Back", command=self.create_main_menu, width=20).pack(pady=10)
+        tk.Button(screen.frame, text="Lend Book", command=perform_lend, width=20).pack(pady=10)
+        tk.Button(screen.frame, text="Back", command=self.create_main_menu, width=20).pack(pady=10)
 
     # Allows the user to return a previously lent book
     def return_book(self):
-        self.clear_window()
-
-        tk.Label(self.root, text="Return Book", font=("Arial", 16)).pack(pady=10)
+        self.screens.show("return_book", self.build_return_book)
 
-        tk.Label(self.root, text="Title:").pack()
-        title_entry = tk.Entry(self.root)
-        title_entry.pack()
+    def build_return_book(self, screen):
+        tk.Label(screen.frame, text="Return Book", font=("Arial", 16)).pack(pady=10)
 
-        tk.Label(self.root, text="Suggestions:").pack()
-        suggestions_listbox = tk.Listbox(self.root, height=5, width=50)
-        suggestions_listbox.pack(pady=5)
+        title_entry, suggestions_listbox, selected_title = self.create_title_picker(screen, "Title:")
+        screen.reset = lambda: self.clear_entries(title_entry, suggestions_listbox)
 
-        # Bind the query_entry to the generalized update_suggestions function
-        title_entry.bind(
-            "<KeyRelease>",
-            lambda event: self.update_suggestions(
-                event, title_entry, suggestions_listbox, "Title", self.library, self.dynamic_search
-            ),
-        )
-        @log_decorator
         def perform_return():
             """
             Return a book to the library's system.
             """
-            selected_index = suggestions_listbox.curselection()
-            if selected_index:
-                title = suggestions_listbox.get(selected_index[0])  # Get the selected book title
-            else:
-                title = title_entry.get()  # Use the text entered in the query_entry if no suggestion is selected
+            self.run_in_background(self.service.call("return_book", selected_title()), finish_return, "Returning book...")
 
+        @log_decorator
+        def finish_return(future):
             try:
-                result = self.library.return_book(title)
+                result = future.result()
                 # Notify the user of success
                 messagebox.showinfo("Success", result)
                 self.create_main_menu()
@@ -536,37 +637,45 @@ class LibraryGUI:
                 self.create_main_menu()  # Automatically go back to the main menu
                 return "book return fail"
 
-        tk.Button(self.root, text="Return Book", command=perform_return, width=20).pack(pady=10)
-        tk.Button(self.root, text="Back", command=self.create_main_menu, width=20).pack(pady=10)
+        tk.Button(screen.frame, text="Return Book", command=perform_return, width=20).pack(pady=10)
+        tk.Button(screen.frame, text="Back", command=self.create_main_menu, width=20).pack(pady=10)
 
     # Displays the top 5 books with the highest number of loaned books + clients in waiting list for it.
-    @log_decorator
     def popular_books(self):
-        """
-        Display the top 5 popular books in the GUI.
-        """
-        scrollable_frame = self.create_scrollable_frame("Popular Books", self.create_main_menu)
+        # Popularity also counts waiting clients, so joining a waiting list changes it too
+        version = (self.catalog_version(), self.library.waiting_list_manager.live)
+        self.screens.show("popular_books", self.build_popular_books, version=version)
 
-        try:
-            books = self.library.popular_books()  # Fetch top 5 popular books
-            if not books:
-                tk.Label(scrollable_frame, text="No popular books found.").pack()
-                return "popular books - displayed successfully (none found)"
-
-            # Display the top 5 books
-            for book in books:
-                tk.Label(
-                    scrollable_frame,
-                    text=f"{book['title']} by {book['author']} (Popularity: {book['popularity']})",
-                    anchor="center",
-                    justify="center",
-                    width=110,
-                ).pack(fill=tk.X, pady=2)
-
-            return "popular books - displayed successfully"
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to display popular books: {str(e)}")
-            return "popular books - displayed failed"
+    def build_popular_books(self, screen):
+        scrollable_frame = self.create_scrollable_frame(screen.frame, "Popular Books", self.create_main_menu)
+
+        def display_popular_books():
+            """
+            Display the top 5 popular books in the GUI.
+            """
+            # Fetch top 5 popular books
+            self.run_in_background(self.service.call("popular_books"), show_popular_books, "Loading popular books...")
+
+        @log_decorator
+        def show_popular_books(future):
+            try:
+                books = future.result()
+                if not books:
+                    fill_labels(scrollable_frame, [("No popular books found.", {})])
+                    return "popular books - displayed successfully (none found)"
+
+                # Display the top 5 books
+                fill_labels(scrollable_frame, (
+                    (f"{book['title']} by {book['author']} (Popularity: {book['popularity']})", {})
+                    for book in books
+                ), anchor="center", justify="center", width=110)
+
+                return "popular books - displayed successfully"
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to display popular books: {str(e)}")
+                return "popular books - displayed failed"
+
+        screen.refresh = display_popular_books
 
     # Logs out the current user and returns to the login/register menu
     @log_decorator
@@ -579,67 +688,75 @@ class LibraryGUI:
             messagebox.showerror("Error", f"Failed to logout: {str(e)}")
             return "logged out successfully"
 
-    # This is simple function to clear all widgets in GUI
-    def clear_window(self):
-        for widget in self.root.winfo_children():
-            widget.destroy()
-
 
     def add_to_waiting_list_form(self, title):
         """Display a form to add a client to the waiting list for a specific book."""
-        self.clear_window()
-
         # Get book details
         try:
-            book = next(book for book in self.library.books if book.title == title)
+            self.waiting_list_book = next(book for book in self.library.books if book.title == title)
         except StopIteration: # If book not found, go back to main menu
             messagebox.showerror("Error", f"Book '{title}' not found.")
             self.create_main_menu()
             return
 
-        tk.Label(self.root, text=f"Add to Waiting List for '{title}'", font=("Arial", 16)).pack(pady=10)
-
-        # Pre-fill book information
-        fields = {
-            "Title": book.title,
-            "Author": book.author,
-            "Genre": book.genre,
-            "Year": book.year,
-            "Client Name": "",
-            "Email Address": "",
-            "Phone Number": "",
-        }
+        self.screens.show("waiting_list_form", self.build_waiting_list_form)
+
+    def build_waiting_list_form(self, screen):
+        heading = tk.Label(screen.frame, font=("Arial", 16))
+        heading.pack(pady=10)
+
+        fields = ["Title", "Author", "Genre", "Year", "Client Name", "Email Address", "Phone Number"]
         entries = {}
 
-        for field, default in fields.items():
-            tk.Label(self.root, text=f"{field}:").pack()
-            entry = tk.Entry(self.root)
-            entry.insert(0, default)  # Pre-fill book details
+        for field in fields:
+            tk.Label(screen.frame, text=f"{field}:").pack()
+            entry = tk.Entry(screen.frame)
             entry.pack()
             entries[field] = entry
 
+        def reset():
+            book = self.waiting_list_book
+            heading.config(text=f"Add to Waiting List for '{book.title}'")
+            self.clear_entries(*entries.values())
+            # Pre-fill book information
+            for field, value in [("Title", book.title), ("Author", book.author), ("Genre", book.genre), ("Year", book.year)]:
+                entries[field].insert(0, value)
+
+        screen.reset = reset
+
         def submit_to_waiting_list():
             """
             Get entries from the user's input and add them to the waiting list.
             """
+            values = {field: entry.get() for field, entry in entries.items()}
             try:
-                self.library.waiting_list_manager.add_to_waiting_list(
-                    title=entries["Title"].get(),
-                    author=entries["Author"].get(),
-                    genre=entries["Genre"].get(),
-                    year=int(entries["Year"].get()),
-                    client=entries["Client Name"].get(),
-                    email=entries["Email Address"].get(),
-                    phone=entries["Phone Number"].get(),
-                )
+                year = int(values["Year"])
+            except ValueError:
+                messagebox.showerror("Error", "Year must be a number.")
+                return
+            join = self.service.call(
+                "join_waiting_list",
+                title=values["Title"],
+                author=values["Author"],
+                genre=values["Genre"],
+                year=year,
+                client=values["Client Name"],
+                email=values["Email Address"],
+                phone=values["Phone Number"],
+            )
+            self.run_in_background(join, finish_waiting_list, "Joining the waiting list...")
+
+        def finish_waiting_list(future):
+            title = self.waiting_list_book.title
+            try:
+                future.result()
                 messagebox.showinfo("Success", f"Added to waiting list for '{title}'.")
-                self.library.update_loaned_books_file()
                 self.create_main_menu()
             except Exception as e:
                 messagebox.showerror("Error", str(e))
 
-        tk.Button(self.root, text="Submit", command=submit_to_waiting_list, width=20).pack(pady=10)
-        tk.Button(self.root, text="Back", command=self.create_main_menu, width=20).pack(pady=10)
+        tk.Button(screen.frame, text="Submit", command=submit_to_waiting_list, width=20).pack(pady=10)
+        tk.Button(screen.frame, text="Back", command=self.create_main_menu, width=20).pack(pady=10)
 
 
 if __name__ == "__main__":
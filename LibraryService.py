@@ -0,0 +1,60 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+"""
+The LibraryService class runs every Library command on one worker thread.
+Callers (the GUI) submit commands and get a concurrent.futures.Future back immediately, so the Tk main loop never
+waits on CSV rewrites or notification sends. Commands run one at a time in submission order, which keeps the
+Library single-writer; readers can keep iterating the catalog snapshots from any thread.
+"""
+
+class LibraryService:
+    def __init__(self, library):
+        self.library = library
+        self.commands = queue.SimpleQueue()  # (future, command) pairs, None stops the worker
+        self.pending = 0  # Commands submitted and not finished yet
+        self.lock = threading.Lock()
+        self.worker = threading.Thread(target=self.run, name="library-service", daemon=True)
+        self.worker.start()
+
+    def submit(self, command, *args, **kwargs):
+        """Queue `command(library, *args, **kwargs)` and return a Future of its result."""
+        future = Future()
+        with self.lock:
+            self.pending += 1
+        self.commands.put((future, lambda: command(self.library, *args, **kwargs)))
+        return future
+
+    def call(self, method, *args, **kwargs):
+        """Queue a Library method by name, e.g. call("borrow_book", title, client=client)."""
+        return self.submit(lambda library: getattr(library, method)(*args, **kwargs))
+
+    def busy(self):
+        return self.pending > 0
+
+    def run(self):
+        while True:
+            item = self.commands.get()
+            if item is None:
+                return
+            future, command = item
+            result = error = None
+            running = future.set_running_or_notify_cancel()  # False if the caller cancelled it while queued
+            if running:
+                try:
+                    result = command()
+                except BaseException as e:
+                    error = e
+            with self.lock:
+                self.pending -= 1  # Before resolving the future, so busy() is already False for its callbacks
+            if running:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def close(self):
+        """Finish the queued commands and stop the worker."""
+        self.commands.put(None)
+        self.worker.join()
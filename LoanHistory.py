@@ -0,0 +1,111 @@
+import csv
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+"""
+The LoanHistory class records every borrow and return of the library.
+Events are appended to one CSV file per (UTC) day in the history directory, so old history is never rewritten and a
+period can be read by opening its files only. Borrows are also counted in rolling hour, day and week buckets, which
+answer "top titles in the last N days" by adding up a handful of pre-aggregated counters instead of scanning history.
+"""
+
+HOUR = 3600
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+RESOLUTIONS = {"hour": HOUR, "day": DAY, "week": WEEK}  # Finest first
+RETENTION = {"hour": 2 * DAY, "day": 10 * WEEK, "week": 104 * WEEK}  # How far back each resolution is kept
+
+
+class LoanHistory:
+    def __init__(self, history_dir="csv_files/loan_history"):
+        self.history_dir = history_dir
+        self.lock = threading.Lock()
+        self.buckets = {name: {} for name in RESOLUTIONS}  # resolution -> {bucket start: Counter(title -> borrows)}
+        self.load_history()
+
+    @staticmethod
+    def partition_name(timestamp):
+        return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d") + ".csv"
+
+    def load_history(self, now=None):
+        """Rebuild the buckets from the partitions that are still inside the longest retention."""
+        if not os.path.isdir(self.history_dir):
+            return
+        now = time.time() if now is None else now
+        oldest = self.partition_name(now - max(RETENTION.values()))
+        for name in sorted(os.listdir(self.history_dir)):
+            if not name.endswith(".csv") or name < oldest:  # Partition names sort by date
+                continue
+            with open(os.path.join(self.history_dir, name), "r", encoding="utf-8") as file:
+                for row in csv.DictReader(file):
+                    if row.get("event") == "borrow" and row.get("timestamp"):
+                        self.count(row["title"], float(row["timestamp"]), now)
+
+    def events(self):
+        """Yield every recorded event (a dict with timestamp, event, title and client), oldest first."""
+        if not os.path.isdir(self.history_dir):
+            return
+        for name in sorted(os.listdir(self.history_dir)):
+            if name.endswith(".csv"):
+                with open(os.path.join(self.history_dir, name), "r", encoding="utf-8") as file:
+                    yield from csv.DictReader(file)
+
+    def record(self, event, title, client="", now=None):
+        """Append a "borrow" or "return" event to its day partition and count borrows in the buckets."""
+        now = time.time() if now is None else now
+        with self.lock:
+            os.makedirs(self.history_dir, exist_ok=True)
+            path = os.path.join(self.history_dir, self.partition_name(now))
+            write_header = not os.path.exists(path)
+            with open(path, "a", newline="", encoding="utf-8") as file:
+                writer = csv.writer(file)
+                if write_header:
+                    writer.writerow(["timestamp", "event", "title", "client"])
+                writer.writerow([f"{now:.3f}", event, title, client or ""])
+            if event == "borrow":
+                self.count(title, now, now)
+
+    def count(self, title, timestamp, now):
+        for name, size in RESOLUTIONS.items():
+            if timestamp < now - RETENTION[name] - size:
+                continue
+            start = int(timestamp // size * size)
+            bucket = self.buckets[name].get(start)
+            if bucket is None:
+                bucket = self.buckets[name][start] = Counter()
+                self.prune(name, now)  # A new bucket opened - drop the ones that fell out of retention
+            bucket[title] += 1
+
+    def prune(self, name, now):
+        limit = now - RETENTION[name] - RESOLUTIONS[name]
+        for start in [start for start in self.buckets[name] if start < limit]:
+            del self.buckets[name][start]
+
+    def borrow_counts(self, seconds, now=None):
+        """
+        Return a Counter of borrows per title in the last `seconds`.
+        The window is covered with the coarsest buckets that fit, so its start is rounded down to the finest
+        resolution whose retention covers the whole window (an hour for the last two days, a day up to ten weeks).
+        """
+        now = time.time() if now is None else now
+        step = min((RESOLUTIONS[name] for name in RESOLUTIONS if RETENTION[name] >= seconds), default=WEEK)
+        start = int((now - seconds) // step * step)
+        end = (int(now) // step + 1) * step  # The end of the current bucket
+        usable = sorted(((size, name) for name, size in RESOLUTIONS.items() if size >= step), reverse=True)
+        counts = Counter()
+        with self.lock:
+            while end > start:
+                # The largest bucket that ends here and lies inside the window (the finest one always does)
+                size, name = next((size, name) for size, name in usable if end % size == 0 and end - size >= start)
+                bucket = self.buckets[name].get(end - size)
+                if bucket:
+                    counts.update(bucket)
+                end -= size
+        return counts
+
+    def top_titles(self, count=5, days=7, now=None):
+        """Return [(title, borrows)] for the `count` most borrowed titles of the last `days` days."""
+        return self.borrow_counts(days * DAY, now).most_common(count)
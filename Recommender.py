@@ -0,0 +1,119 @@
+import heapq
+import threading
+from metrics_registry import metrics
+
+"""
+The Recommender class answers "patrons who borrowed this also borrowed..." for a title.
+It keeps a sparse title x title co-borrow matrix (dict of dicts - only pairs that were actually borrowed by the same
+client are stored), updated in O(titles the client borrowed before) for every borrow. The top neighbours of a title
+are cached and a cache entry is only dropped when one of the title's counts changes, so repeated lookups are free.
+rebuild() recomputes the whole matrix from the loan history at once with SciPy sparse products (nightly job);
+without SciPy it falls back to replaying the events.
+"""
+
+class Recommender:
+    def __init__(self, top_k=10):
+        self.top_k = top_k  # Neighbours kept in the cache per title
+        self.lock = threading.Lock()
+        self.co_borrows = {}  # title -> {other title: clients who borrowed both}
+        self.borrowed_by_client = {}  # client -> set of titles
+        self.top_cache = {}  # title -> [(count, other title)], most co-borrowed first
+
+    def record_borrow(self, client, title):
+        """Count `title` as co-borrowed with every title the client borrowed before."""
+        if not client:
+            return  # Anonymous borrows can't be linked to other borrows
+        with self.lock:
+            titles = self.borrowed_by_client.setdefault(client, set())
+            if title in titles:
+                return  # Borrowing the same book again doesn't make it more related
+            row = self.co_borrows.setdefault(title, {})
+            for other in titles:
+                row[other] = row.get(other, 0) + 1
+                other_row = self.co_borrows.setdefault(other, {})
+                other_row[title] = other_row.get(title, 0) + 1
+                self.top_cache.pop(other, None)
+            if titles:
+                self.top_cache.pop(title, None)
+            titles.add(title)
+
+    def replay(self, events):
+        """Apply the borrows among loan events (dicts with "event", "title" and "client") one by one."""
+        for event in events:
+            if event.get("event") == "borrow":
+                self.record_borrow(event.get("client"), event["title"])
+
+    def remove_title(self, title):
+        """Forget a title (e.g. removed from the catalog) so it is no longer recommended."""
+        with self.lock:
+            for other in self.co_borrows.pop(title, {}):
+                self.co_borrows.get(other, {}).pop(title, None)
+                self.top_cache.pop(other, None)
+            self.top_cache.pop(title, None)
+            for titles in self.borrowed_by_client.values():
+                titles.discard(title)
+
+    def neighbours(self, title):
+        """Return the cached [(count, other title)] list of the title, computing it if it was invalidated."""
+        with self.lock:
+            top = self.top_cache.get(title)
+            metrics.inc("library_cache_requests_total", cache="recommendations", result="miss" if top is None else "hit")
+            if top is None:
+                row = self.co_borrows.get(title, {})
+                # Ties are broken by title so the order is stable
+                top = heapq.nsmallest(self.top_k, ((-count, other) for other, count in row.items()))
+                top = self.top_cache[title] = [(-count, other) for count, other in top]
+            return top
+
+    def recommend(self, title, count=5):
+        """Return up to `count` titles most often borrowed by the clients who borrowed `title`."""
+        return [other for _, other in self.neighbours(title)[:count]]
+
+    def rebuild(self, events):
+        """
+        Recompute the matrix from scratch out of loan events (dicts with "event", "title" and "client").
+        With SciPy the client x title incidence matrix B is built once and the co-borrow counts are B.T @ B.
+        """
+        pairs = {(event["client"], event["title"]) for event in events if event.get("event") == "borrow" and event.get("client")}
+        try:
+            import numpy as np
+            from scipy import sparse
+        except ImportError:  # Same result, one borrow at a time
+            with self.lock:
+                self.co_borrows, self.borrowed_by_client, self.top_cache = {}, {}, {}
+            self.replay({"event": "borrow", "client": client, "title": title} for client, title in pairs)
+            return
+
+        clients = sorted({client for client, _ in pairs})
+        titles = sorted({title for _, title in pairs})
+        client_ids = {client: position for position, client in enumerate(clients)}
+        title_ids = {title: position for position, title in enumerate(titles)}
+        rows = np.fromiter((client_ids[client] for client, _ in pairs), dtype=np.int64, count=len(pairs))
+        columns = np.fromiter((title_ids[title] for _, title in pairs), dtype=np.int64, count=len(pairs))
+        incidence = sparse.csr_matrix((np.ones(len(pairs), dtype=np.int32), (rows, columns)),
+                                      shape=(len(clients), len(titles)))
+        matrix = (incidence.T @ incidence).tocsr()
+        matrix.setdiag(0)
+        matrix.eliminate_zeros()
+
+        co_borrows, top_cache = {}, {}
+        for position, title in enumerate(titles):
+            start, end = matrix.indptr[position], matrix.indptr[position + 1]
+            if start == end:
+                continue
+            others, counts = matrix.indices[start:end], matrix.data[start:end]
+            co_borrows[title] = {titles[other]: int(count) for other, count in zip(others, counts)}
+            # Partial sort: only the counts reaching the k-th largest one are sorted (ties broken by title)
+            if len(counts) > self.top_k:
+                keep = counts >= np.partition(counts, len(counts) - self.top_k)[len(counts) - self.top_k]
+                others, counts = others[keep], counts[keep]
+            top_cache[title] = sorted(((int(count), titles[other]) for other, count in zip(others, counts)),
+                                      key=lambda item: (-item[0], item[1]))[:self.top_k]
+
+        borrowed_by_client = {}
+        for client, title in pairs:
+            borrowed_by_client.setdefault(client, set()).add(title)
+        with self.lock:
+            self.co_borrows = co_borrows
+            self.borrowed_by_client = borrowed_by_client
+            self.top_cache = top_cache
@@ -0,0 +1,77 @@
+import tkinter as tk
+
+"""
+The ScreenManager class keeps every GUI screen alive once it has been built.
+Each screen is a frame built on first use; navigating hides the current frame and shows the next one instead of
+destroying and recreating all the widgets. A screen can register two hooks:
+    reset()   - called every time the screen is shown (clear entries, selections...)
+    refresh() - called when the data version passed to show() differs from the one the screen last displayed,
+                so lists bound to the catalog are only redrawn after the catalog actually changed
+                (screens shown without a version refresh every time).
+"""
+
+class Screen:
+    __slots__ = ("frame", "reset", "refresh", "version")
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.reset = None
+        self.refresh = None
+        self.version = None
+
+
+class ScreenManager:
+    def __init__(self, root):
+        self.root = root
+        self.screens = {}  # name -> Screen
+        self.current = None
+
+    def show(self, name, build, version=None):
+        """
+        Show the screen `name`, building it with `build(screen)` the first time.
+        `version` is the data version the screen should display (e.g. the catalog snapshot version).
+        """
+        screen = self.screens.get(name)
+        if screen is None:
+            screen = self.screens[name] = Screen(tk.Frame(self.root))
+            build(screen)
+        if self.current is not None and self.current is not screen:
+            self.current.frame.pack_forget()
+        if self.current is not screen:
+            screen.frame.pack(fill=tk.BOTH, expand=True)
+            self.current = screen
+        if screen.reset is not None:
+            screen.reset()
+        if screen.refresh is not None and (screen.version is None or screen.version != version):
+            screen.refresh()
+            screen.version = version
+        return screen
+
+    def invalidate(self, name=None):
+        """Force the next show() of a screen (or of every screen) to refresh its data."""
+        for screen_name, screen in self.screens.items():
+            if name is None or screen_name == name:
+                screen.version = None
+
+
+def fill_labels(container, lines, **defaults):
+    """
+    Show one label per (text, options) pair in `container`, reusing the labels already there.
+    Only the missing labels are created and the extra ones are hidden, so redrawing a list of the same size creates
+    no Tk objects at all.
+    """
+    labels = [widget for widget in container.winfo_children() if isinstance(widget, tk.Label)]
+    shown = 0
+    for text, options in lines:
+        options = dict(defaults, **options)
+        pady = options.pop("pady", 2)
+        if shown < len(labels):
+            label = labels[shown]
+            label.config(text=text, **options)
+        else:
+            label = tk.Label(container, text=text, **options)
+        label.pack(fill=tk.X, pady=pady)
+        shown += 1
+    for label in labels[shown:]:
+        label.pack_forget()
+    return shown
@@ -1,7 +1,11 @@
 # Strategy Pattern for Search
+import heapq
+import math
+import re
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 from Book import Book
+from metrics_registry import metrics
 """
 This class implements the strategy design pattern. 
 """
@@ -15,10 +19,21 @@ class SearchStrategy(ABC):
         """Provide suggestions based on the query."""
         pass
 
+    def matches(self, book: Book, query: str) -> bool:
+        """Check a single book against the query (the same test `search` applies to every book)."""
+        return bool(self.search([book], query))
+
+    def iter_search(self, books: Iterable[Book], query: str) -> Iterator[Book]:
+        """Lazily yield the matching books, for callers that stream instead of collecting a list."""
+        return (book for book in books if self.matches(book, query))
+
 class SearchByTitle(SearchStrategy):
     def search(self, books: List[Book], query: str) -> List[Book]:
         return [book for book in books if query.lower() in book.title.lower()]
 
+    def matches(self, book: Book, query: str) -> bool:
+        return query.lower() in book.title.lower()
+
     def suggest(self, books: List[Book], query: str) -> List[str]:
         return [book.title for book in books if query.lower() in book.title.lower()]
 
@@ -26,6 +41,9 @@ class SearchByAuthor(SearchStrategy):
     def search(self, books: List[Book], query: str) -> List[Book]:
         return [book for book in books if query.lower() in book.author.lower()]
 
+    def matches(self, book: Book, query: str) -> bool:
+        return query.lower() in book.author.lower()
+
     def suggest(self, books: List[Book], query: str) -> List[str]:
         return [book.author for book in books if query.lower() in book.author.lower()]
 
@@ -33,5 +51,113 @@ class SearchByCategory(SearchStrategy):
     def search(self, books: List[Book], query: str) -> List[Book]:
         return [book for book in books if query.lower() in book.genre.lower()]
 
+    def matches(self, book: Book, query: str) -> bool:
+        return query.lower() in book.genre.lower()
+
     def suggest(self, books: List[Book], query: str) -> List[str]:
         return [book.genre for book in books if query.lower() in book.genre.lower()]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased words of a text."""
+    return re.findall(r"\w+", text.lower())
+
+class RankedSearch(SearchStrategy):
+    """
+    Relevance search: books are scored with BM25 over the words of their title and author and only the `limit`
+    best ones are returned, best first. The best are picked with a bounded heap (heapq.nlargest), so the matches are
+    never sorted as a whole. `popularity`, if given, returns {title: loans}; loans raise a score by up to
+    `popularity_weight` per factor of e, so popular books win among equally relevant ones.
+    The inverted index is built once per catalog membership: it is reused until books are added, removed or edited,
+    including across the versions that a borrow or a return publishes (they share the chunks of books).
+    """
+    K1 = 1.2  # Term frequency saturation
+    B = 0.75  # Length normalisation
+
+    def __init__(self, limit: int = 20, popularity: Optional[Callable[[], Dict[str, int]]] = None,
+                 popularity_weight: float = 0.1):
+        self.limit = limit
+        self.popularity = popularity
+        self.popularity_weight = popularity_weight
+        self.index_cache = (None, None)  # (chunks of the snapshot, index built from them)
+
+    def build_index(self, books: Iterable[Book]):
+        """Return (books, document lengths, {word: [(position, occurrences)]}) for the catalog."""
+        books = list(books)
+        lengths, postings = [], {}
+        for position, book in enumerate(books):
+            words = tokenize(book.title) + tokenize(book.author)
+            lengths.append(len(words))
+            counts = {}
+            for word in words:
+                counts[word] = counts.get(word, 0) + 1
+            for word, count in counts.items():
+                postings.setdefault(word, []).append((position, count))
+        return books, lengths, postings
+
+    def get_index(self, books: Iterable[Book]):
+        # Chunks are immutable and only shared between snapshots holding the same books, so an index is valid for
+        # as long as the same chunks are searched
+        chunks = getattr(books, "chunks", None)
+        indexed_chunks, index = self.index_cache
+        if chunks is not None and chunks is indexed_chunks:
+            metrics.inc("library_cache_requests_total", cache="search_index", result="hit")
+            return index
+        metrics.inc("library_cache_requests_total", cache="search_index", result="miss")
+        index = self.build_index(books)
+        self.index_cache = (chunks, index)
+        return index
+
+    def term_stats(self, books: Iterable[Book], query: str) -> tuple:
+        """
+        Return (number of books, summed document lengths, {query word: books containing it}).
+        Shards add theirs up so that every shard scores with the same, catalog-wide weights.
+        """
+        return self.index_stats(self.get_index(books), query)
+
+    @staticmethod
+    def index_stats(index, query: str) -> tuple:
+        indexed, lengths, postings = index
+        return len(indexed), sum(lengths), {word: len(postings.get(word, ())) for word in set(tokenize(query))}
+
+    def scores(self, books: Iterable[Book], query: str, stats: Optional[tuple] = None) -> Iterator[tuple]:
+        """
+        Yield (score, -position, book) for every book containing at least one word of the query.
+        `stats` are term_stats() of the whole catalog when `books` is only part of it (one shard).
+        """
+        indexed, lengths, postings = index = self.get_index(books)
+        if not indexed:
+            return
+        size, total_length, frequencies = stats or self.index_stats(index, query)
+        average_length = total_length / size or 1
+        scores = {}
+        for word, frequency in frequencies.items():
+            matches = postings.get(word, ())
+            idf = math.log(1 + (size - frequency + 0.5) / (frequency + 0.5))
+            for position, count in matches:
+                norm = self.K1 * (1 - self.B + self.B * lengths[position] / average_length)
+                scores[position] = scores.get(position, 0.0) + idf * count * (self.K1 + 1) / (count + norm)
+        loans = self.popularity() if self.popularity and scores else {}
+        for position, score in scores.items():
+            book = indexed[position]
+            if loans.get(book.title):
+                score *= 1 + self.popularity_weight * math.log1p(loans[book.title])
+            yield score, -position, book  # Equal scores keep catalog order
+
+    def top(self, books: Iterable[Book], query: str, stats: Optional[tuple] = None) -> List[tuple]:
+        """Return the (score, book) pairs of the `limit` best matches, best first."""
+        return [(score, book) for score, _, book in heapq.nlargest(self.limit, self.scores(books, query, stats),
+                                                                  key=lambda scored: scored[:2])]
+
+    def search(self, books: List[Book], query: str) -> List[Book]:
+        return [book for _, book in self.top(books, query)]
+
+    def matches(self, book: Book, query: str) -> bool:
+        words = set(tokenize(book.title) + tokenize(book.author))
+        return any(word in words for word in tokenize(query))
+
+    def iter_search(self, books: Iterable[Book], query: str) -> Iterator[Book]:
+        return iter(self.search(books, query))
+
+    def suggest(self, books: List[Book], query: str) -> List[str]:
+        return [book.title for book in self.search(books, query)]
@@ -0,0 +1,198 @@
+import csv
+import heapq
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from BookFactory import BookFactory
+from CatalogSnapshot import CatalogSnapshot
+from DynamicSearch import DynamicSearch
+from Library import Library
+from SearchStrategy import RankedSearch
+
+"""
+The ShardedLibrary class spreads the catalog over several Library instances (shards), one storage directory each.
+Shards are either branches ({"north": "csv_files/north", ...}) or a list of directories that titles are hashed across.
+Borrow, return and remove are routed to the shard that owns the title; search and popular_books fan out to all the
+shards in a process pool and the partial results are merged. Ranked searches take two rounds: the shards' term
+statistics are added up first, so every shard scores with the same BM25 weights and the scores can be compared.
+"""
+
+# Per-process cache of shard catalogs: shard dir -> ((mtime, size) of books.csv, books)
+shard_books_cache = {}
+# Per-process ranked search of every shard: shard dir -> (books, their snapshot, RankedSearch indexing it)
+shard_rankers = {}
+
+
+def load_shard_books(shard_dir):
+    """Read a shard's books.csv, reusing the parsed books while the file is unchanged."""
+    books_file = os.path.join(shard_dir, "books.csv")
+    if not os.path.exists(books_file):
+        return []
+    stat = os.stat(books_file)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = shard_books_cache.get(shard_dir)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    books = []
+    with open(books_file, "r", encoding="utf-8") as file:
+        for row in csv.DictReader(file):
+            books.append(BookFactory.create_book(
+                title=row["title"],
+                author=row["author"],
+                is_loaned=row["is_loaned"].lower() == "yes",
+                copies=int(row["copies"]),
+                genre=row["genre"],
+                year=int(row["year"]),
+            ))
+    shard_books_cache[shard_dir] = (signature, books)
+    return books
+
+
+def search_shard(shard_dir, search_type, query):
+    """Worker task: search one shard's catalog."""
+    return DynamicSearch().search(search_type, load_shard_books(shard_dir), query)
+
+
+def shard_ranker(shard_dir):
+    """Return a shard's catalog snapshot and a RankedSearch whose index is kept while books.csv is unchanged."""
+    books = load_shard_books(shard_dir)
+    cached = shard_rankers.get(shard_dir)
+    if cached is None or cached[0] is not books:
+        cached = shard_rankers[shard_dir] = (books, CatalogSnapshot.from_books(books), RankedSearch())
+    return cached[1], cached[2]
+
+
+def term_stats_of_shard(shard_dir, query):
+    """Worker task: the BM25 term statistics of one shard (see RankedSearch.term_stats)."""
+    catalog, ranker = shard_ranker(shard_dir)
+    return ranker.term_stats(catalog, query)
+
+
+def rank_shard(shard_dir, query, stats, limit):
+    """Worker task: the (score, book) pairs of one shard's `limit` best matches, scored with catalog-wide `stats`."""
+    catalog, ranker = shard_ranker(shard_dir)
+    ranker.limit = limit
+    return ranker.top(catalog, query, stats)
+
+
+def popular_in_shard(shard_dir, count):
+    """Worker task: the `count` most popular books of one shard, read from its loaned_books.csv."""
+    return Library.popular_books_from_file(os.path.join(shard_dir, "loaned_books.csv"), count)
+
+
+class ShardedLibrary:
+    def __init__(self, shards, max_workers=None, use_processes=True):
+        if isinstance(shards, dict):
+            self.branches = list(shards)  # Partitioned by branch: new titles need an explicit branch
+            shard_dirs = list(shards.values())
+        else:
+            self.branches = None  # Partitioned by hash of the title
+            shard_dirs = list(shards)
+        self.shard_dirs = shard_dirs
+        self.max_workers = max_workers or len(shard_dirs)
+        self.use_processes = use_processes
+        self.executor = None
+        self.shards = []
+        for shard_dir in shard_dirs:
+            os.makedirs(shard_dir, exist_ok=True)
+            self.shards.append(Library.from_directory(shard_dir))
+
+        self.owner = {}  # title -> shard position
+        for position, shard in enumerate(self.shards):
+            for book in shard.books:
+                self.owner[book.title] = position
+
+    def hash_position(self, title):
+        """Stable (process independent) hash partition of a title."""
+        return zlib.crc32(title.encode("utf-8")) % len(self.shards)
+
+    def shard_for(self, title):
+        """Return the shard that owns the title, or None if no shard has it."""
+        position = self.owner.get(title)
+        return None if position is None else self.shards[position]
+
+    def borrow_book(self, title, client=None):
+        shard = self.shard_for(title)
+        if shard is None:
+            raise ValueError(f"'{title}' does not exist in the library.")
+        return shard.borrow_book(title, client=client)
+
+    def return_book(self, title):
+        shard = self.shard_for(title)
+        if shard is None:
+            return f"book '{title}' returned fail"
+        return shard.return_book(title)
+
+    def add_book(self, book, branch=None):
+        """Add a book to its branch (branch partitioning) or to the shard its title hashes to."""
+        if self.branches is not None:
+            if branch not in self.branches:
+                raise RuntimeError(f"Book added fail: unknown branch '{branch}'")
+            position = self.branches.index(branch)
+        else:
+            position = self.owner.get(book.title, self.hash_position(book.title))
+        result = self.shards[position].add_book(book)
+        self.owner[book.title] = position
+        return result
+
+    def remove_book(self, title):
+        shard = self.shard_for(title)
+        if shard is None:
+            return f"book '{title}' removed fail"
+        result = shard.remove_book(title)
+        if "successfully" in result:
+            del self.owner[title]
+        return result
+
+    def get_executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self.executor
+
+    def fan_out(self, task, *args):
+        """Run `task(shard_dir, *args)` for every shard and return the results in shard order."""
+        if not self.use_processes:
+            return [task(shard_dir, *args) for shard_dir in self.shard_dirs]
+        executor = self.get_executor()
+        futures = [executor.submit(task, shard_dir, *args) for shard_dir in self.shard_dirs]
+        return [future.result() for future in futures]
+
+    def search(self, search_type, query, limit=20):
+        """
+        Search every shard in parallel and concatenate the matches.
+        Ranked searches return the `limit` best matches of all the shards, best first.
+        """
+        if search_type.lower() == "ranked":
+            return self.ranked_search(query, limit)
+        results = []
+        for shard_results in self.fan_out(search_shard, search_type, query):
+            results.extend(shard_results)
+        return results
+
+    def ranked_search(self, query, limit):
+        shard_stats = self.fan_out(term_stats_of_shard, query)
+        stats = (
+            sum(size for size, _, _ in shard_stats),
+            sum(total_length for _, total_length, _ in shard_stats),
+            {word: sum(frequencies[word] for _, _, frequencies in shard_stats) for word in shard_stats[0][2]},
+        )
+        scored = [pair for shard_top in self.fan_out(rank_shard, query, stats, limit) for pair in shard_top]
+        return [book for _, book in heapq.nlargest(limit, scored, key=lambda pair: pair[0])]
+
+    def popular_books(self, count=5, days=None):
+        """
+        Merge the per-shard top lists into the overall `count` most popular books.
+        With `days`, popularity is the number of borrows in the last `days` days (see Library.popular_books).
+        """
+        if days is None:
+            candidates = [book for shard_top in self.fan_out(popular_in_shard, count) for book in shard_top]
+        else:
+            # The loan history counters are already in memory, summing them is cheaper than a pool round trip
+            candidates = [book for shard in self.shards for book in shard.popular_books(count, days)]
+        return heapq.nlargest(count, candidates, key=lambda book: book["popularity"])
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
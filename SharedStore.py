@@ -0,0 +1,90 @@
+import csv
+import io
+import os
+from file_lock import FileLock
+
+"""
+The SharedStore class lets several processes (front desks, batch jobs) work on the same CSV directory.
+Every command that changes the library runs under one advisory file lock, and appends the new state of each title it
+touched to changes.csv, stamped with the next version number. Before its next command, each process pulls only the
+rows appended since the byte offset it last read (a stat when nothing changed), so its in-memory Library stays
+current without reloading the CSV files, and it never rewrites them from a stale state.
+The log is compacted to the latest row per title; versions are kept, so readers of the old file skip what they saw.
+"""
+
+FIELDNAMES = ["version", "op", "title", "author", "is_loaned", "copies", "genre", "year", "available_copies",
+              "loaned_copies"]  # op: "put" (the title's current state) or "drop" (title removed)
+
+
+class SharedStore:
+    LOCK_NAME = "library.lock"
+    CHANGES_NAME = "changes.csv"
+
+    def __init__(self, data_dir, compaction_bytes=4 * 1024 * 1024):
+        self.changes_file = os.path.join(data_dir, self.CHANGES_NAME)
+        self.file_lock = FileLock(os.path.join(data_dir, self.LOCK_NAME))
+        self.compaction_bytes = compaction_bytes  # Compact the log once it grows past this size
+        self.version = 0  # Newest version this process has seen
+        self.offset = 0  # Bytes of the log read so far
+        self.inode = None  # Identity of the log file read, changes when another process compacts it
+
+    def pull(self):
+        """
+        Return the change rows (dicts) newer than the last version seen, oldest first.
+        Call with the lock held so no process is halfway through appending.
+        """
+        try:
+            stat = os.stat(self.changes_file)
+        except FileNotFoundError:
+            return []
+        # First read, or compacted (a new inode, or a reused one holding a shorter file): read it all, the versions
+        # filter the old rows
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            self.inode, self.offset = stat.st_ino, 0
+        if stat.st_size == self.offset:
+            return []
+        with open(self.changes_file, "rb") as file:
+            file.seek(self.offset)
+            data = file.read()
+        data = data[:data.rfind(b"\n") + 1]  # Only whole rows
+        self.offset += len(data)
+        changes = []
+        for row in csv.reader(io.StringIO(data.decode("utf-8"), newline="")):
+            if not row or row[0] == "version":
+                continue
+            change = dict(zip(FIELDNAMES, row))
+            if int(change["version"]) > self.version:
+                self.version = int(change["version"])
+                changes.append(change)
+        return changes
+
+    def push(self, changes):
+        """Append change rows stamped with the next versions. Call with the lock held, after pull()."""
+        write_header = not os.path.exists(self.changes_file)
+        with open(self.changes_file, "a", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
+            if write_header:
+                writer.writeheader()
+            for change in changes:
+                self.version += 1
+                writer.writerow(dict(change, version=self.version))
+        stat = os.stat(self.changes_file)
+        self.inode, self.offset = stat.st_ino, stat.st_size
+        if self.offset > self.compaction_bytes:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the log with the latest row of every title. Call with the lock held, after pull()."""
+        latest = {}
+        with open(self.changes_file, "r", encoding="utf-8") as file:
+            for change in csv.DictReader(file):
+                if change.get("loaned_copies") is not None:  # Skip a row cut short by a crash
+                    latest[change["title"]] = change
+        temp_path = f"{self.changes_file}.tmp"
+        with open(temp_path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(sorted(latest.values(), key=lambda change: int(change["version"])))
+        os.replace(temp_path, self.changes_file)
+        stat = os.stat(self.changes_file)
+        self.inode, self.offset = stat.st_ino, stat.st_size
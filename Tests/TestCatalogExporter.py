@@ -0,0 +1,64 @@
+import os
+import csv
+import gzip
+import json
+import shutil
+import unittest
+from Library import Library
+from CatalogExporter import CatalogExporter
+from library.__main__ import main
+
+class TestCatalogExporter(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = os.path.join("test_csv_files", "export")
+        os.makedirs(self.data_dir, exist_ok=True)
+        with open(os.path.join(self.data_dir, "books.csv"), "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=["title", "author", "is_loaned", "copies", "genre", "year"])
+            writer.writeheader()
+            writer.writerows([
+                {"title": "Book A", "author": "Author A", "is_loaned": "No", "copies": 2, "genre": "Fiction", "year": 2000},
+                {"title": "Book B", "author": "Author B", "is_loaned": "No", "copies": 1, "genre": "Science", "year": 2010},
+                {"title": "Book C", "author": "Author C", "is_loaned": "No", "copies": 1, "genre": "Fiction", "year": 2020},
+            ])
+        self.library = Library.from_directory(self.data_dir)
+        self.exporter = CatalogExporter(self.library)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def test_export_formats(self):
+        self.library.borrow_book("Book C")
+        self.library.waiting_list_manager.add_to_waiting_list("Book C", "Author C", "Fiction", 2020, "Client 1", "", "")
+
+        csv_path = os.path.join(self.data_dir, "loans.csv")
+        self.assertEqual(self.exporter.export("loans", csv_path)["rows"], 3)
+        with open(csv_path, "r", encoding="utf-8") as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(rows[2], {"title": "Book C", "author": "Author C", "loaned_copies": "1", "in_waiting_list": "1",
+                                   "genre": "Fiction", "year": "2020"})
+
+        gz_path = os.path.join(self.data_dir, "catalog.jsonl.gz")
+        self.assertEqual(self.exporter.export("catalog", gz_path, search_type="genre", query="fiction")["rows"], 2)
+        with gzip.open(gz_path, "rt", encoding="utf-8") as file:
+            rows = [json.loads(line) for line in file]
+        self.assertEqual([row["title"] for row in rows], ["Book A", "Book C"])
+        self.assertEqual(rows[1]["is_loaned"], "Yes")
+
+        waitlist_path = os.path.join(self.data_dir, "waitlist.jsonl")
+        self.assertEqual(self.exporter.export("waitlist", waitlist_path, search_type="title", query="book c")["rows"], 1)
+        self.assertEqual(self.exporter.export("waitlist", waitlist_path, search_type="author", query="Author A")["rows"], 0)
+        self.assertFalse([name for name in os.listdir(self.data_dir) if name.endswith(".tmp")])
+
+        with self.assertRaises(ValueError):
+            self.exporter.export("everything", csv_path)
+        self.assertEqual(main(["--data-dir", self.data_dir, "export", "availability", csv_path, "--query", "Book B"]), 0)
+        with open(csv_path, "r", encoding="utf-8") as file:
+            self.assertEqual([row["available_copies"] for row in csv.DictReader(file)], ["1"])
+
+    def test_rows_are_streamed(self):
+        rows = self.exporter.rows("catalog")
+        self.assertEqual(next(rows)["title"], "Book A")  # A generator, not a list of the whole catalog
+        self.assertNotIsInstance(self.exporter.rows("availability"), list)
+
+if __name__ == "__main__":
+    unittest.main()
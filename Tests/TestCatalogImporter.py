@@ -0,0 +1,117 @@
+import os
+import csv
+import json
+import shutil
+import unittest
+from Library import Library
+from CatalogImporter import CatalogImporter
+from CatalogWatcher import CatalogWatcher
+
+class TestCatalogImporter(unittest.TestCase):
+    def setUp(self):
+        # Start every test from an empty library
+        self.books_file = os.path.join("test_csv_files", "import_books.csv")
+        self.available_books_file = os.path.join("test_csv_files", "import_available_books.csv")
+        self.loaned_books_file = os.path.join("test_csv_files", "import_loaned_books.csv")
+        self.import_file = os.path.join("test_csv_files", "import_source.csv")
+        os.makedirs("test_csv_files", exist_ok=True)
+        for file_path in [self.books_file, self.available_books_file, self.loaned_books_file]:
+            with open(file_path, "w", newline="", encoding="utf-8") as file:
+                file.write("")
+
+        self.library = Library(
+            books_file=self.books_file,
+            available_books_file=self.available_books_file,
+            loaned_books_file=self.loaned_books_file,
+        )
+
+    def tearDown(self):
+        for file_path in [self.books_file, self.available_books_file, self.loaned_books_file, self.import_file,
+                          self.import_file.replace(".csv", ".jsonl")]:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def write_import_csv(self, rows):
+        with open(self.import_file, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=["title", "author", "is_loaned", "copies", "genre", "year"])
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def test_import_merges_duplicates(self):
+        self.write_import_csv([
+            {"title": "Book A", "author": "Author A", "is_loaned": "No", "copies": 3, "genre": "Fiction", "year": 2000},
+            {"title": "Book B", "author": "Author B", "is_loaned": "No", "copies": 2, "genre": "Science", "year": 2010},
+            {"title": "Book A", "author": "Author A", "is_loaned": "No", "copies": 2, "genre": "Fiction", "year": 2000},
+        ])
+        report = CatalogImporter(self.library, batch_size=1).import_file(self.import_file)
+
+        self.assertEqual(report["rows"], 3)
+        self.assertEqual(report["added"], 2)
+        self.assertEqual(report["merged"], 1)
+        self.assertEqual(len(self.library.books), 2)
+        self.assertEqual(self.library.available_copies["Book A"], 5)
+
+        # The files on disk must match the memory state
+        reloaded = Library(
+            books_file=self.books_file,
+            available_books_file=self.available_books_file,
+            loaned_books_file=self.loaned_books_file,
+        )
+        self.assertEqual([book.title for book in reloaded.books], ["Book A", "Book B"])
+        self.assertEqual(reloaded.available_copies["Book A"], 5)
+
+    def test_import_json_lines_in_batches(self):
+        jsonl_file = self.import_file.replace(".csv", ".jsonl")
+        with open(jsonl_file, "w", encoding="utf-8") as file:
+            for i in range(5):
+                file.write(json.dumps({"title": f"Book {i}", "author": "Author", "is_loaned": i == 0,
+                                       "copies": 1, "genre": "Fiction", "year": 2000}) + "\n")
+            file.write(json.dumps({"title": "Broken", "author": "Author"}) + "\n")
+            file.write('{"title": "Cut short", "author"\n')
+        report = CatalogImporter(self.library, batch_size=2).import_file(jsonl_file)
+
+        self.assertEqual(report["added"], 5)
+        self.assertEqual(report["skipped"], 2)
+        self.assertEqual(self.library.available_copies["Book 0"], 0)
+        reloaded = Library(
+            books_file=self.books_file,
+            available_books_file=self.available_books_file,
+            loaned_books_file=self.loaned_books_file,
+        )
+        self.assertEqual(len(reloaded.books), 5)
+        self.assertEqual(reloaded.loaned_books["Book 0"], 1)
+
+    def test_import_skips_other_books_with_an_existing_title(self):
+        self.write_import_csv([
+            {"title": "Book A", "author": "Author A", "is_loaned": "No", "copies": 3, "genre": "Fiction", "year": 2000},
+        ])
+        CatalogImporter(self.library).import_file(self.import_file)
+        self.write_import_csv([
+            {"title": "Book A", "author": "Someone Else", "is_loaned": "Yes", "copies": 1, "genre": "Fiction", "year": 2000},
+            {"title": "Book A", "author": "Author A", "is_loaned": "Yes", "copies": 1, "genre": "Fiction", "year": 2000},
+        ])
+        report = CatalogImporter(self.library).import_file(self.import_file)
+
+        self.assertEqual((report["added"], report["merged"], report["skipped"]), (0, 1, 1))
+        self.assertEqual([book.author for book in self.library.books], ["Author A"])
+        self.assertEqual((self.library.available_copies["Book A"], self.library.loaned_books["Book A"]), (3, 1))
+
+    def test_import_into_a_shared_library(self):
+        data_dir = os.path.join("test_csv_files", "shared_import")
+        os.makedirs(data_dir, exist_ok=True)
+        self.addCleanup(shutil.rmtree, data_dir)
+        desk_a = Library.from_directory(data_dir, shared=True)
+        desk_b = Library.from_directory(data_dir, shared=True)
+        self.write_import_csv([
+            {"title": "Book A", "author": "Author A", "is_loaned": "No", "copies": 3, "genre": "Fiction", "year": 2000},
+            {"title": "Book B", "author": "Author B", "is_loaned": "No", "copies": 2, "genre": "Science", "year": 2010},
+        ])
+        CatalogImporter(desk_a).import_file(self.import_file)
+
+        self.assertFalse(CatalogWatcher(desk_a).changed())  # The import is not an external edit
+        self.assertEqual(desk_b.pull_changes(), 2)
+        self.assertEqual([book.title for book in desk_b.books], ["Book A", "Book B"])
+        self.assertEqual(desk_b.available_copies["Book A"], 3)
+
+if __name__ == "__main__":
+    unittest.main()
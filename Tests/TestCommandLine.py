@@ -0,0 +1,42 @@
+import os
+import csv
+import sys
+import shutil
+import unittest
+import subprocess
+from library.__main__ import main
+
+class TestCommandLine(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = os.path.join("test_csv_files", "cli")
+        os.makedirs(self.data_dir, exist_ok=True)
+        with open(os.path.join(self.data_dir, "books.csv"), "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=["title", "author", "is_loaned", "copies", "genre", "year"])
+            writer.writeheader()
+            writer.writerow({"title": "Book A", "author": "Author A", "is_loaned": "No", "copies": 1, "genre": "Fiction", "year": 2000})
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def test_borrow_and_return(self):
+        self.assertEqual(main(["--data-dir", self.data_dir, "borrow", "Book A"]), 0)
+        self.assertEqual(main(["--data-dir", self.data_dir, "borrow", "Book A"]), 1)  # No copies left
+        self.assertEqual(main(["--data-dir", self.data_dir, "return", "Book A"]), 0)
+        self.assertEqual(main(["--data-dir", self.data_dir, "borrow", "Missing"]), 1)
+
+    def test_reservations(self):
+        self.assertEqual(main(["--data-dir", self.data_dir, "waitlist", "join", "Book A", "--client", "Dana"]), 0)
+        self.assertEqual(main(["--data-dir", self.data_dir, "waitlist", "join", "Book A", "--client", "Dana"]), 1)
+        self.assertEqual(main(["--data-dir", self.data_dir, "reservations", "Dana", "--cancel", "Book A"]), 0)
+        self.assertEqual(main(["--data-dir", self.data_dir, "reservations", "Dana", "--cancel", "Book A"]), 1)
+
+    def test_search_skips_gui_and_password_modules(self):
+        code = ("import sys; from library.__main__ import main; "
+                f"main(['--data-dir', {self.data_dir!r}, 'search', 'Book']); "
+                "print('tkinter' in sys.modules, 'werkzeug' in sys.modules)")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertIn("Book A by Author A", output)
+        self.assertTrue(output.strip().endswith("False False"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,16 @@
 import os
+import shutil
 import csv
+import time
 import unittest
 from Library import Library
 from BookFactory import BookFactory
+from BookCategoryIterator import BookCategoryIterator
+from CatalogSnapshot import CatalogSnapshot
+from CatalogWatcher import CatalogWatcher
+from LoanHistory import LoanHistory, DAY, HOUR, WEEK
+from Recommender import Recommender
+from WaitingListManager import WaitingListManager
 
 class TestLibrary(unittest.TestCase):
     def setUp(self):
@@ -11,6 +19,7 @@ class TestLibrary(unittest.TestCase):
         self.available_books_file = os.path.join("test_csv_files", "available_books.csv")
         self.loaned_books_file = os.path.join("test_csv_files", "loaned_books.csv")
         self.waiting_list_file = os.path.join("test_csv_files", "waiting_list.csv")
+        self.loan_history_dir = os.path.join("test_csv_files", "loan_history")
 
         # Ensure necessary directories and files exist
         self.ensure_csv_files_exist()
@@ -23,6 +32,9 @@ class TestLibrary(unittest.TestCase):
             books_file=self.books_file,
             available_books_file=self.available_books_file,
             loaned_books_file=self.loaned_books_file,
+            waiting_list_file=self.waiting_list_file,
+            holds_file=os.path.join("test_csv_files", "library_holds.csv"),
+            loan_history_dir=self.loan_history_dir,
         )
 
     def ensure_csv_files_exist(self):
@@ -75,6 +87,10 @@ class TestLibrary(unittest.TestCase):
         for file_path in [self.books_file, self.available_books_file, self.loaned_books_file, self.waiting_list_file]:
             with open(file_path, "w", newline="", encoding="utf-8") as file:
                 file.write("")  # Clear the file content
+        for name in os.listdir("test_csv_files"):
+            if name.endswith(".seg") or name == "library_holds.csv":
+                os.remove(os.path.join("test_csv_files", name))
+        shutil.rmtree(self.loan_history_dir, ignore_errors=True)
 
     def test_borrow_book(self):
         result = self.library.borrow_book("Book A")
@@ -122,6 +138,12 @@ class TestLibrary(unittest.TestCase):
         for file in [temp_books_file, temp_available_books_file, temp_loaned_books_file]:
             os.remove(file)
 
+    def test_add_duplicate_book(self):
+        duplicate = BookFactory.create_book("Book A", "Author A", False, 1, "Fiction", 2000)
+        with self.assertRaises(RuntimeError):
+            self.library.add_book(duplicate)
+        self.assertEqual([book.title for book in self.library.books].count("Book A"), 1)
+
     def test_remove_book(self):
         result = self.library.remove_book("Book A")
         self.assertEqual(result, "book 'Book A' removed successfully")
@@ -135,10 +157,282 @@ class TestLibrary(unittest.TestCase):
         self.assertEqual(len(popular_books), 3)
         self.assertEqual(popular_books[0]["title"], "Book A")  # Most popular
 
+    def test_column_view_tracks_changes(self):
+        columns = self.library.column_view()
+        self.library.borrow_book("Book C")
+        self.assertEqual([book.title for book in columns.loaned_out_books()], ["Book C"])
+        self.assertEqual([book.title for book in columns.available_books()], ["Book A", "Book B"])
+
+        self.library.add_book(BookFactory.create_book("Book D", "Author D", False, 4, "Science", 2021))
+        self.assertEqual(columns.totals(), {"titles": 4, "copies": 10, "available": 9, "loaned": 1})
+        self.assertEqual(columns.genre_totals()["Science"], {"titles": 2, "copies": 6, "available": 6, "loaned": 0})
+        self.assertEqual(columns.genre_totals()["Fiction"]["loaned"], 1)
+
+    def test_category_iterator_follows_genre_index(self):
+        self.library.add_book(BookFactory.create_book("Another Book", "Author D", False, 1, "Fiction", 2021))
+        self.library.remove_book("Book B")
+        items = [item if isinstance(item, str) else item.title
+                 for item in BookCategoryIterator(self.library.genre_index)]
+        self.assertEqual(items, ["Fiction", "Another Book", "Book A", "Book C"])
+
+        self.library.add_book(BookFactory.create_book("Book E", "Author E", False, 1, "History", 2022))
+        self.assertEqual(next(BookCategoryIterator(self.library.genre_index, start_genre="G")), "History")
+        self.assertEqual(next(BookCategoryIterator(self.library.genre_index, offset=1)), "History")
+        self.assertEqual(list(BookCategoryIterator(self.library.genre_index, start_genre="Z")), [])
+
+    def test_hold_expiry_rolls_over_to_next_client(self):
+        holds_file = os.path.join("test_csv_files", "holds.csv")
+        waiting_list_file = os.path.join("test_csv_files", "hold_waiting_list.csv")
+        for file_path in [holds_file, waiting_list_file]:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        library = Library(
+            books_file=self.books_file,
+            available_books_file=self.available_books_file,
+            loaned_books_file=self.loaned_books_file,
+            waiting_list_file=waiting_list_file,
+            holds_file=holds_file,
+            hold_duration=60,
+            loan_history_dir=self.loan_history_dir,
+        )
+        library.borrow_book("Book C")
+        for client in ["Client 1", "Client 2"]:
+            library.waiting_list_manager.add_to_waiting_list("Book C", "Author C", "Fiction", 2020, client, "", "")
+
+        self.assertIn("notified 'Client 1'", library.return_book("Book C"))
+        self.assertEqual(library.borrow_book("Book C"), "book borrowed fail - no available copies")  # Copy is held
+
+        # Holds survive a restart
+        library = Library(
+            books_file=self.books_file,
+            available_books_file=self.available_books_file,
+            loaned_books_file=self.loaned_books_file,
+            waiting_list_file=waiting_list_file,
+            holds_file=holds_file,
+            hold_duration=60,
+            loan_history_dir=self.loan_history_dir,
+        )
+        messages = library.expire_holds(now=time.time() + 61)
+        self.assertEqual(messages, ["hold of 'Client 1' on 'Book C' expired, notified 'Client 2'"])
+        self.assertEqual(library.borrow_book("Book C", client="Client 1"), "book borrowed fail - no available copies")
+        self.assertEqual(library.borrow_book("Book C", client="Client 2"), "book borrowed successfully")
+
+        # With nobody left waiting, an expired hold puts the copy back on the shelf
+        library.return_book("Book C")
+        self.assertEqual(library.available_copies["Book C"], 1)
+        library.borrow_book("Book C")
+        library.waiting_list_manager.add_to_waiting_list("Book C", "Author C", "Fiction", 2020, "Client 3", "", "")
+        library.return_book("Book C")
+        self.assertEqual(library.expire_holds(now=time.time() + 61),
+                         ["hold of 'Client 3' on 'Book C' expired, copy returned to the shelf"])
+        self.assertEqual(library.available_copies["Book C"], 1)
+        for file_path in [holds_file, waiting_list_file]:
+            os.remove(file_path)
+
+    def test_catalog_snapshots_are_immutable(self):
+        snapshot = self.library.books
+        self.library.add_book(BookFactory.create_book("Book D", "Author D", False, 1, "Fiction", 2021))
+        self.library.remove_book("Book A")
+        self.assertEqual([book.title for book in snapshot], ["Book A", "Book B", "Book C"])
+        self.assertEqual([book.title for book in self.library.books], ["Book B", "Book C", "Book D"])
+        self.assertGreater(self.library.books.version, snapshot.version)
+
+        # New versions share the chunks they did not touch
+        books = [BookFactory.create_book(f"Title {i}", "Author", False, 1, "Fiction", 2000) for i in range(1500)]
+        big = CatalogSnapshot.from_books(books)
+        grown = big.appended(books[0])
+        self.assertIs(grown.chunks[0], big.chunks[0])
+        shrunk = grown.without(lambda book: book.title == "Title 1400")
+        self.assertIs(shrunk.chunks[0], big.chunks[0])
+        self.assertEqual(len(shrunk), 1500)
+        self.assertEqual(shrunk[1400].title, "Title 1401")
+        self.assertEqual(shrunk[-1].title, "Title 0")
+
     def test_waiting_list_management(self):
         self.library.waiting_list_manager.add_to_waiting_list("Book A", "Author A", "Fiction", 2000, "Client 1", "client1@example.com", "123456789")
         waiting_list = self.library.waiting_list_manager.get_waiting_list_for_book("Book A")
         self.assertEqual(len(waiting_list), 1)
 
+    def test_client_reservations(self):
+        manager = self.library.waiting_list_manager
+        manager.add_to_waiting_list("Book A", "Author A", "Fiction", 2000, "Client 1", "", "")
+        manager.add_to_waiting_list("Book B", "Author B", "Science", 2010, "Client 1", "", "")
+        manager.add_to_waiting_list("Book A", "Author A", "Fiction", 2000, "Client 2", "", "")
+        with self.assertRaises(ValueError):
+            manager.add_to_waiting_list("Book A", "Author A", "Fiction", 2000, "Client 1", "", "")
+        self.assertEqual([entry["title"] for entry in manager.get_entries_for_client("Client 1")], ["Book A", "Book B"])
+
+        self.assertEqual(len(manager.cancel_client_entries("Client 1", "Book A")), 1)
+        self.assertEqual(manager.get_waiting_list_for_book("Book A")[0]["client"], "Client 2")
+        manager.notify_next_client("Book A")
+        self.assertEqual(manager.get_entries_for_client("Client 2"), [])
+        manager.remove_waiting_list_for_book("Book B")
+        self.assertNotIn("Client 1", manager.entries_by_client)
+
+        # Duplicates written before joins were checked are cleaned up per client
+        with open(self.waiting_list_file, "a", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            for time_of_entry in ["2024-01-01T10:00:00", "2024-01-02T10:00:00"]:
+                writer.writerow(["Book C", "Author C", "Fiction", "2020", "Client 3", "", "", time_of_entry])
+        reloaded = WaitingListManager(self.waiting_list_file)
+        self.assertEqual(len(reloaded.get_entries_for_client("Client 3")), 2)
+        self.assertEqual([entry["time_of_entry"] for entry in reloaded.dedupe_client_entries("Client 3")],
+                         ["2024-01-02T10:00:00"])
+        self.assertEqual(WaitingListManager(self.waiting_list_file).count_waiting_list("Book C"), 1)
+
+    def test_waiting_list_segments_and_compaction(self):
+        manager = WaitingListManager(self.waiting_list_file, segment_max_bytes=200, compaction_min_records=10**6)
+        for number in range(5):
+            manager.add_to_waiting_list("Book A", "Author A", "Fiction", 2000, f"Client {number}", "", "")
+        manager.remove_waiting_list_entry(manager.get_waiting_list_for_book("Book A")[1])
+        manager.notify_next_client("Book A")
+        self.assertGreater(len(manager.segment_numbers()), 1)  # Segments rotate once they are full
+
+        # A restart replays the base file and the segments, tombstones included
+        reloaded = WaitingListManager(self.waiting_list_file)
+        self.assertEqual([entry["client"] for entry in reloaded.get_waiting_list_for_book("Book A")],
+                         ["Client 2", "Client 3", "Client 4"])
+        self.assertEqual(reloaded.count_waiting_list("book a"), 3)
+
+        reloaded.compact()
+        self.assertEqual(reloaded.segment_numbers(), [])
+        reloaded.remove_waiting_list_for_book("Book A")
+        reloaded.add_to_waiting_list("Book B", "Author B", "Science", 2010, "Client 5", "", "")
+        compacted = WaitingListManager(self.waiting_list_file)
+        self.assertEqual(compacted.get_waiting_list_for_book("Book A"), [])
+        self.assertEqual(compacted.count_waiting_lists(), {"book b": 1})
+
+        # Enough dead records trigger a background compaction
+        busy = WaitingListManager(self.waiting_list_file, compaction_min_records=4)
+        for number in range(3):
+            busy.add_to_waiting_list("Book C", "Author C", "Fiction", 2020, f"Client {number}", "", "")
+            busy.notify_next_client("Book C")
+        busy.wait_for_compaction()
+        self.assertEqual(WaitingListManager(self.waiting_list_file).count_waiting_lists(), {"book b": 1})
+
+    def test_loan_history_windows(self):
+        history = LoanHistory(self.loan_history_dir)
+        now = 1000 * WEEK + 3 * DAY + 5 * HOUR  # Mid-week, mid-day
+        history.record("borrow", "Book A", "Client 1", now=now - 20 * DAY)
+        history.record("borrow", "Book B", "Client 2", now=now - 3 * DAY)
+        history.record("borrow", "Book B", "Client 3", now=now - 2 * HOUR)
+        history.record("return", "Book B", now=now - HOUR)
+        history.record("borrow", "Book C", "Client 1", now=now)
+
+        self.assertEqual(history.borrow_counts(3 * HOUR, now), {"Book B": 1, "Book C": 1})
+        self.assertEqual(history.top_titles(count=1, days=7, now=now), [("Book B", 2)])
+        self.assertEqual(history.borrow_counts(30 * DAY, now), {"Book A": 1, "Book B": 2, "Book C": 1})
+        self.assertEqual(history.borrow_counts(200 * DAY, now), {"Book A": 1, "Book B": 2, "Book C": 1})
+
+        # The buckets are rebuilt from the day partitions on load
+        reloaded = LoanHistory(self.loan_history_dir)
+        reloaded.buckets = {name: {} for name in reloaded.buckets}
+        reloaded.load_history(now=now)
+        self.assertEqual(reloaded.borrow_counts(30 * DAY, now), {"Book A": 1, "Book B": 2, "Book C": 1})
+
+    def test_popular_books_in_recent_days(self):
+        self.library.borrow_book("Book B")
+        self.library.borrow_book("Book B")
+        self.library.return_book("Book B")
+        self.library.borrow_book("Book A")
+        self.assertEqual([(book["title"], book["popularity"]) for book in self.library.popular_books(days=7)],
+                         [("Book B", 2), ("Book A", 1)])
+        self.library.remove_book("Book B")
+        self.assertEqual([book["title"] for book in self.library.popular_books(days=7)], ["Book A"])
+
+    def test_co_borrow_recommendations(self):
+        for client, title in [("Client 1", "Book A"), ("Client 1", "Book B"), ("Client 2", "Book A"),
+                              ("Client 2", "Book B"), ("Client 2", "Book C"), ("Client 3", "Book C")]:
+            self.library.borrow_book(title, client=client)
+            self.library.return_book(title)
+        self.library.borrow_book("Book A")  # Anonymous borrows are not linked
+        self.assertEqual(self.library.recommend("Book A"), ["Book B", "Book C"])
+        self.assertEqual(self.library.recommend("Book C"), ["Book A", "Book B"])
+
+        # The cached neighbours are only recomputed for titles whose counts changed
+        cached = self.library.recommender.top_cache["Book C"]
+        self.library.recommender.record_borrow("Client 3", "Book A")
+        self.assertNotIn("Book C", self.library.recommender.top_cache)
+        self.assertEqual(self.library.recommender.neighbours("Book C"), [(2, "Book A"), (1, "Book B")])
+        self.assertIsNot(self.library.recommender.top_cache["Book C"], cached)
+
+        # The batch rebuild agrees with the incremental matrix, and the history survives a restart
+        incremental = {title: dict(row) for title, row in self.library.recommender.co_borrows.items()}
+        self.library.rebuild_recommendations()
+        self.library.recommender.replay([{"event": "borrow", "client": "Client 3", "title": "Book A"}])
+        self.assertEqual(self.library.recommender.co_borrows, incremental)
+        reloaded = Library(
+            books_file=self.books_file,
+            available_books_file=self.available_books_file,
+            loaned_books_file=self.loaned_books_file,
+            waiting_list_file=self.waiting_list_file,
+            holds_file=os.path.join("test_csv_files", "library_holds.csv"),
+            loan_history_dir=self.loan_history_dir,
+        )
+        self.assertEqual(reloaded.recommender.co_borrows, {})  # The history is only replayed on first use
+        reloaded.borrow_book("Book A", client="Client 1")
+        self.assertEqual(reloaded.recommend("Book A"), ["Book B", "Book C"])
+        self.assertEqual(reloaded.recommender.co_borrows["Book A"], {"Book B": 2, "Book C": 1})
+
+        recommender = Recommender(top_k=1)
+        recommender.rebuild([{"event": "borrow", "client": client, "title": title} for client, title in
+                             [("x", "A"), ("x", "B"), ("x", "C"), ("y", "A"), ("y", "C")]])
+        self.assertEqual(recommender.recommend("A"), ["C"])
+        self.library.remove_book("Book B")
+        self.assertEqual(self.library.recommend("Book A"), ["Book C"])
+
+    def test_external_books_file_edit(self):
+        watcher = CatalogWatcher(self.library)
+        self.assertIsNone(watcher.check())
+        self.library.borrow_book("Book A")
+        self.assertIsNone(watcher.check())  # The library's own writes are not reloaded
+        for title in ["Book B", "Book C"]:
+            self.library.waiting_list_manager.add_to_waiting_list(title, "", "", 2000, "Client 1", "", "")
+
+        # A save caught halfway is left alone, and tried again at the next check
+        with open(self.books_file, "a", newline="", encoding="utf-8") as file:
+            file.write("Book E,Author E,No,")
+        self.assertIsNone(watcher.check())
+        self.assertTrue(watcher.changed())
+        self.assertEqual(len(self.library.books), 3)
+
+        # Edit books.csv behind the library's back: more copies of A, B's author and genre fixed, C withdrawn, D added
+        version = self.library.books.version
+        with open(self.books_file, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=["title", "author", "is_loaned", "copies", "genre", "year"])
+            writer.writeheader()
+            writer.writerows([
+                {"title": "Book A", "author": "Author A", "is_loaned": "No", "copies": 5, "genre": "Fiction", "year": 2000},
+                {"title": "Book B", "author": "Author B.", "is_loaned": "No", "copies": 2, "genre": "Physics", "year": 2010},
+                {"title": "Book D", "author": "Author D", "is_loaned": "No", "copies": 4, "genre": "History", "year": 1999},
+            ])
+        changes = watcher.check()
+        self.assertEqual([book.title for book in changes["added"]], ["Book D"])
+        self.assertEqual([book.title for book in changes["removed"]], ["Book C"])
+        self.assertEqual([book.title for book in changes["updated"]], ["Book A", "Book B"])
+        self.assertIn(("Book B", "Author B.", "Physics", 2010), self.library.books_by_key)
+        self.assertNotIn("Science", self.library.genre_index.genres())
+        # Waiting lists survive both the metadata fix and the withdrawal
+        self.assertEqual(self.library.waiting_list_manager.count_waiting_list("Book B"), 1)
+        self.assertEqual(self.library.waiting_list_manager.count_waiting_list("Book C"), 1)
+        self.assertGreater(self.library.books.version, version)
+        self.assertEqual([book.title for book in self.library.books], ["Book A", "Book B", "Book D"])
+        self.assertEqual(self.library.available_copies["Book A"], 4)  # The borrowed copy stays on loan
+        self.assertEqual(self.library.loaned_books["Book A"], 1)
+        self.assertEqual(self.library.available_copies["Book D"], 4)
+        self.assertNotIn("Book C", self.library.available_copies)
+        self.assertIsNone(watcher.check())
+
+        reloaded = Library(
+            books_file=self.books_file,
+            available_books_file=self.available_books_file,
+            loaned_books_file=self.loaned_books_file,
+            waiting_list_file=self.waiting_list_file,
+            holds_file=os.path.join("test_csv_files", "library_holds.csv"),
+            loan_history_dir=self.loan_history_dir,
+        )
+        self.assertEqual(reloaded.available_copies["Book D"], 4)
+        self.assertEqual(reloaded.loaned_books["Book A"], 1)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,48 @@
+import os
+import shutil
+import threading
+import unittest
+from Library import Library
+from LibraryService import LibraryService
+
+class TestLibraryService(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = os.path.join("test_csv_files", "service")
+        os.makedirs(self.data_dir, exist_ok=True)
+        with open(os.path.join(self.data_dir, "books.csv"), "w", newline="", encoding="utf-8") as file:
+            file.write("title,author,is_loaned,copies,genre,year\nBook A,Author A,No,1,Fiction,2000\n")
+        self.service = LibraryService(Library.from_directory(self.data_dir))
+
+    def tearDown(self):
+        self.service.close()
+        shutil.rmtree(self.data_dir)
+
+    def test_commands_run_in_order_on_the_worker(self):
+        threads = []
+        first = self.service.call("borrow_book", "Book A")
+        second = self.service.call("borrow_book", "Book A")
+        third = self.service.submit(lambda library: threads.append(threading.current_thread()) or library.available_copies["Book A"])
+        self.assertEqual(first.result(timeout=5), "book borrowed successfully")
+        self.assertEqual(second.result(timeout=5), "book borrowed fail - no available copies")
+        self.assertEqual(third.result(timeout=5), 0)
+        self.assertIs(threads[0], self.service.worker)
+        self.assertFalse(self.service.busy())
+
+    def test_errors_are_returned_through_the_future(self):
+        future = self.service.call("borrow_book", "Missing")
+        with self.assertRaises(ValueError):
+            future.result(timeout=5)
+        self.assertEqual(self.service.call("return_book", "Book A").result(timeout=5), "book 'Book A' returned fail")
+
+    def test_blocked_worker_keeps_submit_non_blocking(self):
+        release = threading.Event()
+        blocker = self.service.submit(lambda library: release.wait(5))
+        queued = self.service.call("borrow_book", "Book A")
+        self.assertFalse(queued.done())  # Submitting returned at once although the worker is busy
+        self.assertTrue(self.service.busy())
+        release.set()
+        self.assertTrue(blocker.result(timeout=5))
+        self.assertEqual(queued.result(timeout=5), "book borrowed successfully")
+
+if __name__ == "__main__":
+    unittest.main()
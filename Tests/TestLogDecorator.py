@@ -0,0 +1,88 @@
+import io
+import os
+import gzip
+import shutil
+import unittest
+import contextlib
+import log_decorator
+from log_decorator import LogWriter, configure_logging, log_decorator as logged
+
+class TestLogDecorator(unittest.TestCase):
+    def setUp(self):
+        os.makedirs("test_csv_files", exist_ok=True)
+        self.log_file = os.path.join("test_csv_files", "test_log.txt")
+        self.remove_logs()
+
+    def tearDown(self):
+        configure_logging()
+        self.remove_logs()
+
+    def remove_logs(self):
+        for name in os.listdir("test_csv_files"):
+            if name.startswith("test_log.txt"):
+                os.remove(os.path.join("test_csv_files", name))
+
+    def test_decorator_enqueues_messages(self):
+        configure_logging(log_file=self.log_file)
+
+        @logged
+        def borrow():
+            return "book borrowed successfully"
+
+        borrow()
+        log_decorator.log_writer.flush()
+        with open(self.log_file, "r", encoding="utf-8") as file:
+            content = file.read()
+        self.assertIn("book borrowed successfully", content)
+
+    def test_size_rotation_with_gzip(self):
+        writer = LogWriter(log_file=self.log_file, max_bytes=200, backup_count=2, compress=True)
+        for i in range(50):
+            writer.write(f"message number {i}")
+        writer.close()
+
+        self.assertTrue(os.path.exists(self.log_file + ".1.gz"))
+        self.assertTrue(os.path.exists(self.log_file + ".2.gz"))
+        self.assertFalse(os.path.exists(self.log_file + ".3.gz"))
+        with gzip.open(self.log_file + ".1.gz", "rt", encoding="utf-8") as file:
+            self.assertIn("message number", file.read())
+        with open(self.log_file, "r", encoding="utf-8") as file:
+            self.assertIn("message number 49", file.read())
+
+    def test_flush_does_not_wait_for_a_dead_writer(self):
+        writer = LogWriter(log_file=self.log_file)
+        writer.write("book borrowed successfully")
+        self.assertTrue(writer.flush())
+        self.assertEqual(writer.size, os.path.getsize(self.log_file))
+
+        writer.queue.put(None)  # The writer thread stops, as if it had died
+        writer.thread.join()
+        self.assertFalse(writer.flush())
+        self.assertFalse(writer.flush(timeout=0.2))
+
+        # The next record starts a new writer, which also writes the records left in the queue
+        writer.write("book returned successfully")
+        self.assertTrue(writer.flush(timeout=5))
+        writer.close()
+        with open(self.log_file, "r", encoding="utf-8") as file:
+            self.assertIn("book returned successfully", file.read())
+
+    def test_unwritable_log_goes_to_stderr(self):
+        log_dir = os.path.join("test_csv_files", "test_log_dir")
+        self.addCleanup(shutil.rmtree, log_dir, ignore_errors=True)
+        writer = LogWriter(log_file=os.path.join(log_dir, "log.txt"))
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            writer.write("book borrowed successfully")  # The directory doesn't exist yet
+            self.assertTrue(writer.flush(timeout=5))
+        self.assertIn("book borrowed successfully", stderr.getvalue())
+        self.assertTrue(writer.thread.is_alive())
+
+        os.makedirs(log_dir)
+        writer.write("book returned successfully")
+        writer.close()
+        with open(os.path.join(log_dir, "log.txt"), "r", encoding="utf-8") as file:
+            self.assertIn("book returned successfully", file.read())
+
+if __name__ == "__main__":
+    unittest.main()
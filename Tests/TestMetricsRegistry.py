@@ -0,0 +1,103 @@
+import csv
+import gc
+import os
+import socket
+import shutil
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from DynamicSearch import DynamicSearch
+from Library import Library
+from metrics_registry import MetricsRegistry, metrics, serve_from_environment
+from operation_metrics import operation_metrics
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        metrics.enable()
+        operation_metrics.reset()
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.stop()
+
+    def test_disabled_registry_records_nothing(self):
+        registry = MetricsRegistry()
+        registry.inc("library_borrows_total")
+        registry.observe("library_flush_bytes", 2048, file="books.csv")
+        self.assertEqual(registry.values(), {})
+
+    def test_thread_shards_are_summed(self):
+        registry = MetricsRegistry()
+        registry.enable()
+
+        def borrow():
+            for _ in range(1000):
+                registry.inc("library_borrows_total")
+
+        threads = [threading.Thread(target=borrow) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        registry.inc("library_notifications_in_flight")
+        registry.inc("library_notifications_in_flight", -1)
+        self.assertEqual(registry.values()[("library_borrows_total", ())], 4000)
+        self.assertEqual(len(registry.shards), 5)
+        self.assertIn("library_notifications_in_flight 0\n", registry.exposition())
+
+    def test_library_metrics_served_over_http(self):
+        data_dir = os.path.join("test_csv_files", "metrics")
+        os.makedirs(data_dir, exist_ok=True)
+        self.addCleanup(shutil.rmtree, data_dir)
+        with open(os.path.join(data_dir, "books.csv"), "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=["title", "author", "is_loaned", "copies", "genre", "year"])
+            writer.writeheader()
+            writer.writerow({"title": "Book A", "author": "Author A", "is_loaned": "No", "copies": 1,
+                             "genre": "Fiction", "year": 2000})
+        library = Library.from_directory(data_dir)
+        library.borrow_book("Book A")
+        library.waiting_list_manager.add_to_waiting_list("Book A", "Author A", "Fiction", 2000, "Client 1", "", "")
+        DynamicSearch().search("title", library.books, "book")
+        library.recommend("Book A")
+        library.recommend("Book A")
+
+        port = metrics.serve(port=0)
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            self.assertTrue(response.headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+            text = response.read().decode("utf-8")
+        self.assertIn("library_borrows_total 1\n", text)
+        self.assertIn("library_waitlist_depth 1\n", text)
+        self.assertIn('library_cache_requests_total{cache="recommendations",result="hit"} 1\n', text)
+        self.assertIn('library_cache_requests_total{cache="recommendations",result="miss"} 1\n', text)
+        # The timed operations are exported from operation_metrics, not timed again
+        self.assertIn('library_operation_seconds_count{operation="search"} 1\n', text)
+        self.assertIn('library_operation_seconds_bucket{operation="search",le="+Inf"} 1\n', text)
+        self.assertIn('library_operation_seconds_bucket{operation="search",le="1.0"} 1\n', text)
+        self.assertIn('library_operations_total{operation="borrow",outcome="success"} 1\n', text)
+        self.assertIn('library_flush_bytes_count{file="waiting_list.csv"} 1\n', text)
+        self.assertIn("# TYPE library_notifications_total counter", text)
+        with self.assertRaises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/other")
+
+        # The gauge doesn't keep the library alive
+        del library
+        gc.collect()
+        self.assertNotIn(("library_waitlist_depth", ()), metrics.values())
+
+    def test_port_in_use_leaves_metrics_off(self):
+        metrics.disable()
+        with socket.socket() as taken:
+            taken.bind(("127.0.0.1", 0))
+            taken.listen()
+            os.environ["LIBRARY_METRICS_PORT"] = str(taken.getsockname()[1])
+            try:
+                self.assertIsNone(serve_from_environment())
+            finally:
+                del os.environ["LIBRARY_METRICS_PORT"]
+        self.assertFalse(metrics.enabled)
+        self.assertIsNone(metrics.server)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import json
+import unittest
+from operation_metrics import LatencyHistogram, OperationMetrics, operation_metrics, timed_operation
+
+class TestOperationMetrics(unittest.TestCase):
+    def setUp(self):
+        operation_metrics.reset()
+
+    def test_histogram_percentiles_within_error(self):
+        histogram = LatencyHistogram()
+        for value in range(1, 10001):
+            histogram.record(value)
+        for percent in (50, 95, 99):
+            expected = 10000 * percent / 100
+            self.assertAlmostEqual(histogram.percentile(percent), expected, delta=expected * 0.04)
+        self.assertEqual(histogram.percentile(100), 10000)
+        self.assertEqual(histogram.count_at_most(20000), 10000)
+        self.assertAlmostEqual(histogram.count_at_most(5000), 5000, delta=5000 * 0.04)
+
+    def test_timed_operation_outcomes(self):
+        @timed_operation("borrow")
+        def borrow(title):
+            if title == "missing":
+                raise ValueError("'missing' does not exist in the library.")
+            if title == "taken":
+                return "book borrowed fail - no available copies"
+            return "book borrowed successfully"
+
+        borrow("Book A")
+        borrow("taken")
+        with self.assertRaises(ValueError):
+            borrow("missing")
+
+        snapshot = json.loads(operation_metrics.dump_json())
+        self.assertEqual(snapshot["borrow"]["count"], 3)
+        self.assertEqual(snapshot["borrow"]["outcomes"], {"success": 1, "fail": 1, "error": 1})
+        self.assertLessEqual(snapshot["borrow"]["p50_ms"], snapshot["borrow"]["p99_ms"])
+
+    def test_empty_registry(self):
+        self.assertEqual(OperationMetrics().snapshot(), {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tracemalloc
+import unittest
+from profiling_hooks import Profiler, profiler, profiled
+
+class TestProfilingHooks(unittest.TestCase):
+    def setUp(self):
+        os.makedirs("test_csv_files", exist_ok=True)
+        self.output_file = os.path.join("test_csv_files", "test_profile.collapsed")
+        profiler.reset()
+
+    def tearDown(self):
+        profiler.disable()
+        profiler.reset()
+        if os.path.exists(self.output_file):
+            os.remove(self.output_file)
+
+    def test_disabled_by_default(self):
+        @profiled("noop")
+        def noop():
+            return "done"
+
+        self.assertEqual(noop(), "done")
+        self.assertEqual(Profiler().report(), {})
+        self.assertNotIn("noop", profiler.report())
+
+    def test_collapsed_stacks_per_operation(self):
+        def parse_rows(count):
+            return [str(i).split(",") for i in range(count)]
+
+        @profiled("borrow")
+        def borrow():
+            parse_rows(20000)
+            return inner()
+
+        @profiled("inner")
+        def inner():
+            return "book borrowed successfully"  # Nested entry point runs inside the outer profile
+
+        profiler.enable(sample_rate=1.0, trace_memory=True)
+        for _ in range(3):
+            self.assertEqual(borrow(), "book borrowed successfully")
+
+        report = profiler.report()
+        self.assertEqual(report["borrow"]["sampled"], 3)
+        self.assertEqual(report["inner"]["sampled"], 0)
+        self.assertGreater(report["borrow"]["total_ms"], 0)
+
+        profiler.dump_collapsed(self.output_file)
+        with open(self.output_file, "r", encoding="utf-8") as file:
+            lines = file.read().splitlines()
+        self.assertTrue(any(line.startswith("borrow;") and "parse_rows" in line for line in lines))
+        for line in lines:
+            stack, microseconds = line.rsplit(" ", 1)
+            self.assertTrue(microseconds.isdigit())
+
+    def test_external_tracemalloc_session_is_kept(self):
+        tracemalloc.start()
+        try:
+            profiler.enable(trace_memory=True)
+            profiler.disable()
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+
+        profiler.enable(trace_memory=True)
+        profiler.disable()
+        self.assertFalse(tracemalloc.is_tracing())
+
+if __name__ == "__main__":
+    unittest.main()
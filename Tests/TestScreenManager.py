@@ -0,0 +1,45 @@
+import unittest
+import tkinter as tk
+from ScreenManager import ScreenManager, fill_labels
+
+class TestScreenManager(unittest.TestCase):
+    def setUp(self):
+        try:
+            self.root = tk.Tk()
+        except tk.TclError:
+            self.skipTest("no display available")
+        self.screens = ScreenManager(self.root)
+
+    def tearDown(self):
+        self.root.destroy()
+
+    def test_screens_are_built_once_and_refreshed_on_new_versions(self):
+        calls = []
+
+        def build(screen):
+            calls.append("build")
+            screen.reset = lambda: calls.append("reset")
+            screen.refresh = lambda: calls.append("refresh")
+
+        first = self.screens.show("books", build, version=1)
+        self.screens.show("menu", lambda screen: None)
+        self.assertEqual(first.frame.winfo_manager(), "")  # Hidden, not destroyed
+        self.assertIs(self.screens.show("books", build, version=1), first)
+        self.screens.show("books", build, version=2)
+        self.assertEqual(calls, ["build", "reset", "refresh", "reset", "reset", "refresh"])
+
+        self.screens.invalidate("books")
+        self.screens.show("books", build, version=2)
+        self.assertEqual(calls[-1], "refresh")
+
+    def test_fill_labels_reuses_labels(self):
+        frame = tk.Frame(self.root)
+        fill_labels(frame, [(f"Book {i}", {}) for i in range(3)])
+        labels = frame.winfo_children()
+        fill_labels(frame, [("Book X", {}), ("Book Y", {})])
+        self.assertEqual(frame.winfo_children(), labels)
+        self.assertEqual(labels[0].cget("text"), "Book X")
+        self.assertEqual(labels[2].winfo_manager(), "")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from BookFactory import BookFactory
+from CatalogSnapshot import CatalogSnapshot
+from DynamicSearch import DynamicSearch
+from SearchStrategy import RankedSearch
+
+class TestSearchStrategy(unittest.TestCase):
+    def setUp(self):
+        self.books = CatalogSnapshot.from_books([
+            BookFactory.create_book("The Hobbit", "J.R.R. Tolkien", False, 2, "Fantasy", 1937),
+            BookFactory.create_book("The Lord of the Rings", "J.R.R. Tolkien", False, 3, "Fantasy", 1954),
+            BookFactory.create_book("Rings of Saturn", "W.G. Sebald", False, 1, "Travel", 1995),
+            BookFactory.create_book("Dune", "Frank Herbert", False, 1, "Science Fiction", 1965),
+        ], 1)
+
+    def test_ranked_search_orders_by_relevance(self):
+        search = DynamicSearch()
+        self.assertEqual([book.title for book in search.search("ranked", self.books, "tolkien rings")],
+                         ["The Lord of the Rings", "The Hobbit", "Rings of Saturn"])
+        self.assertEqual(search.search("ranked", self.books, "asimov"), [])
+        self.assertEqual(search.suggest("ranked", self.books, "dune"), ["Dune"])
+
+    def test_ranked_search_keeps_top_k(self):
+        books = CatalogSnapshot.from_books(
+            [BookFactory.create_book(f"Atlas {number}", "Mapmaker", False, 1, "Travel", 2000) for number in range(1000)]
+            + [BookFactory.create_book("Atlas", "Mapmaker", False, 1, "Travel", 2000)], 1)
+        ranked = RankedSearch(limit=5).search(books, "atlas")
+        self.assertEqual(len(ranked), 5)
+        self.assertEqual(ranked[0].title, "Atlas")  # Shortest document, best BM25 score
+        self.assertEqual([book.title for book in ranked[1:]], ["Atlas 0", "Atlas 1", "Atlas 2", "Atlas 3"])
+
+    def test_popularity_boost_and_index_reuse(self):
+        loans = {}
+        search = RankedSearch(popularity=lambda: loans)
+        self.assertEqual(search.search(self.books, "tolkien")[0].title, "The Hobbit")
+        index = search.index_cache[1]
+        loans["The Lord of the Rings"] = 20
+        self.assertEqual(search.search(self.books, "tolkien")[0].title, "The Lord of the Rings")
+        self.assertIs(search.index_cache[1], index)  # Same snapshot, same index
+        search.search(self.books.bumped(), "tolkien")
+        self.assertIs(search.index_cache[1], index)  # A borrow or a return doesn't change the books
+        edited = self.books.edited()
+        search.search(edited, "tolkien")
+        self.assertIsNot(search.index_cache[1], index)
+        index = search.index_cache[1]
+
+        newer = self.books.appended(BookFactory.create_book("Tolkien", "Humphrey Carpenter", False, 1, "Biography", 1977))
+        self.assertEqual(search.search(newer, "tolkien")[0].title, "Tolkien")
+        self.assertIsNot(search.index_cache[1], index)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import shutil
+import unittest
+from BookFactory import BookFactory
+from CatalogSnapshot import CatalogSnapshot
+from SearchStrategy import RankedSearch
+from ShardedLibrary import ShardedLibrary
+
+class TestShardedLibrary(unittest.TestCase):
+    def setUp(self):
+        self.root_dir = os.path.join("test_csv_files", "shards")
+        self.branches = {name: os.path.join(self.root_dir, name) for name in ["north", "south"]}
+        self.library = ShardedLibrary(self.branches)
+        self.library.add_book(BookFactory.create_book("Book A", "Author A", False, 2, "Fiction", 2000), branch="north")
+        self.library.add_book(BookFactory.create_book("Book B", "Author B", False, 1, "Science", 2010), branch="south")
+        self.library.add_book(BookFactory.create_book("Book C", "Author A", False, 1, "Fiction", 2020), branch="south")
+
+    def tearDown(self):
+        self.library.close()
+        shutil.rmtree(self.root_dir)
+
+    def test_routes_to_owning_shard(self):
+        self.assertEqual(self.library.borrow_book("Book B"), "book borrowed successfully")
+        self.assertEqual(self.library.shards[1].available_copies["Book B"], 0)
+        self.assertNotIn("Book B", self.library.shards[0].available_copies)
+        self.assertEqual(self.library.return_book("Book B"), "book 'Book B' returned successfully")
+        with self.assertRaises(ValueError):
+            self.library.borrow_book("Missing")
+
+    def test_federated_search_and_popular(self):
+        self.assertEqual(sorted(book.title for book in self.library.search("author", "author a")), ["Book A", "Book C"])
+        self.library.borrow_book("Book A")
+        self.library.borrow_book("Book A")
+        self.library.borrow_book("Book C")
+        popular = self.library.popular_books()
+        self.assertEqual([book["title"] for book in popular[:2]], ["Book A", "Book C"])
+        self.assertEqual([(book["title"], book["popularity"]) for book in self.library.popular_books(2, days=7)],
+                         [("Book A", 2), ("Book C", 1)])
+
+        # A new instance finds every title in its shard again
+        reopened = ShardedLibrary(self.branches, use_processes=False)
+        self.assertEqual(reopened.remove_book("Book C"), "book 'Book C' removed successfully")
+        self.assertEqual([book.title for book in reopened.search("genre", "fiction")], ["Book A"])
+
+    def test_ranked_search_merges_shards_with_global_weights(self):
+        self.library.add_book(BookFactory.create_book("Book D", "Author C", False, 1, "History", 1990), branch="north")
+        self.library.add_book(BookFactory.create_book("Atlas", "Author D", False, 1, "Travel", 1995), branch="north")
+        books = CatalogSnapshot.from_books([book for shard in self.library.shards for book in shard.books])
+        for query in ["author c book", "a atlas", "book d"]:
+            expected = [book.title for book in RankedSearch(limit=2).search(books, query)]
+            self.assertEqual([book.title for book in self.library.search("ranked", query, limit=2)], expected)
+
+    def test_hash_partitioning(self):
+        hashed = ShardedLibrary([os.path.join(self.root_dir, f"hash_{i}") for i in range(3)], use_processes=False)
+        for i in range(12):
+            hashed.add_book(BookFactory.create_book(f"Title {i}", "Author", False, 1, "Fiction", 2000))
+        self.assertEqual(sum(len(shard.books) for shard in hashed.shards), 12)
+        self.assertTrue(all(shard.books for shard in hashed.shards))
+        self.assertEqual(len(hashed.search("title", "title")), 12)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import csv
+import multiprocessing
+import os
+import shutil
+import threading
+import unittest
+from BookFactory import BookFactory
+from Library import Library
+from SharedStore import SharedStore
+from WaitingListManager import WaitingListManager
+from file_lock import FileLock
+
+DATA_DIR = os.path.join("test_csv_files", "shared")
+
+
+def borrow_copies(count):
+    library = Library.from_directory(DATA_DIR, shared=True)
+    for _ in range(count):
+        library.borrow_book("Book A")
+
+
+class TestSharedStore(unittest.TestCase):
+    def setUp(self):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        with open(os.path.join(DATA_DIR, "books.csv"), "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=["title", "author", "is_loaned", "copies", "genre", "year"])
+            writer.writeheader()
+            writer.writerows([
+                {"title": "Book A", "author": "Author A", "is_loaned": "No", "copies": 30, "genre": "Fiction", "year": 2000},
+                {"title": "Book B", "author": "Author B", "is_loaned": "No", "copies": 2, "genre": "Science", "year": 2010},
+                {"title": "Book C", "author": "Author C", "is_loaned": "No", "copies": 1, "genre": "Fiction", "year": 2020},
+            ])
+
+    def tearDown(self):
+        shutil.rmtree(DATA_DIR)
+
+    def test_front_desks_pull_each_others_changes(self):
+        desk_a = Library.from_directory(DATA_DIR, shared=True)
+        desk_b = Library.from_directory(DATA_DIR, shared=True)
+
+        desk_a.borrow_book("Book A")
+        self.assertEqual(desk_b.pull_changes(), 1)
+        self.assertEqual(desk_b.available_copies["Book A"], 29)
+        self.assertEqual(desk_b.pull_changes(), 0)  # Nothing new: only a stat of the change log
+
+        desk_b.add_book(BookFactory.create_book("Book D", "Author D", False, 4, "History", 1999))
+        desk_a.remove_book("Book B")  # Pulls Book D before rewriting the files
+        self.assertEqual([book.title for book in desk_a.books], ["Book A", "Book C", "Book D"])
+        desk_b.pull_changes()
+        self.assertEqual([book.title for book in desk_b.books], ["Book A", "Book C", "Book D"])
+        self.assertNotIn("Book B", desk_b.available_copies)
+        self.assertEqual(desk_a.store.version, desk_b.store.version)
+
+        # A command on a stale desk starts from the current state instead of overwriting it
+        desk_a.borrow_book("Book C")
+        self.assertEqual(desk_b.borrow_book("Book C"), "book borrowed fail - no available copies")
+        desk_b.waiting_list_manager.add_to_waiting_list("Book C", "Author C", "Fiction", 2020, "Client 1", "", "")
+        with self.assertRaises(ValueError):
+            desk_a.waiting_list_manager.add_to_waiting_list("Book C", "Author C", "Fiction", 2020, "Client 1", "", "")
+        self.assertEqual(desk_a.return_book("Book C"), "book 'Book C' returned successfully, notified 'Client 1'")
+        self.assertEqual(desk_b.borrow_book("Book C", client="Client 1"), "book borrowed successfully")
+        self.assertEqual(desk_b.waiting_list_manager.count_waiting_list("Book C"), 0)
+
+        reloaded = Library.from_directory(DATA_DIR, shared=True)
+        self.assertEqual(reloaded.available_copies, desk_b.available_copies)
+        self.assertEqual(reloaded.available_copies["Book D"], 4)
+
+    def test_concurrent_processes(self):
+        Library.from_directory(DATA_DIR, shared=True)  # Create the files once
+        processes = [multiprocessing.Process(target=borrow_copies, args=(5,)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertTrue(all(process.exitcode == 0 for process in processes))
+        self.assertEqual(Library.from_directory(DATA_DIR).available_copies["Book A"], 10)
+
+    def test_compaction_keeps_versions(self):
+        writer = SharedStore(DATA_DIR, compaction_bytes=1)
+        reader = SharedStore(DATA_DIR)
+        with writer.file_lock:
+            writer.push([{"op": "put", "title": "Book A", "available_copies": 3}])
+        self.assertEqual([change["available_copies"] for change in reader.pull()], ["3"])
+        with writer.file_lock:
+            writer.push([{"op": "put", "title": "Book A", "available_copies": 2},
+                         {"op": "drop", "title": "Book B"}])
+        self.assertEqual(writer.version, 3)
+        self.assertEqual([(change["version"], change["title"]) for change in reader.pull()],
+                         [("2", "Book A"), ("3", "Book B")])
+        self.assertEqual(reader.pull(), [])
+        self.assertEqual([change["version"] for change in SharedStore(DATA_DIR).pull()], ["2", "3"])
+
+        # A log compacted into a file with the same inode is still detected, by its shorter size
+        with writer.file_lock:
+            writer.push([{"op": "put", "title": "Book C", "available_copies": 0}] * 3)
+        reader.pull()
+        with open(writer.changes_file, "w", newline="", encoding="utf-8") as file:
+            file.write("version,op,title,author,is_loaned,copies,genre,year,available_copies,loaned_copies\n"
+                       "7,put,Book C,Author C,Yes,1,Fiction,2020,0,1\n")
+        self.assertEqual([(change["version"], change["title"]) for change in reader.pull()], [("7", "Book C")])
+
+    def test_joining_a_waiting_list_rewrites_the_current_loans(self):
+        desk_a = Library.from_directory(DATA_DIR, shared=True)
+        desk_b = Library.from_directory(DATA_DIR, shared=True)
+        desk_b.borrow_book("Book C")
+        desk_a.join_waiting_list("Book C", "Author C", "Fiction", 2020, "Client 1")
+        with open(os.path.join(DATA_DIR, "loaned_books.csv"), "r", encoding="utf-8") as file:
+            row = next(row for row in csv.DictReader(file) if row["title"] == "Book C")
+        self.assertEqual((row["loaned_copies"], row["in_waiting_list"]), ("1", "1"))
+        with self.assertRaises(ValueError):
+            desk_b.join_waiting_list("Book C", "Author C", "Fiction", 2020, "Client 1")
+
+    def test_waiting_list_compaction_does_not_deadlock_bulk_cancel(self):
+        manager = WaitingListManager(os.path.join(DATA_DIR, "waiting_list.csv"), compaction_ratio=0.3,
+                                     compaction_min_records=10, file_lock=FileLock(os.path.join(DATA_DIR, "library.lock")))
+        for number in range(40):
+            manager.add_to_waiting_list(f"Book {number}", "Author", "Fiction", 2000, "Dana", "", "")
+        manager.wait_for_compaction()
+
+        # The cancels cross the compaction threshold, so the compaction thread competes for both locks
+        cancel = threading.Thread(target=manager.cancel_client_entries, args=("Dana",), daemon=True)
+        cancel.start()
+        cancel.join(timeout=10)
+        self.assertFalse(cancel.is_alive())
+        manager.wait_for_compaction()
+        self.assertEqual(manager.get_entries_for_client("Dana"), [])
+        self.assertEqual(WaitingListManager(os.path.join(DATA_DIR, "waiting_list.csv")).count_waiting_lists(), {})
+
+if __name__ == "__main__":
+    unittest.main()
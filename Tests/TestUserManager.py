@@ -39,6 +39,57 @@ class TestUserManager(unittest.TestCase):
         self.assertFalse(self.user_manager.authenticate_user("test_user", "wrong_password"))
         self.assertFalse(self.user_manager.authenticate_user("nonexistent_user", "secure_password"))
 
+    def test_async_register_and_authenticate(self):
+        fast_manager = UserManager(self.test_users_file, hash_method="pbkdf2:sha256:1000")
+        futures = [fast_manager.register_user_async(f"user_{i}", f"password_{i}") for i in range(5)]
+        for future in futures:
+            future.result()
+
+        self.assertTrue(fast_manager.authenticate_user_async("user_3", "password_3").result())
+        self.assertFalse(fast_manager.authenticate_user_async("user_3", "password_4").result())
+        with self.assertRaises(ValueError):
+            fast_manager.register_user_async("user_0", "again").result()
+        fast_manager.close()
+
+    def test_rehash_outdated_password_on_login(self):
+        old_manager = UserManager(self.test_users_file, hash_method="pbkdf2:sha256:1000")
+        old_manager.register_user("test_user", "secure_password")
+
+        new_manager = UserManager(self.test_users_file, hash_method="pbkdf2:sha256:2000")
+        self.assertTrue(new_manager.authenticate_user("test_user", "secure_password"))
+        self.assertTrue(new_manager.users["test_user"].startswith("pbkdf2:sha256:2000$"))
+
+        # The upgraded hash is persisted
+        reloaded = UserManager(self.test_users_file, hash_method="pbkdf2:sha256:2000")
+        self.assertFalse(reloaded.needs_rehash(reloaded.users["test_user"]))
+
+    def test_register_appends_without_rewrite(self):
+        fast_manager = UserManager(self.test_users_file, hash_method="pbkdf2:sha256:1000")
+        fast_manager.register_user("first_user", "password")
+        with open(self.test_users_file, "a", encoding="utf-8") as file:
+            file.write("half_written_us")  # Simulate a crash in the middle of an append
+        fast_manager.register_user("second_user", "password")
+
+        reloaded = UserManager(self.test_users_file)
+        self.assertEqual(set(reloaded.users), {"first_user", "second_user"})
+
+    def test_compaction_drops_superseded_records(self):
+        old_manager = UserManager(self.test_users_file, hash_method="pbkdf2:sha256:1000")
+        for i in range(4):
+            old_manager.register_user(f"user_{i}", "password")
+
+        new_manager = UserManager(self.test_users_file, hash_method="pbkdf2:sha256:2000",
+                                  compaction_ratio=0.5, compaction_min_rows=1)
+        for i in range(4):
+            new_manager.authenticate_user(f"user_{i}", "password")  # Each rehash appends a superseding record
+
+        with open(self.test_users_file, "r", encoding="utf-8") as file:
+            rows = list(csv.DictReader(file))
+        self.assertLess(len(rows), 8)
+        reloaded = UserManager(self.test_users_file, hash_method="pbkdf2:sha256:2000")
+        self.assertEqual(len(reloaded.users), 4)
+        self.assertTrue(all(not reloaded.needs_rehash(h) for h in reloaded.users.values()))
+
     def test_load_users(self):
         # Prepopulate the CSV file with a user
         with open(self.test_users_file, "a", newline="", encoding="utf-8") as file:
@@ -1,49 +1,146 @@
 import csv
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.security import generate_password_hash, check_password_hash
+from operation_metrics import timed_operation
+from profiling_hooks import profiled
 
 """
 The UserManager class is responsible for managing user accounts in the system. 
 It handles user registration, authentication, and persistence of user data in a CSV file. 
+Password hashing is deliberately slow, so the *_async methods run it on a worker pool and return futures.
+hashlib's scrypt/pbkdf2 release the GIL while hashing, so a thread pool spreads a login storm across all cores.
 """
 
 class UserManager:
-    def __init__(self, file_path="csv_files/users.csv"):
+    def __init__(self, file_path="csv_files/users.csv", hash_method="scrypt", salt_length=16, max_workers=None,
+                 compaction_ratio=0.5, compaction_min_rows=100):
         self.file_path = file_path
+        self.hash_method = hash_method  # Any werkzeug method string, e.g. "scrypt" or "pbkdf2:sha256:600000"
+        self.salt_length = salt_length
+        self.max_workers = max_workers
         self.users = {}  # Stores {username, hashed_password}
+        self.lock = threading.Lock()  # Guards `users` and the users file against concurrent workers
+        self.executor = None  # Created on first async call
+        self.current_hash_prefix = None  # "method:params" prefix of hashes made with the current settings
+        self.compaction_ratio = compaction_ratio  # Compact once stale records exceed this share of live users
+        self.compaction_min_rows = compaction_min_rows
+        self.file_rows = 0  # Records in the append-only file, including superseded ones
         self.load_users()
 
-    # Loads user data from the CSV file into memory
+    # Loads user data from the CSV file into memory (later rows of the append-only file override earlier ones)
     def load_users(self):
+        self.file_rows = 0
         if os.path.exists(self.file_path):
             with open(self.file_path, "r", encoding="utf-8") as file:
                 reader = csv.DictReader(file)
                 for row in reader:
+                    if not row.get("username") or not row.get("password"):
+                        continue  # Skip a row cut short by a crash mid-append
                     self.users[row["username"]] = row["password"]
+                    self.file_rows += 1
 
-    # Saves the current user data to the CSV file
+    # Saves the current user data to the CSV file, atomically replacing the old file
     def save_users(self):
-        with open(self.file_path, "w", newline="") as file:
+        temp_path = f"{self.file_path}.tmp"
+        with open(temp_path, "w", newline="", encoding="utf-8") as file:
             writer = csv.DictWriter(file, fieldnames=["username", "password"])
             writer.writeheader()
             for username, hashed_password in self.users.items():
                 writer.writerow({"username": username, "password": hashed_password})
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.file_path)  # A crash leaves either the old or the new file, never half of one
+        self.file_rows = len(self.users)
+
+    # Appends a single user record to the CSV file - O(1) in the number of existing users
+    def append_user(self, username, hashed_password):
+        write_header = not os.path.exists(self.file_path) or os.path.getsize(self.file_path) == 0
+        missing_newline = False
+        if not write_header:
+            with open(self.file_path, "rb") as file:
+                file.seek(-1, os.SEEK_END)
+                missing_newline = file.read(1) != b"\n"  # Don't glue the new record onto a half-written line
+        with open(self.file_path, "a", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=["username", "password"])
+            if write_header:
+                writer.writeheader()
+            elif missing_newline:
+                file.write("\r\n")
+            writer.writerow({"username": username, "password": hashed_password})
+        self.file_rows += 1
+        self.compact_if_needed()
+
+    # Rewrites the file without superseded records once they pile up
+    def compact_if_needed(self):
+        stale_rows = self.file_rows - len(self.users)
+        if stale_rows > self.compaction_min_rows and stale_rows > self.compaction_ratio * len(self.users):
+            self.save_users()
+
+    # Hashes a password with the configured method and salt length
+    def hash_password(self, password):
+        return generate_password_hash(password, method=self.hash_method, salt_length=self.salt_length)
+
+    # Checks whether a stored hash was made with different (outdated) hash parameters
+    def needs_rehash(self, hashed_password):
+        if self.current_hash_prefix is None:
+            self.current_hash_prefix = self.hash_password("").split("$", 1)[0]
+        return hashed_password.split("$", 1)[0] != self.current_hash_prefix
 
     # Registers a new user by adding them to the system
+    @timed_operation("register")
+    @profiled("register")
     def register_user(self, username, password):
         """Register a new user."""
         if username in self.users:
             raise ValueError("Username already exists")
-        hashed_password = generate_password_hash(password)
-        self.users[username] = hashed_password
-        self.save_users()
+        hashed_password = self.hash_password(password)  # Hash outside the lock so workers run in parallel
+        with self.lock:
+            if username in self.users:
+                raise ValueError("Username already exists")
+            self.users[username] = hashed_password
+            self.append_user(username, hashed_password)
 
 
     # Authenticates a user by verifying their credentials
+    @timed_operation("login")
+    @profiled("login")
     def authenticate_user(self, username: str, password: str) -> bool:
-        """Authenticate a user."""
+        """Authenticate a user, upgrading the stored hash if it uses outdated parameters."""
         hashed_password = self.users.get(username)
         if not hashed_password:
             return False
-        return check_password_hash(hashed_password, password)
+        if not check_password_hash(hashed_password, password):
+            return False
+        if self.needs_rehash(hashed_password):
+            new_hash = self.hash_password(password)
+            with self.lock:
+                if self.users.get(username) == hashed_password:  # Skip if it changed meanwhile
+                    self.users[username] = new_hash
+                    self.append_user(username, new_hash)
+        return True
+
+    # Returns the worker pool, creating it on first use
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+            return self.executor
+
+    def register_user_async(self, username, password):
+        """Register a user on the worker pool. Returns a Future (raises ValueError on result() if the name is taken)."""
+        return self.get_executor().submit(self.register_user, username, password)
+
+    def authenticate_user_async(self, username, password):
+        """Authenticate a user on the worker pool. Returns a Future that resolves to a bool."""
+        return self.get_executor().submit(self.authenticate_user, username, password)
+
+    # Stops the worker pool after the submitted jobs finish
+    def close(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
 
@@ -1,38 +1,253 @@
+import csv
+import io
+import os
+import threading
+from collections import Counter
+from contextlib import nullcontext
 from datetime import datetime
-from Library import *
 from notification_service import NotificationService, EmailNotifier, SMSNotifier
+from metrics_registry import metrics
+from operation_metrics import timed_operation
+from profiling_hooks import profiled
 
 """
 The WaitingListManager class manages the books waiting list in a library system.
 It handles client's requests to wait for a specific book by updating the waiting_list.csv file accordingly.
+
+The waiting list is kept in memory and persisted append-only: waiting_list.csv holds the last compacted state and
+every change since then is one record appended to a segment file next to it (waiting_list.csv.000001.seg, ...).
+Removals are tombstone records, so enqueue and dequeue each cost one small append however long the list is.
+Once the dead records (tombstones and the entries they removed) pass `compaction_ratio` of all records, a background
+thread merges the sealed segments into a new waiting_list.csv. Replaying a segment twice is harmless, so a crash in
+the middle of a compaction loses nothing.
+With a `file_lock` the files can be shared with other processes: appends and compactions take the lock and first
+replay what the others appended, reading each segment from the byte offset reached last time.
+Lock order: the shared file lock is always taken before self.lock, including by the compaction thread.
 """
 
+FIELDNAMES = ["title", "author", "genre", "year", "client", "email_addr", "phone_num", "time_of_entry"]
+SEGMENT_FIELDNAMES = ["op"] + FIELDNAMES  # op: "add", "del" (one entry) or "drop" (every entry of a title)
+
+
 class WaitingListManager:
-    def __init__(self, waiting_list_file="csv_files/waiting_list.csv"):
+    def __init__(self, waiting_list_file="csv_files/waiting_list.csv", segment_max_bytes=1024 * 1024,
+                 compaction_ratio=0.5, compaction_min_records=1000, file_lock=None):
         self.notification_service = NotificationService()  # Initialize the notification service
         # Add notification observers (email, SMS, etc.)
         self.notification_service.add_observer(EmailNotifier())
         self.notification_service.add_observer(SMSNotifier())
         self.waiting_list_file = waiting_list_file
-        if not os.path.exists(self.waiting_list_file):
-            with open(self.waiting_list_file, "w", newline="", encoding="utf-8") as file:
-                writer = csv.DictWriter(
-                    file, fieldnames=["title", "author", "genre", "year", "client", "email_addr", "phone_num", "time_of_entry"]
-                )
+        self.segment_max_bytes = segment_max_bytes  # Start a new segment once the current one reaches this size
+        self.compaction_ratio = compaction_ratio
+        self.compaction_min_records = compaction_min_records
+        self.lock = threading.RLock()  # Guards the in-memory list and the segment files
+        self.file_lock = file_lock  # FileLock shared with other processes using the same files, or None
+        self.compaction_thread = None
+        self.entries = {}  # title -> {entry key: entry}, in arrival order
+        self.entries_by_client = {}  # client -> {entry key: entry}, the patron's reservations in arrival order
+        self.title_counts = Counter()  # lower-cased title -> waiting clients
+        self.records = 0  # Records in the base file and segments
+        self.live = 0  # Entries currently waiting
+        self.read_offsets = {}  # segment number -> bytes replayed so far
+        self.base_signature = None  # Identity of the base file loaded, changes when it is compacted
+        with self.shared():
+            if not os.path.exists(self.waiting_list_file) or os.path.getsize(self.waiting_list_file) == 0:
+                with open(self.waiting_list_file, "w", newline="", encoding="utf-8") as file:
+                    writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
+                    writer.writeheader()
+            self.load()
+
+    @staticmethod
+    def entry_key(entry):
+        """Identify an entry across restarts (time_of_entry has microsecond resolution)."""
+        return entry["title"], entry["client"], entry["time_of_entry"]
+
+    def segment_path(self, number):
+        return f"{self.waiting_list_file}.{number:06d}.seg"
+
+    def segment_numbers(self):
+        """Return the numbers of the existing segment files in order."""
+        directory = os.path.dirname(self.waiting_list_file) or "."
+        prefix = os.path.basename(self.waiting_list_file) + "."
+        numbers = []
+        for name in os.listdir(directory):
+            if name.startswith(prefix) and name.endswith(".seg") and name[len(prefix):-4].isdigit():
+                numbers.append(int(name[len(prefix):-4]))
+        return sorted(numbers)
+
+    def shared(self):
+        """The cross-process lock if the files are shared, else a no-op context."""
+        return self.file_lock if self.file_lock is not None else nullcontext()
+
+    def base_file_signature(self):
+        stat = os.stat(self.waiting_list_file)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        """Load the compacted base file and replay the segments on top of it."""
+        self.base_signature = self.base_file_signature()
+        with open(self.waiting_list_file, "r", encoding="utf-8") as file:
+            for row in csv.DictReader(file):
+                self.apply("add", row)
+        numbers = self.segment_numbers()
+        for number in numbers:
+            self.replay_segment(number)
+        self.segment = numbers[-1] if numbers else 1
+
+    def replay_segment(self, number):
+        """Apply the records of a segment past the offset already replayed."""
+        offset = self.read_offsets.get(number, 0)
+        with open(self.segment_path(number), "rb") as file:
+            file.seek(offset)
+            data = file.read()
+        data = data[:data.rfind(b"\n") + 1]  # Skip a record cut short by a crash (or still being written)
+        self.read_offsets[number] = offset + len(data)
+        for row in csv.reader(io.StringIO(data.decode("utf-8"), newline="")):
+            if row == SEGMENT_FIELDNAMES:
+                continue  # Header
+            record = dict(zip(SEGMENT_FIELDNAMES, row))
+            op = record.pop("op", None)
+            if op and record.get("time_of_entry") is not None:
+                self.apply(op, record)
+
+    def refresh(self):
+        """Catch up with the records other processes appended or compacted since the last load or refresh."""
+        with self.shared(), self.lock:
+            if self.base_file_signature() != self.base_signature:  # Compacted elsewhere - start over
+                self.entries, self.entries_by_client, self.title_counts = {}, {}, Counter()
+                self.records = self.live = 0
+                self.read_offsets = {}
+                self.load()
+                return
+            numbers = self.segment_numbers()
+            for number in numbers:
+                self.replay_segment(number)
+            self.segment = max([self.segment] + numbers)
+
+    def apply(self, op, entry):
+        """Apply one record to the in-memory waiting list."""
+        self.records += 1
+        title_entries = self.entries.get(entry["title"])
+        if op == "add":
+            key = self.entry_key(entry)
+            title_entries = self.entries.setdefault(entry["title"], {})
+            if key not in title_entries:
+                self.live += 1
+                self.title_counts[entry["title"].lower()] += 1
+            title_entries[key] = entry
+            self.entries_by_client.setdefault(entry["client"], {})[key] = entry
+        elif op == "del" and title_entries:
+            removed = title_entries.pop(self.entry_key(entry), None)
+            if removed is not None:
+                self.forget(entry["title"], 1)
+                self.unindex_client(removed)
+        elif op == "drop" and title_entries:
+            self.forget(entry["title"], len(title_entries))
+            for removed in title_entries.values():
+                self.unindex_client(removed)
+            title_entries.clear()
+        if title_entries is not None and not title_entries:
+            self.entries.pop(entry["title"], None)
+
+    def unindex_client(self, entry):
+        client_entries = self.entries_by_client.get(entry["client"])
+        if client_entries is not None:
+            client_entries.pop(self.entry_key(entry), None)
+            if not client_entries:
+                del self.entries_by_client[entry["client"]]
+
+    def forget(self, title, count):
+        self.live -= count
+        self.title_counts[title.lower()] -= count
+        if self.title_counts[title.lower()] <= 0:
+            del self.title_counts[title.lower()]
+
+    def append(self, op, entry):
+        """Persist one record with a single append, then apply it in memory."""
+        with self.shared(), self.lock:
+            if self.file_lock is not None:
+                self.refresh()
+            path = self.segment_path(self.segment)
+            if os.path.exists(path) and os.path.getsize(path) >= self.segment_max_bytes:
+                self.segment += 1
+                path = self.segment_path(self.segment)
+            write_header = not os.path.exists(path)
+            with open(path, "a", newline="", encoding="utf-8") as file:
+                start = file.tell()
+                writer = csv.DictWriter(file, fieldnames=SEGMENT_FIELDNAMES)
+                if write_header:
+                    writer.writeheader()
+                writer.writerow(dict(entry, op=op))
+                written = file.tell() - start
+            self.read_offsets[self.segment] = os.path.getsize(path)  # Our own record is applied below
+            metrics.observe("library_flush_bytes", written, file=os.path.basename(self.waiting_list_file))
+            self.apply(op, entry)
+            self.compact_if_needed()
+
+    def compact_if_needed(self):
+        dead = self.records - self.live
+        if (self.records >= self.compaction_min_records and dead > self.compaction_ratio * self.records
+                and self.compaction_thread is None):
+            self.compaction_thread = threading.Thread(target=self.compact, name="waiting-list-compaction", daemon=True)
+            self.compaction_thread.start()
+
+    def compact(self):
+        """Merge the base file and all sealed segments into a new base file."""
+        if self.file_lock is not None:
+            self.file_lock.acquire()  # Other processes must not append or compact meanwhile (taken before self.lock)
+        try:
+            with self.lock:
+                if self.file_lock is not None:
+                    self.refresh()
+                sealed = [number for number in self.segment_numbers() if number <= self.segment]
+                self.segment += 1  # New records go to a fresh segment while the snapshot is written
+                snapshot = [entry for title_entries in self.entries.values() for entry in title_entries.values()]
+                records_at_snapshot = self.records
+            temp_path = f"{self.waiting_list_file}.tmp"
+            with open(temp_path, "w", newline="", encoding="utf-8") as file:
+                writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
                 writer.writeheader()
+                writer.writerows(snapshot)
+                file.flush()
+                os.fsync(file.fileno())
+                written = file.tell()
+            os.replace(temp_path, self.waiting_list_file)
+            metrics.observe("library_flush_bytes", written, file=os.path.basename(self.waiting_list_file))
+            for number in sealed:
+                os.remove(self.segment_path(number))
+            with self.lock:
+                # The base file now holds the snapshot, plus whatever was appended while it was written
+                self.records = len(snapshot) + self.records - records_at_snapshot
+                self.base_signature = self.base_file_signature()
+                for number in sealed:
+                    self.read_offsets.pop(number, None)
+        finally:
+            if self.file_lock is not None:
+                self.file_lock.release()
+            self.compaction_thread = None
 
+    def wait_for_compaction(self):
+        thread = self.compaction_thread
+        if thread is not None:
+            thread.join()
+
+    @timed_operation("waitlist_join")
+    @profiled("waitlist_join")
     def add_to_waiting_list(self, title, author, genre, year, client, email, phone):
-        """Add a client to the waiting list for a specific book."""
-        with open(self.waiting_list_file, "a", newline="", encoding="utf-8") as file:
-            writer = csv.DictWriter(
-                file,
-                fieldnames=["title", "author", "genre", "year", "client", "email_addr", "phone_num", "time_of_entry"]
-            )
-            writer.writerow({
+        """
+        Add a client to the waiting list for a specific book.
+        Raises ValueError if the client is already waiting for it.
+        """
+        with self.shared(), self.lock:
+            if self.file_lock is not None:
+                self.refresh()  # Another front desk may have added the client meanwhile
+            if self.is_waiting(title, client):
+                raise ValueError(f"'{client}' is already on the waiting list for '{title}'.")
+            self.append("add", {
                 "title": title,
                 "author": author,
                 "genre": genre,
-                "year": year,
+                "year": str(year),
                 "client": client,
                 "email_addr": email,
                 "phone_num": phone,
@@ -42,31 +257,31 @@ class WaitingListManager:
 
     def get_waiting_list_for_book(self, title):
         """Retrieve the waiting list for a specific book."""
-        with open(self.waiting_list_file, "r", encoding="utf-8") as file:
-            reader = csv.DictReader(file)
-            return [row for row in reader if row["title"] == title]
+        with self.lock:
+            return list(self.entries.get(title, {}).values())
+
+    def iter_entries(self):
+        """Yield every waiting list entry, title by title, without copying the whole list."""
+        with self.lock:
+            titles = list(self.entries)
+        for title in titles:
+            yield from self.get_waiting_list_for_book(title)
 
+    @profiled("waitlist_remove")
     def remove_waiting_list_for_book(self, title):
         """Remove all waiting list entries for a specific book."""
-        updated_list = []
-        with open(self.waiting_list_file, "r", encoding="utf-8") as file:
-            reader = csv.DictReader(file)
-            updated_list = [row for row in reader if row["title"] != title]
-
-        with open(self.waiting_list_file, "w", newline="", encoding="utf-8") as file:
-            writer = csv.DictWriter(
-                file, fieldnames=["title", "author", "genre", "year", "client", "email_addr", "phone_num", "time_of_entry"]
-            )
-            writer.writeheader()
-            writer.writerows(updated_list)
+        with self.shared(), self.lock:
+            if title in self.entries:
+                self.append("drop", dict.fromkeys(FIELDNAMES, "") | {"title": title})
 
+    @profiled("waitlist_notify")
     def notify_next_client(self, title):
         """Notify the next client in the waiting list for a specific book."""
-        waiting_list = self.get_waiting_list_for_book(title)
-        if not waiting_list:
-            return None
-
-        next_client = waiting_list[0]
+        with self.shared(), self.lock:
+            title_entries = self.entries.get(title)
+            if not title_entries:
+                return None
+            next_client = next(iter(title_entries.values()))
 
         # Ensure all keys exist
         missing_keys = [key for key in ["client", "email_addr", "phone_num"] if key not in next_client]
@@ -94,31 +309,55 @@ class WaitingListManager:
             print(f"Failed to notify {next_client['client']}: {e}")
             return None
 
-    def remove_waiting_list_entry(self, entry):
-        """Remove a specific entry from the waiting list."""
-        updated_list = []
-        with open(self.waiting_list_file, "r", encoding="utf-8") as file:
-            reader = csv.DictReader(file)
-            updated_list = [row for row in reader if row != entry]
+    def get_entries_for_client(self, client):
+        """Return the client's waiting list entries (all titles), oldest first."""
+        with self.lock:
+            return list(self.entries_by_client.get(client, {}).values())
+
+    def is_waiting(self, title, client):
+        """Check whether the client is on the title's waiting list (looks at that client's entries only)."""
+        return any(key[0] == title for key in self.entries_by_client.get(client, {}))
 
-        with open(self.waiting_list_file, "w", newline="", encoding="utf-8") as file:
-            writer = csv.DictWriter(
-                file, fieldnames=["title", "author", "genre", "year", "client", "email_addr", "phone_num", "time_of_entry"]
-            )
-            writer.writeheader()
-            writer.writerows(updated_list)
+    def cancel_client_entries(self, client, title=None):
+        """Remove the client's entries for `title` (or for every title). Returns the removed entries."""
+        with self.shared(), self.lock:
+            if self.file_lock is not None:
+                self.refresh()
+            cancelled = [entry for entry in self.get_entries_for_client(client) if title is None or entry["title"] == title]
+            for entry in cancelled:
+                self.remove_waiting_list_entry(entry)
+            return cancelled
+
+    def dedupe_client_entries(self, client):
+        """Keep only the oldest entry per title for the client. Returns the removed duplicates."""
+        with self.shared(), self.lock:
+            if self.file_lock is not None:
+                self.refresh()
+            seen, duplicates = set(), []
+            for entry in self.get_entries_for_client(client):
+                if entry["title"] in seen:
+                    duplicates.append(entry)
+                else:
+                    seen.add(entry["title"])
+            for entry in duplicates:
+                self.remove_waiting_list_entry(entry)
+            return duplicates
+
+    def remove_waiting_list_entry(self, entry):
+        """Remove a specific entry from the waiting list (appends a tombstone)."""
+        with self.shared(), self.lock:
+            if self.entry_key(entry) in self.entries.get(entry["title"], {}):
+                self.append("del", {field: entry.get(field, "") for field in FIELDNAMES})
 
     def count_waiting_list(self, title):
         """
         Returns the number of people in the waiting list for a specific book.
         """
-        count = 0
-        if not os.path.exists(self.waiting_list_file):
-            return count  # No waiting list file, return 0
+        return self.title_counts.get(title.lower(), 0)
 
-        with open(self.waiting_list_file, "r", encoding="utf-8") as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if row["title"].lower() == title.lower():
-                    count += 1
-        return count
\ No newline at end of file
+    def count_waiting_lists(self):
+        """
+        Returns a Counter of waiting clients per (lower-cased) title.
+        """
+        with self.lock:
+            return Counter(self.title_counts)
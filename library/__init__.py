@@ -0,0 +1,3 @@
+"""
+Headless command-line interface for the library system - run it with `python -m library <command>`.
+"""
@@ -0,0 +1,194 @@
+import os
+import sys
+import argparse
+
+"""
+Command-line entry point: python -m library <command> [options]
+
+Every command imports only the modules it needs, so scripted batch jobs never load tkinter, and werkzeug is
+never loaded because no command touches user accounts. Run `python -m library --help` for the command list.
+"""
+
+
+def open_library(args):
+    from Library import Library
+    return Library.from_directory(args.data_dir, shared=True)  # A GUI may be using the same files
+
+
+def open_waiting_list(args):
+    from WaitingListManager import WaitingListManager
+    from SharedStore import SharedStore
+    from file_lock import FileLock
+    return WaitingListManager(os.path.join(args.data_dir, "waiting_list.csv"),
+                              file_lock=FileLock(os.path.join(args.data_dir, SharedStore.LOCK_NAME)))
+
+
+def logged(message):
+    """Log a command result the same way the GUI does, and return it."""
+    from log_decorator import log_decorator
+    return log_decorator(lambda: message)()
+
+
+def cmd_borrow(args):
+    return logged(open_library(args).borrow_book(args.title, client=args.client))
+
+
+def cmd_return(args):
+    return logged(open_library(args).return_book(args.title))
+
+
+def cmd_add(args):
+    from BookFactory import BookFactory
+    book = BookFactory.create_book(title=args.title, author=args.author, is_loaned=args.loaned,
+                                   copies=args.copies, genre=args.genre, year=args.year)
+    return logged(open_library(args).add_book(book))
+
+
+def cmd_remove(args):
+    return logged(open_library(args).remove_book(args.title))
+
+
+def cmd_search(args):
+    from DynamicSearch import DynamicSearch
+    library = open_library(args)
+    books = DynamicSearch(popularity=library.loan_counts).search(args.by, library.books, args.query)
+    for book in books:
+        print(f"{book.title} by {book.author} ({book.year}) - {book.copies} copies")
+    return f"Search book \"{args.query}\" by {args.by} found {len(books)} results"
+
+
+def cmd_popular(args):
+    books = open_library(args).popular_books(days=args.days)
+    for book in books:
+        print(f"{book['title']} by {book['author']} (Popularity: {book['popularity']})")
+    return "popular books - displayed successfully"
+
+
+def cmd_export(args):
+    from CatalogExporter import CatalogExporter
+    query = {"search_type": args.by, "query": args.query} if args.query else {}
+    report = CatalogExporter(open_library(args)).export(args.report, args.path, **query)
+    return f"export {args.report} - {report['rows']} rows written successfully"
+
+
+def cmd_recommend(args):
+    library = open_library(args)
+    if args.rebuild:
+        library.rebuild_recommendations()
+    titles = library.recommend(args.title, args.count)
+    for title in titles:
+        print(title)
+    return f"recommendations for \"{args.title}\" found {len(titles)} results"
+
+
+def cmd_waitlist(args):
+    if args.action == "show":
+        entries = open_waiting_list(args).get_waiting_list_for_book(args.title)
+        for entry in entries:
+            print(f"{entry['client']} <{entry['email_addr']}> {entry['phone_num']} since {entry['time_of_entry']}")
+        return f"{len(entries)} clients waiting for '{args.title}'"
+
+    # Joining needs the book details, so the catalog is loaded
+    library = open_library(args)
+    book = next((book for book in library.books if book.title == args.title), None)
+    if book is None:
+        raise ValueError(f"'{args.title}' does not exist in the library.")
+    library.join_waiting_list(book.title, book.author, book.genre, book.year, args.client, args.email, args.phone)
+    return logged(f"added '{args.client}' to the waiting list for '{args.title}'")
+
+
+def cmd_reservations(args):
+    manager = open_waiting_list(args)
+    if args.cancel:
+        cancelled = manager.cancel_client_entries(args.client, args.cancel)
+        if not cancelled:
+            return f"cancel reservation of '{args.client}' for '{args.cancel}' fail - not on the waiting list"
+        return logged(f"cancelled reservation of '{args.client}' for '{args.cancel}' successfully")
+    if args.dedupe:
+        return logged(f"removed {len(manager.dedupe_client_entries(args.client))} duplicate reservations of '{args.client}'")
+    entries = manager.get_entries_for_client(args.client)
+    for entry in entries:
+        print(f"{entry['title']} since {entry['time_of_entry']}")
+    return f"{len(entries)} reservations for '{args.client}'"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m library", description="Library management from the command line.")
+    parser.add_argument("--data-dir", default="csv_files", help="directory with the library CSV files")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name, handler, help_text in [("borrow", cmd_borrow, "borrow a book"),
+                                     ("return", cmd_return, "return a book"),
+                                     ("remove", cmd_remove, "remove a book")]:
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("title")
+        command.set_defaults(handler=handler)
+    commands.choices["borrow"].add_argument("--client", help="pick up the copy held for this waiting-list client")
+
+    add = commands.add_parser("add", help="add a book")
+    add.add_argument("title")
+    add.add_argument("--author", required=True)
+    add.add_argument("--genre", required=True)
+    add.add_argument("--year", type=int, required=True)
+    add.add_argument("--copies", type=int, default=1)
+    add.add_argument("--loaned", action="store_true", help="all copies are loaned out")
+    add.set_defaults(handler=cmd_add)
+
+    search = commands.add_parser("search", help="search books")
+    search.add_argument("query")
+    search.add_argument("--by", choices=["title", "author", "genre", "ranked"], default="title",
+                        help="ranked: the 20 best matches of the title and author words, most relevant first")
+    search.set_defaults(handler=cmd_search)
+
+    popular = commands.add_parser("popular", help="show the top 5 popular books")
+    popular.add_argument("--days", type=int, help="rank by borrows in the last DAYS days instead")
+    popular.set_defaults(handler=cmd_popular)
+
+    export = commands.add_parser("export", help="stream a report to a .csv or .jsonl file (add .gz to compress)")
+    export.add_argument("report", choices=["catalog", "availability", "loans", "waitlist"])
+    export.add_argument("path")
+    export.add_argument("--query", help="only export the rows matching this search")
+    export.add_argument("--by", choices=["title", "author", "genre"], default="title")
+    export.set_defaults(handler=cmd_export)
+
+    recommend = commands.add_parser("recommend", help="show what patrons who borrowed a book also borrowed")
+    recommend.add_argument("title")
+    recommend.add_argument("--count", type=int, default=5)
+    recommend.add_argument("--rebuild", action="store_true", help="recompute from the whole loan history first")
+    recommend.set_defaults(handler=cmd_recommend)
+
+    waitlist = commands.add_parser("waitlist", help="show or join the waiting list of a book")
+    waitlist.add_argument("action", choices=["show", "join"])
+    waitlist.add_argument("title")
+    waitlist.add_argument("--client")
+    waitlist.add_argument("--email", default="")
+    waitlist.add_argument("--phone", default="")
+    waitlist.set_defaults(handler=cmd_waitlist)
+
+    reservations = commands.add_parser("reservations", help="list, cancel or deduplicate a client's reservations")
+    reservations.add_argument("client")
+    actions = reservations.add_mutually_exclusive_group()
+    actions.add_argument("--cancel", metavar="TITLE", help="leave the waiting list of TITLE")
+    actions.add_argument("--dedupe", action="store_true", help="keep only the oldest entry per title")
+    reservations.set_defaults(handler=cmd_reservations)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "waitlist" and args.action == "join" and not args.client:
+        parser.error("waitlist join requires --client")
+    try:
+        result = args.handler(args)
+    except (ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(result)
+    return 1 if "fail" in result else 0  # The library reports failures as "... fail ..." messages
+
+
+if __name__ == "__main__":
+    from metrics_registry import serve_from_environment
+    serve_from_environment()
+    sys.exit(main())
@@ -1,14 +1,184 @@
 import os
+import sys
+import queue
+import atexit
 import functools
+import threading
+import time
 from datetime import datetime
 
 # Log file path
 LOG_FILE = "log.txt"
 
-# Ensure the log file exists
-if not os.path.exists(LOG_FILE):
-    with open(LOG_FILE, "w") as file:
-        file.write("--- Library Log ---\n")
+
+class LogWriter:
+    """
+    Background writer for the library log.
+
+    Decorated calls only put a (timestamp, message) record on a queue. A daemon thread formats the records,
+    writes them through a buffered file handle and rotates the file by size and/or age, optionally gzipping
+    the rotated segments (log.txt.1.gz, log.txt.2.gz, ...). When the file can't be written (disk full, no
+    permission...), records go to stderr and the file is reopened for the next one, so the thread never dies.
+    """
+    def __init__(self, log_file=LOG_FILE, max_bytes=5 * 1024 * 1024, rotate_interval=None, backup_count=5,
+                 compress=False, flush_interval=1.0):
+        self.log_file = log_file
+        self.max_bytes = max_bytes  # Rotate once the file reaches this size (None disables size rotation)
+        self.rotate_interval = rotate_interval  # Rotate after this many seconds (None disables time rotation)
+        self.backup_count = backup_count
+        self.compress = compress
+        self.flush_interval = flush_interval
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.start_lock = threading.Lock()
+        self.file = None
+        self.size = 0  # Bytes in the log file, counted as they are written (tell() would flush the buffer)
+        self.opened_at = 0.0
+        self.retry_rotation_at = 0.0  # After a failed rotation, the next attempt waits until then
+
+    def write(self, message):
+        """Enqueue a log message. This is the only work done on the caller's thread."""
+        if self.thread is None or not self.thread.is_alive():
+            self.start()
+        self.queue.put((time.time(), message))
+
+    def start(self):
+        with self.start_lock:
+            if self.thread is None or not self.thread.is_alive():  # Not started, or killed by an unexpected error
+                self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+                self.thread.start()
+
+    def flush(self, timeout=None):
+        """
+        Block until every record enqueued so far is written to disk, or `timeout` seconds passed.
+        Returns False if the records were not written, e.g. because the writer thread died.
+        """
+        thread = self.thread
+        if thread is None:
+            return True
+        done = threading.Event()
+        self.queue.put(done)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not done.wait(0.1):
+            if not thread.is_alive() or (deadline is not None and time.monotonic() >= deadline):
+                return done.is_set()
+        return True
+
+    def close(self):
+        """Flush the pending records and stop the writer thread."""
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def run(self):
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self.flush_file()  # Idle - push the buffer to disk
+                continue
+            if record is None:
+                break
+            if isinstance(record, threading.Event):
+                self.flush_file()
+                record.set()
+                continue
+
+            timestamp, message = record
+            self.write_line(f"[{datetime.fromtimestamp(timestamp)}] {message}\n")
+        self.flush_file()
+        self.close_file()
+
+    def write_line(self, line):
+        """Write one record to the log file, or to stderr if the file can't be opened or written."""
+        try:
+            if self.file is None:
+                self.open_file()
+            self.file.write(line)
+        except OSError as e:
+            self.close_file()  # Reopened for the next record
+            print(f"Log file {self.log_file} unavailable ({e}): {line}", end="", file=sys.stderr)
+            return
+        self.size += len(line.encode("utf-8"))
+        if self.should_rotate():
+            try:
+                self.rotate()
+            except OSError as e:
+                self.close_file()
+                self.retry_rotation_at = time.time() + 60
+                print(f"Log file {self.log_file} rotation failed: {e}", file=sys.stderr)
+
+    def flush_file(self):
+        if self.file is None:
+            return
+        try:
+            self.file.flush()
+        except OSError as e:
+            self.close_file()
+            print(f"Log file {self.log_file} flush failed: {e}", file=sys.stderr)
+
+    def close_file(self):
+        if self.file is None:
+            return
+        try:
+            self.file.close()
+        except OSError:
+            pass  # The buffer couldn't be written - already reported
+        self.file = None
+
+    def open_file(self):
+        is_new = not os.path.exists(self.log_file)
+        self.file = open(self.log_file, "a", encoding="utf-8", buffering=64 * 1024)
+        self.size = os.path.getsize(self.log_file)
+        if is_new:
+            self.file.write("--- Library Log ---\n")
+            self.size += len("--- Library Log ---\n")
+        self.opened_at = time.time()
+
+    def should_rotate(self):
+        if time.time() < self.retry_rotation_at:
+            return False
+        if self.max_bytes is not None and self.size >= self.max_bytes:
+            return True
+        return self.rotate_interval is not None and time.time() - self.opened_at >= self.rotate_interval
+
+    def rotate(self):
+        """Shift log.txt -> log.txt.1 -> log.txt.2 ... and start a fresh log file."""
+        self.close_file()
+        suffix = ".gz" if self.compress else ""
+        if self.backup_count > 0:
+            oldest = f"{self.log_file}.{self.backup_count}{suffix}"
+            if os.path.exists(oldest):
+                os.remove(oldest)
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.log_file}.{index}{suffix}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.log_file}.{index + 1}{suffix}")
+            if self.compress:
+                import gzip
+                import shutil
+                with open(self.log_file, "rb") as source, gzip.open(f"{self.log_file}.1.gz", "wb") as target:
+                    shutil.copyfileobj(source, target)
+                os.remove(self.log_file)
+            else:
+                os.replace(self.log_file, f"{self.log_file}.1")
+        else:
+            os.remove(self.log_file)
+        self.open_file()
+
+
+log_writer = LogWriter()
+atexit.register(lambda: log_writer.close())
+
+
+def configure_logging(**kwargs):
+    """Replace the log writer, e.g. configure_logging(max_bytes=1_000_000, rotate_interval=86400, compress=True)."""
+    global log_writer
+    log_writer.close()
+    log_writer = LogWriter(**kwargs)
+    return log_writer
 
 
 def log_decorator(func):
@@ -21,13 +191,9 @@ def log_decorator(func):
     def wrapper(*args, **kwargs):
         try:
             result = func(*args, **kwargs)
-            log_message = f"[{datetime.now()}] {result}\n"
-            with open(LOG_FILE, "a") as log_file:
-                log_file.write(log_message)
+            log_writer.write(result)
             return result
         except Exception as e:
-            log_message = f"[{datetime.now()}] {str(e)}\n"
-            with open(LOG_FILE, "a") as log_file:
-                log_file.write(log_message)
+            log_writer.write(str(e))
             raise e
     return wrapper
@@ -0,0 +1,200 @@
+import os
+import threading
+from operation_metrics import operation_metrics
+
+"""
+Opt-in metrics of the running library, served in the Prometheus text format.
+
+Metrics are off by default and every update then costs a single flag check. The GUI and the command line call
+serve_from_environment(), which turns them on and starts the HTTP listener when the LIBRARY_METRICS_PORT
+environment variable is set (e.g. "9464"); other code can call metrics.enable() and metrics.serve(port). Updates never take a lock: each thread counts into its own shard and a
+scrape sums the shards. Gauges are either sampled from a function at scrape time (waitlist depth) or kept as
+up/down counters (notifications in flight). The latency histograms and outcomes that operation_metrics records for
+every timed operation (borrow, search...) are exported as they are, not timed a second time.
+Scrape http://127.0.0.1:<port>/metrics.
+"""
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    "library_borrows_total": ("counter", "Books lent.", None),
+    "library_returns_total": ("counter", "Books returned.", None),
+    "library_waitlist_depth": ("gauge", "Clients currently on the waiting list.", None),
+    "library_cache_requests_total": ("counter", "Cache lookups by cache and result (hit or miss).", None),
+    "library_flush_bytes": ("histogram", "Bytes written per CSV file flush or append.",
+                            (1024, 16 * 1024, 256 * 1024, 1024 * 1024, 16 * 1024 * 1024)),
+    "library_notifications_total": ("counter", "Notifications dispatched to the observers.", None),
+    "library_notifications_in_flight": ("gauge", "Notifications being dispatched right now.", None),
+    "library_operation_seconds": ("histogram", "Latency of the timed library operations (borrow, search...).",
+                                  (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)),
+    "library_operations_total": ("counter", "Timed library operations by outcome (success, fail or error).", None),
+}
+
+
+def label_text(labels):
+    if not labels:
+        return ""
+    values = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, values)) + "}"
+
+
+def number_text(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.enabled = False
+        self.local = threading.local()
+        self.lock = threading.Lock()  # Only taken when a thread creates its shard, and by scrapes
+        self.shards = []  # One {(series name, labels): value} dict per thread that updated a metric
+        self.gauges = {}  # (name, labels) -> function returning the current value
+        self.server = None
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self.lock:
+            for shard in self.shards:
+                shard.clear()
+
+    def shard(self):
+        shard = getattr(self.local, "shard", None)
+        if shard is None:
+            shard = self.local.shard = {}
+            with self.lock:
+                self.shards.append(shard)
+        return shard
+
+    def inc(self, name, amount=1, **labels):
+        """Add `amount` (possibly negative, for gauges) to a series."""
+        if not self.enabled:
+            return
+        shard = self.shard()
+        key = (name, tuple(sorted(labels.items())))
+        shard[key] = shard.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """Record one value of a histogram."""
+        if not self.enabled:
+            return
+        shard = self.shard()
+        labels = tuple(sorted(labels.items()))
+        for bound in METRICS[name][2] + (float("inf"),):
+            if value <= bound:  # Buckets are cumulative
+                key = (name + "_bucket", labels + (("le", bound),))
+                shard[key] = shard.get(key, 0) + 1
+        for key, amount in (((name + "_sum", labels), value), ((name + "_count", labels), 1)):
+            shard[key] = shard.get(key, 0) + amount
+
+    def gauge(self, name, function, **labels):
+        """
+        Sample `function()` as the value of a gauge at every scrape (the last function registered wins).
+        A gauge whose function returns None is left out.
+        """
+        self.gauges[(name, tuple(sorted(labels.items())))] = function
+
+    def values(self):
+        """Return {(series name, labels): value}, summed over the thread shards, gauges sampled."""
+        with self.lock:
+            shards = [shard.copy() for shard in self.shards]  # dict.copy() is atomic, no need to stop the writers
+        totals = {}
+        for shard in shards:
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        if self.enabled:
+            for key, function in list(self.gauges.items()):
+                value = function()
+                if value is not None:
+                    totals[key] = value
+            self.add_operation_metrics(totals)
+        return totals
+
+    @staticmethod
+    def add_operation_metrics(totals):
+        """Add the histograms and outcome counters of operation_metrics to `totals`."""
+        name = "library_operation_seconds"
+        bounds = METRICS[name][2]
+        for operation, (counts, count, total, outcomes) in operation_metrics.cumulative(
+                [bound * 1_000_000 for bound in bounds]).items():
+            labels = (("operation", operation),)
+            for bound, bucket_count in zip(bounds + (float("inf"),), counts + [count]):
+                totals[(name + "_bucket", labels + (("le", bound),))] = bucket_count
+            totals[(name + "_sum", labels)] = total / 1_000_000
+            totals[(name + "_count", labels)] = count
+            for outcome, outcome_count in outcomes.items():
+                totals[("library_operations_total", labels + (("outcome", outcome),))] = outcome_count
+
+    def exposition(self):
+        """Render every metric in the Prometheus text format (version 0.0.4)."""
+        values = self.values()
+        lines = []
+        for name, (kind, text, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind != "histogram":
+                for labels, value in sorted((key[1], value) for key, value in values.items() if key[0] == name):
+                    lines.append(f"{name}{label_text(labels)} {number_text(value)}")
+                continue
+            for labels in sorted(key[1] for key in values if key[0] == name + "_count"):
+                for bound in buckets + (float("inf"),):
+                    count = values.get((name + "_bucket", labels + (("le", bound),)), 0)
+                    lines.append(f"{name}_bucket{label_text(labels + (('le', number_text(bound)),))} {count}")
+                lines.append(f"{name}_sum{label_text(labels)} {number_text(values[(name + '_sum', labels)])}")
+                lines.append(f"{name}_count{label_text(labels)} {values[(name + '_count', labels)]}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9464, host="127.0.0.1"):
+        """Serve /metrics on a daemon thread. Returns the port (pass 0 to pick a free one)."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.exposition().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood the console
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+        return self.server.server_address[1]
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+metrics = MetricsRegistry()
+
+
+def serve_from_environment():
+    """
+    Enable the metrics and serve them on LIBRARY_METRICS_PORT, if it is set. Returns the port, or None.
+    If the port can't be bound (e.g. another front desk already serves it), metrics stay off with a warning.
+    """
+    port = os.environ.get("LIBRARY_METRICS_PORT")
+    if not port or metrics.server is not None:
+        return None
+    try:
+        port = metrics.serve(int(port))
+    except (OSError, ValueError) as e:
+        print(f"Metrics disabled - can't listen on port {port}: {e}")
+        return None
+    metrics.enable()
+    return port
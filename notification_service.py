@@ -1,4 +1,5 @@
 # notification_service.py
+from metrics_registry import metrics
 
 class Observer:
     """Abstract base class for observers."""
@@ -30,5 +31,10 @@ class NotificationService:
 
     def notify_all(self, message):
         """Notify all registered observers."""
-        for observer in self.observers:
-            observer.notify(message)
+        metrics.inc("library_notifications_total")
+        metrics.inc("library_notifications_in_flight")
+        try:
+            for observer in self.observers:
+                observer.notify(message)
+        finally:
+            metrics.inc("library_notifications_in_flight", -1)
@@ -0,0 +1,162 @@
+import json
+import functools
+import threading
+import time
+
+"""
+In-process latency metrics per library operation (borrow, return, search, login...).
+Each operation gets outcome counters and an HDR-style log-linear latency histogram, so p50/p95/p99 can be read
+from the running system (snapshot() / dump_json()) without any external tooling.
+"""
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of latencies in microseconds.
+
+    Values are bucketed by their power of two and then by the next `sub_bucket_bits` bits, which keeps the
+    relative error under 1 / 2**sub_bucket_bits (about 3% with the default) using a few hundred counters at most.
+    """
+    def __init__(self, sub_bucket_bits=5):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.buckets = {}  # bucket index -> count
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def bucket_index(self, value):
+        if value < (1 << self.sub_bucket_bits):
+            return value  # Small values are stored exactly
+        shift = value.bit_length() - 1 - self.sub_bucket_bits
+        return ((shift + 1) << self.sub_bucket_bits) + (value >> shift) - (1 << self.sub_bucket_bits)
+
+    def bucket_upper_bound(self, index):
+        """The highest value that falls into the bucket (what percentiles report)."""
+        size = 1 << self.sub_bucket_bits
+        if index < size:
+            return index
+        shift = (index >> self.sub_bucket_bits) - 1
+        mantissa = (index & (size - 1)) + size
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value):
+        value = max(0, int(value))
+        index = self.bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.min = value if self.min is None else min(self.min, value)
+
+    def merge(self, other):
+        """Add the values recorded by another histogram (same sub_bucket_bits) into this one."""
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+
+    def count_at_most(self, value):
+        """Number of recorded values whose bucket lies at or below `value` (what cumulative exports report)."""
+        return sum(count for index, count in self.buckets.items() if self.bucket_upper_bound(index) <= value)
+
+    def percentile(self, percent):
+        """Return the value at the given percentile (0-100), or 0 if nothing was recorded."""
+        if not self.count:
+            return 0
+        rank = max(1, -(-self.count * percent // 100))  # ceil without floats
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.bucket_upper_bound(index), self.max)
+        return self.max
+
+
+class OperationMetrics:
+    """Registry of per-operation outcome counters and latency histograms."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # operation -> LatencyHistogram
+        self.outcomes = {}  # operation -> {"success": n, "fail": n, "error": n}
+
+    def record(self, operation, seconds, outcome):
+        with self.lock:
+            histogram = self.histograms.get(operation)
+            if histogram is None:
+                histogram = self.histograms[operation] = LatencyHistogram()
+                self.outcomes[operation] = {"success": 0, "fail": 0, "error": 0}
+            histogram.record(seconds * 1_000_000)
+            self.outcomes[operation][outcome] += 1
+
+    def snapshot(self):
+        """Return {operation: {count, outcomes, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}."""
+        with self.lock:
+            result = {}
+            for operation, histogram in self.histograms.items():
+                result[operation] = {
+                    "count": histogram.count,
+                    "outcomes": dict(self.outcomes[operation]),
+                    "mean_ms": histogram.total / histogram.count / 1000 if histogram.count else 0.0,
+                    "p50_ms": histogram.percentile(50) / 1000,
+                    "p95_ms": histogram.percentile(95) / 1000,
+                    "p99_ms": histogram.percentile(99) / 1000,
+                    "max_ms": histogram.max / 1000,
+                }
+            return result
+
+    def cumulative(self, bounds):
+        """
+        Return {operation: (counts at or below each of `bounds` microseconds, count, total microseconds, outcomes)},
+        the shape of a Prometheus histogram.
+        """
+        with self.lock:
+            return {operation: ([histogram.count_at_most(bound) for bound in bounds], histogram.count, histogram.total,
+                                dict(self.outcomes[operation]))
+                    for operation, histogram in self.histograms.items()}
+
+    def dump_json(self, file_path=None):
+        """Return the snapshot as JSON, also writing it to `file_path` if given."""
+        data = json.dumps(self.snapshot(), indent=2, sort_keys=True)
+        if file_path:
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.write(data)
+        return data
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.outcomes.clear()
+
+
+operation_metrics = OperationMetrics()
+
+
+def classify_outcome(result):
+    """Map the library's return conventions to an outcome: False or a "... fail ..." message count as a failure."""
+    if result is False or (isinstance(result, str) and "fail" in result.lower()):
+        return "fail"
+    return "success"
+
+
+def timed_operation(operation):
+    """
+    Decorator that records the wall time and outcome of every call under `operation`.
+    Exceptions are recorded as "error" and re-raised.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                operation_metrics.record(operation, time.perf_counter() - start, "error")
+                raise
+            operation_metrics.record(operation, time.perf_counter() - start, classify_outcome(result))
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,178 @@
+import os
+import functools
+import threading
+
+"""
+Opt-in profiling of the library's entry points.
+
+Profiling is off by default and costs a single flag check per call. Turn it on with the LIBRARY_PROFILE
+environment variable (a sample rate such as "1" or "0.05", plus LIBRARY_PROFILE_MEMORY=1 for tracemalloc) or with
+profiler.enable(...); cProfile, pstats and tracemalloc are only imported once profiling is used. Sampled calls run
+under cProfile and their stats are merged per operation. dump_collapsed() writes flame-graph compatible collapsed
+stacks ("op;frame;frame <microseconds>"), e.g. for flamegraph.pl or speedscope.
+"""
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.trace_memory = False
+        self.started_tracing = False  # Whether tracemalloc was started by us (and not by another tool)
+        self.lock = threading.Lock()
+        self.active = threading.Lock()  # cProfile can only run one profile at a time
+        self.stats = {}  # operation -> pstats.Stats of all sampled calls
+        self.roots = {}  # operation -> pstats key of the profiled entry point
+        self.calls = {}  # operation -> {"calls", "sampled", "alloc_bytes", "peak_bytes"}
+
+    def enable(self, sample_rate=1.0, trace_memory=False):
+        """Start profiling a `sample_rate` share of calls, optionally tracking allocations with tracemalloc."""
+        import tracemalloc
+        self.sample_rate = sample_rate
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        self.enabled = True
+
+    def disable(self):
+        """Stop profiling; tracemalloc is only stopped if enable() started it."""
+        import tracemalloc
+        self.enabled = False
+        if self.started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.started_tracing = False
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+            self.roots.clear()
+            self.calls.clear()
+
+    def call(self, operation, func, args, kwargs):
+        """Run `func`, profiling it if this call is sampled."""
+        import random
+        import cProfile
+        import tracemalloc
+        with self.lock:
+            counters = self.calls.setdefault(operation, {"calls": 0, "sampled": 0, "alloc_bytes": 0, "peak_bytes": 0})
+            counters["calls"] += 1
+        if random.random() >= self.sample_rate or not self.active.acquire(blocking=False):
+            return func(*args, **kwargs)  # Not sampled, or a nested/concurrent call is already being profiled
+
+        try:
+            tracing = self.trace_memory and tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(func, *args, **kwargs)
+            finally:
+                profile.create_stats()
+                if tracing:
+                    after, peak = tracemalloc.get_traced_memory()
+                self.add_sample(operation, func, profile,
+                                after - before if tracing else 0, peak - before if tracing else 0)
+        finally:
+            self.active.release()
+
+    def add_sample(self, operation, func, profile, alloc_bytes, peak_bytes):
+        import pstats
+        code = func.__code__
+        with self.lock:
+            if operation in self.stats:
+                self.stats[operation].add(profile)
+            else:
+                self.stats[operation] = pstats.Stats(profile)
+                self.roots[operation] = (code.co_filename, code.co_firstlineno, code.co_name)
+            counters = self.calls[operation]
+            counters["sampled"] += 1
+            counters["alloc_bytes"] += alloc_bytes
+            counters["peak_bytes"] = max(counters["peak_bytes"], peak_bytes)
+
+    def report(self):
+        """Return {operation: {calls, sampled, total_ms, mean_ms, alloc_bytes, peak_bytes}} for the sampled calls."""
+        with self.lock:
+            result = {}
+            for operation, counters in self.calls.items():
+                stats = self.stats.get(operation)
+                root = stats.stats.get(self.roots[operation]) if stats else None
+                total_ms = root[3] * 1000 if root else 0.0
+                result[operation] = dict(counters, total_ms=total_ms,
+                                         mean_ms=total_ms / counters["sampled"] if counters["sampled"] else 0.0)
+            return result
+
+    def print_stats(self, operation, limit=20, sort="cumulative"):
+        """Print the merged cProfile table of one operation."""
+        with self.lock:
+            self.stats[operation].sort_stats(sort).print_stats(limit)
+
+    def top_allocations(self, limit=10):
+        """Take a tracemalloc snapshot and return the `limit` biggest allocation sites."""
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            return []
+        return tracemalloc.take_snapshot().statistics("lineno")[:limit]
+
+    def collapsed_stacks(self):
+        """Build collapsed stacks from the merged cProfile call graphs, in microseconds of own time."""
+        lines = {}
+        with self.lock:
+            for operation, stats in self.stats.items():
+                callees = {}
+                for func, (_, _, _, _, callers) in stats.stats.items():
+                    for caller, edge in callers.items():
+                        callees.setdefault(caller, []).append((func, edge[3]))  # edge[3] = time spent via this edge
+                root = self.roots[operation]
+                if root in stats.stats:
+                    self.collapse(stats.stats, callees, root, stats.stats[root][3], [operation], set(), lines)
+        return lines
+
+    @staticmethod
+    def frame_name(func):
+        filename, lineno, name = func
+        if filename == "~":
+            return name  # Built-ins like <method 'write' of '_io.TextIOWrapper' objects>
+        return f"{os.path.basename(filename)}:{name}:{lineno}"
+
+    def collapse(self, stats, callees, func, time_in, path, on_stack, lines):
+        """Attribute `time_in` seconds entering `func` along `path` to its own time and its callees, proportionally."""
+        _, _, own_time, total_time, _ = stats[func]
+        if total_time <= 0 or time_in <= 0:
+            return
+        share = min(1.0, time_in / total_time)
+        path = path + [self.frame_name(func)]
+        on_stack = on_stack | {func}
+        key = ";".join(path)
+        lines[key] = lines.get(key, 0) + own_time * share * 1_000_000
+        for callee, edge_time in callees.get(func, []):
+            if callee not in on_stack:  # Recursion is folded into the outer frame
+                self.collapse(stats, callees, callee, edge_time * share, path, on_stack, lines)
+
+    def dump_collapsed(self, file_path="profile.collapsed"):
+        """Write the collapsed stacks to `file_path` and return the path."""
+        with open(file_path, "w", encoding="utf-8") as file:
+            for stack, microseconds in sorted(self.collapsed_stacks().items()):
+                if microseconds >= 1:
+                    file.write(f"{stack} {int(microseconds)}\n")
+        return file_path
+
+
+profiler = Profiler()
+
+if os.environ.get("LIBRARY_PROFILE"):
+    profiler.enable(sample_rate=float(os.environ["LIBRARY_PROFILE"]),
+                    trace_memory=os.environ.get("LIBRARY_PROFILE_MEMORY") == "1")
+
+
+def profiled(operation):
+    """Decorator that hands the call to the profiler when profiling is enabled."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            return profiler.call(operation, func, args, kwargs)
+        return wrapper
+    return decorator